@@ -8,6 +8,12 @@ class AIConfig:
     # API Key
     GEMINI_API_KEY = settings.gemini_api_key
     
+    # Optional endpoint override (uses the REST transport when set)
+    GEMINI_API_ENDPOINT = settings.gemini_api_endpoint
+    
+    # Max concurrent Gemini calls per worker (size of the call thread pool)
+    MAX_CONCURRENT_REQUESTS = settings.gemini_max_concurrency
+    
     # Model selection (using free Gemini model)
     GEMINI_MODEL = "models/gemini-2.5-flash"  # Free tier model - latest stable
     
@@ -16,6 +22,26 @@ class AIConfig:
     MAX_TOKENS = 1000
     TOP_P = 0.9
     
+    # Rate limits (requests per minute). The global limit protects the
+    # upstream Gemini quota; each plan caps a single user and the plan's
+    # users combined, so free-tier traffic always leaves premium headroom.
+    RATE_LIMIT_GLOBAL_RPM = 5
+    RATE_LIMIT_PLANS = {
+        "free": {"user_rpm": 2, "plan_rpm": 3},
+        "premium": {"user_rpm": 5, "plan_rpm": 5}
+    }
+    
+    # Longest a chat request waits for rate limit admission before it is
+    # rejected with Retry-After (0 = fail fast)
+    RATE_LIMIT_MAX_WAIT_SECONDS = 20
+    
+    # Prompt size limits (estimated tokens). The budget covers the system
+    # prompt, context, history summary, recent messages and question; the
+    # oldest history is dropped first when it would be exceeded.
+    PROMPT_TOKEN_BUDGET = 3000
+    PROMPT_HISTORY_MESSAGES = 5
+    HISTORY_SUMMARY_MAX_TOKENS = 400
+    
     # System prompt for bookkeeping context
     SYSTEM_PROMPT = """You are FinAI, an expert financial assistant for FinSense AI, a bookkeeping platform for small businesses.
 
@@ -5,6 +5,7 @@ from bson import ObjectId
 from auth.jwt import verify_token
 from database import get_database
 from models.user import UserInDB
+from services.user_cache import user_cache
 
 
 security = HTTPBearer()
@@ -34,6 +35,11 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Serve repeat requests with the same token from the cache
+    cached_user = user_cache.get(user_id, token)
+    if cached_user is not None:
+        return cached_user
+    
     # Get user from database
     db = get_database()
     user_doc = await db.users.find_one({"_id": ObjectId(user_id)})
@@ -45,4 +51,6 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    return UserInDB(**user_doc)
\ No newline at end of file
+    user = UserInDB(**user_doc)
+    user_cache.set(user_id, token, user)
+    return user
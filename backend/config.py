@@ -10,6 +10,7 @@ class Settings(BaseSettings):
     database_name: str = "finsense"
     jwt_secret: str
     jwt_expires_in: int = 86400
+    password_hash_workers: int = 2  # Max concurrent argon2 hash/verify calls per worker
     cors_origins: str = "http://localhost:5173"
     
     # Plaid configuration
@@ -24,6 +25,25 @@ class Settings(BaseSettings):
     
     # AI Assistant configuration (Gemini only)
     gemini_api_key: str = ""
+    gemini_api_endpoint: str = ""  # Optional override, e.g. a local fake server for benchmarks
+    gemini_max_concurrency: int = 4  # Max in-flight Gemini calls per worker
+    response_cache_max_entries: int = 5000  # LRU capacity of the AI response cache
+    response_cache_max_bytes: int = 0  # Byte budget for cached responses (0 = unlimited)
+    response_cache_sweep_seconds: int = 300  # Interval between expired-entry sweeps
+    semantic_cache_enabled: bool = True  # Serve paraphrases of answered general questions
+    semantic_cache_threshold: float = 0.85  # Minimum cosine similarity for a semantic hit
+    semantic_cache_max_entries: int = 1000  # Questions kept in the similarity index
+    response_cache_backend: str = "memory"  # Shared cache behind the in-process LRU: memory, mongodb or redis
+    redis_url: str = ""  # Required for the redis cache and rate limit backends (needs the redis package)
+    rate_limit_backend: str = "memory"  # Global Gemini budget shared across workers: memory, mongodb or redis
+    
+    # Background jobs (account sync, sample-data seeding)
+    job_workers: int = 2  # Jobs run concurrently per worker process
+    job_max_attempts: int = 3  # Attempts before a job is marked failed
+    job_retry_backoff_seconds: float = 2.0  # Delay before the first retry (doubles per attempt)
+    
+    # Columnar (Arrow/Parquet) exports, needs the pyarrow package
+    export_snapshot_dir: str = "exports"  # Directory of per-user incremental Parquet snapshots
     
     model_config = SettingsConfigDict(
         env_file=".env",
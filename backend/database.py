@@ -1,5 +1,7 @@
 """Database connection and utilities."""
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
 from config import settings
 
 
@@ -7,6 +9,72 @@ from config import settings
 mongodb_client: AsyncIOMotorClient = None
 
 
+# Index manifest: collection name -> indexes that back the router queries.
+# Default (key-derived) index names keep create_indexes idempotent across restarts.
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+    ],
+    "subscriptions": [
+        IndexModel([("user_id", ASCENDING)], unique=True),
+    ],
+    "transactions": [
+        # Transaction list (keyset on date, _id), dashboard date ranges
+        IndexModel([("user_id", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)]),
+        # Transaction list filtered by status
+        IndexModel([("user_id", ASCENDING), ("status", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)]),
+        # Vendor/category search within one user's transactions
+        IndexModel(
+            [("user_id", ASCENDING), ("vendor", TEXT), ("category", TEXT)],
+            weights={"vendor": 3, "category": 1},
+            name="transaction_search"
+        ),
+        # Incremental columnar snapshots (keyset on updated_at, _id)
+        IndexModel([("user_id", ASCENDING), ("updated_at", ASCENDING), ("_id", ASCENDING)]),
+    ],
+    "daily_rollups": [
+        # One document per (user, day, category); also the $merge key for rebuilds
+        IndexModel([("user_id", ASCENDING), ("day", ASCENDING), ("category", ASCENDING)], unique=True),
+    ],
+    "conversations": [
+        # Conversation list (keyset on updated_at, _id)
+        IndexModel([("user_id", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)]),
+        # Title search within one user's conversations
+        IndexModel([("user_id", ASCENDING), ("title", TEXT)]),
+    ],
+    "messages": [
+        # History reads and full transcripts walk one conversation in time order
+        IndexModel([("conversation_id", ASCENDING), ("timestamp", ASCENDING), ("_id", ASCENDING)]),
+    ],
+    "ai_response_cache": [
+        # MongoDB removes cached AI responses once expires_at has passed
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "jobs": [
+        # Startup recovery of unfinished jobs
+        IndexModel([("status", ASCENDING)]),
+        # Finished jobs are kept for a week for status polling
+        IndexModel([("finished_at", ASCENDING)], expireAfterSeconds=7 * 24 * 3600),
+    ],
+    "export_snapshots": [
+        IndexModel([("user_id", ASCENDING)], unique=True),
+    ],
+    "connected_accounts": [
+        IndexModel([("user_id", ASCENDING), ("source", ASCENDING), ("name", ASCENDING)]),
+    ],
+}
+
+# Indexes superseded by the manifest, dropped at startup: collection name -> index names
+RETIRED_INDEXES = {
+    # Replaced by (user_id, updated_at, _id), which also covers the keyset tie-breaker
+    "conversations": ["user_id_1_updated_at_-1"],
+}
+
+# Server error codes for dropping an index or collection that does not exist
+INDEX_NOT_FOUND = 27
+NAMESPACE_NOT_FOUND = 26
+
+
 def get_database() -> AsyncIOMotorDatabase:
     """Get the MongoDB database instance."""
     return mongodb_client[settings.database_name]
@@ -15,11 +83,23 @@ def get_database() -> AsyncIOMotorDatabase:
 async def init_db():
     """Initialize database indexes and collections."""
     db = get_database()
-    
-    # Create unique index on users.email
-    await db.users.create_index("email", unique=True)
-    
-    # Create unique index on subscriptions.user_id
-    await db.subscriptions.create_index("user_id", unique=True)
-    
-    print("Database indexes created successfully")
\ No newline at end of file
+
+    # Create every index in the manifest (no-op if it already exists)
+    for collection_name, indexes in INDEXES.items():
+        await db[collection_name].create_indexes(indexes)
+
+    # Drop superseded indexes (no-op once they are gone)
+    for collection_name, index_names in RETIRED_INDEXES.items():
+        existing = await db[collection_name].index_information()
+        for index_name in index_names:
+            if index_name not in existing:
+                continue
+            try:
+                await db[collection_name].drop_index(index_name)
+                print(f"Dropped retired index {collection_name}.{index_name}")
+            except OperationFailure as e:
+                # Another worker dropped it first
+                if e.code not in (INDEX_NOT_FOUND, NAMESPACE_NOT_FOUND):
+                    raise
+
+    print("Database indexes created successfully")
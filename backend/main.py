@@ -6,8 +6,13 @@ from contextlib import asynccontextmanager
 
 from config import settings
 import database
-from routers import auth, subscription, stripe, categories, accounts, transactions, dashboard, ai_chat
+from routers import auth, subscription, stripe, categories, accounts, transactions, dashboard, ai_chat, jobs
 from seed_data import seed_all
+from services.daily_rollups import backfill_rollups
+from services.conversation_messages import migrate_embedded_messages
+from services.response_cache import response_cache
+from services.password_hasher import password_hasher
+from services.job_queue import job_queue
 
 # Use mock Plaid if credentials are not configured
 if settings.plaid_client_id and settings.plaid_secret and settings.plaid_client_id != "your-plaid-client-id":
@@ -37,13 +42,28 @@ async def lifespan(app: FastAPI):
         # Initialize database indexes
         await database.init_db()
         
+        # Build dashboard rollups for data written before they existed
+        await backfill_rollups(database.get_database())
+        
+        # Move conversation messages out of embedded arrays
+        await migrate_embedded_messages(database.get_database())
+        
         # Seed initial data (categories)
         await seed_all()
     except Exception as e:
         print(f"Failed to connect to MongoDB: {e}")
     
+    # Periodically drop expired AI responses
+    response_cache.start_sweeper(settings.response_cache_sweep_seconds)
+    
+    # Run background jobs (account sync, sample-data seeding)
+    await job_queue.start()
+    
     yield
     
+    await job_queue.stop()
+    await response_cache.stop_sweeper()
+    
     # Shutdown: Close MongoDB connection
     if mongodb_client:
         mongodb_client.close()
@@ -77,6 +97,7 @@ app.include_router(accounts.router)
 app.include_router(transactions.router)
 app.include_router(dashboard.router)
 app.include_router(ai_chat.router)
+app.include_router(jobs.router)
 app.include_router(plaid.router)  # Will be mock or real based on credentials
 app.include_router(stripe.router)
 
@@ -96,6 +117,7 @@ async def health_check():
     return {
         "status": "healthy",
         "database": db_status,
+        "password_hasher": password_hasher.get_stats(),
         "timestamp": datetime.utcnow().isoformat() + "Z"
     }
 
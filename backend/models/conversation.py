@@ -59,8 +59,22 @@ class ConversationInDB(BaseModel):
     """Database model for conversation."""
     user_id: ObjectId
     title: str
-    messages: List[dict]
+    message_count: int = 0
+    last_message_preview: str = ""
+    history_summary: str = ""  # Rolling summary of messages older than the prompt history
+    summarized_count: int = 0
     created_at: datetime
     updated_at: datetime
     
+    model_config = {"arbitrary_types_allowed": True}
+
+
+class MessageInDB(BaseModel):
+    """Database model for a message (stored in the messages collection)."""
+    conversation_id: ObjectId
+    user_id: ObjectId
+    role: str
+    content: str
+    timestamp: datetime
+    
     model_config = {"arbitrary_types_allowed": True}
\ No newline at end of file
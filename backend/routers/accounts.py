@@ -2,19 +2,50 @@
 from datetime import datetime
 from fastapi import APIRouter, HTTPException, status, Depends
 from bson import ObjectId
-from typing import List
+from typing import List, Optional
 
 from models.connected_account import ConnectedAccountCreate, ConnectedAccountResponse
 from models.user import UserInDB
 from auth.dependencies import get_current_user
 from database import get_database
 from services.sample_data_seeder import seed_sample_data_for_user
+from services.daily_rollups import rebuild_rollups_for_user
+from services.job_queue import job_queue, job_to_response
 
 
 router = APIRouter(prefix="/api/v1/accounts", tags=["accounts"])
 
 
-@router.post("/connect", response_model=dict, status_code=status.HTTP_201_CREATED)
+def connected_account_query(user_id: ObjectId, source: Optional[str] = None, name: Optional[str] = None) -> dict:
+    """Filter for a user's connected accounts, optionally one source and name."""
+    query = {"user_id": user_id}
+    if source is not None:
+        query["source"] = source
+    if name is not None:
+        query["name"] = name
+    return query
+
+
+@job_queue.handler("seed_sample_data")
+async def run_seed_job(db, job: dict) -> dict:
+    """Seed sample data for a user's first connected account (skips if already seeded)."""
+    user_id = job["user_id"]
+    print(f"[AUTO-SEED] First account connected for user {user_id}, seeding sample data...")
+    result = await seed_sample_data_for_user(db, user_id)
+    
+    # An earlier attempt may have inserted the transactions but not their rollups
+    if job["attempts"] > 1:
+        await rebuild_rollups_for_user(db, user_id)
+    
+    if result is not None:
+        print(f"[AUTO-SEED] Sample data seeded successfully for user {user_id}")
+    return {
+        "seeded": result is not None,
+        "transactions": await db.transactions.count_documents({"user_id": user_id})
+    }
+
+
+@router.post("/connect", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
 async def connect_account(
     account_data: ConnectedAccountCreate,
     current_user: UserInDB = Depends(get_current_user)
@@ -22,7 +53,9 @@ async def connect_account(
     """
     Simulate connecting a financial account (Square, Stripe, or Bank).
     
-    Creates a connected account record for the user.
+    Creates a connected account record for the user. Sample data for the
+    first account is seeded by a background job; poll GET /api/v1/jobs/{id}
+    for its progress.
     """
     db = get_database()
     
@@ -35,11 +68,9 @@ async def connect_account(
         )
     
     # Check if account already exists
-    existing_account = await db.connected_accounts.find_one({
-        "user_id": current_user.id,
-        "source": account_data.source.lower(),
-        "name": account_data.name
-    })
+    existing_account = await db.connected_accounts.find_one(
+        connected_account_query(current_user.id, account_data.source.lower(), account_data.name)
+    )
     
     if existing_account:
         raise HTTPException(
@@ -48,7 +79,7 @@ async def connect_account(
         )
     
     # Check if this is the user's FIRST account connection
-    account_count = await db.connected_accounts.count_documents({"user_id": current_user.id})
+    account_count = await db.connected_accounts.count_documents(connected_account_query(current_user.id))
     is_first_account = (account_count == 0)
     
     # Create connected account document
@@ -63,15 +94,10 @@ async def connect_account(
     result = await db.connected_accounts.insert_one(account_doc)
     account_id = str(result.inserted_id)
     
-    # If this is the first account, automatically seed sample data
+    # If this is the first account, seed sample data in the background
+    seed_job = None
     if is_first_account:
-        try:
-            print(f"[AUTO-SEED] First account connected for user {current_user.id}, seeding sample data...")
-            await seed_sample_data_for_user(db, current_user.id)
-            print(f"[AUTO-SEED] Sample data seeded successfully for user {current_user.id}")
-        except Exception as e:
-            # Don't fail the account connection if seeding fails
-            print(f"[AUTO-SEED] Warning: Failed to seed sample data: {e}")
+        seed_job = await job_queue.enqueue("seed_sample_data", current_user.id)
     
     return {
         "account": {
@@ -80,7 +106,8 @@ async def connect_account(
             "name": account_data.name,
             "connected_at": account_doc["connected_at"].isoformat() + "Z"
         },
-        "sample_data_seeded": is_first_account
+        "sample_data_seeded": is_first_account,
+        "job": job_to_response(seed_job) if seed_job else None
     }
 
 
@@ -94,7 +121,7 @@ async def get_connected_accounts(current_user: UserInDB = Depends(get_current_us
     db = get_database()
     
     # Fetch all connected accounts for user
-    accounts_cursor = db.connected_accounts.find({"user_id": current_user.id})
+    accounts_cursor = db.connected_accounts.find(connected_account_query(current_user.id))
     accounts = await accounts_cursor.to_list(length=None)
     
     # Convert to response format
@@ -1,8 +1,11 @@
 """AI Chat routes for conversational financial assistant."""
+import json
+import math
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi.responses import StreamingResponse
 from bson import ObjectId
-from typing import List, Dict
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 
 from models.conversation import (
     ConversationCreate,
@@ -15,51 +18,203 @@ from models.user import UserInDB
 from auth.dependencies import get_current_user
 from database import get_database
 from services.sample_responses import get_sample_prompts
-from services.ai_service import ai_service
+from services.ai_service import ai_service, AIStreamError
+from services.rate_limiter import RateLimitExceeded
+from ai_config import ai_config
+from services.user_context_cache import user_context_cache
+from services.user_cache import user_cache
+from services.pagination import decode_cursor, keyset_filter, next_cursor
+from services.conversation_messages import (
+    append_messages,
+    get_recent_messages,
+    get_all_messages,
+    delete_messages
+)
 
 
 router = APIRouter(prefix="/api/v1/ai-chat", tags=["ai-chat"])
 
+# Page size bounds for the conversation list
+DEFAULT_PAGE_SIZE = 30
+MAX_PAGE_SIZE = 100
+
+# Only the summary fields are read for the conversation list
+CONVERSATION_LIST_PROJECTION = {
+    "title": 1,
+    "last_message_preview": 1,
+    "message_count": 1,
+    "created_at": 1,
+    "updated_at": 1
+}
+
+# Conversation list order: most recently updated first, ties broken by _id
+CONVERSATION_LIST_SORT = [("updated_at", -1), ("_id", -1)]
+
+# Headers that keep proxies from buffering Server-Sent Events
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _sse_event(payload: dict) -> str:
+    """Format a payload as a Server-Sent Event."""
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+async def get_rate_limit_options(user_id: ObjectId, db) -> Dict:
+    """
+    Rate limit arguments for an AI call made on behalf of a user.
+    
+    Users with an active trial get premium limits.
+    """
+    subscription = await db.subscriptions.find_one(
+        {"user_id": user_id},
+        {"plan": 1, "is_trial_active": 1, "trial_ends_at": 1}
+    ) or {}
+    
+    trial_ends_at = subscription.get("trial_ends_at")
+    on_trial = subscription.get("is_trial_active", False) and trial_ends_at and trial_ends_at > datetime.utcnow()
+    plan = "premium" if subscription.get("plan") == "premium" or on_trial else "free"
+    
+    return {
+        "user_id": str(user_id),
+        "plan": plan,
+        "max_wait": ai_config.RATE_LIMIT_MAX_WAIT_SECONDS
+    }
+
+
+def _rate_limit_error(error: RateLimitExceeded) -> HTTPException:
+    """429 response telling the client when to retry."""
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many AI requests. Please try again shortly.",
+        headers={"Retry-After": str(math.ceil(error.retry_after))}
+    )
+
+
+async def _start_stream(chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """
+    Pull the first chunk before the response starts.
+    
+    Rate limit admission happens before the first chunk, so rejections
+    surface as a 429 instead of an error inside an already-open stream.
+    A generation failure is replayed inside the stream, where it becomes an
+    "error" event.
+    """
+    first = None
+    error = None
+    try:
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        pass
+    except RateLimitExceeded as e:
+        raise _rate_limit_error(e)
+    except AIStreamError as e:
+        error = e
+    
+    async def replay():
+        if error is not None:
+            raise error
+        if first is not None:
+            yield first
+        async for chunk in chunks:
+            yield chunk
+    
+    return replay()
+
+
+async def _append_exchange(db, conversation_id: ObjectId, user_id: ObjectId, user_content: str, assistant_content: str, now: datetime):
+    """Store a user message and the assistant's reply in a conversation."""
+    await append_messages(db, conversation_id, user_id, [
+        {
+            "role": "user",
+            "content": user_content,
+            "timestamp": now
+        },
+        {
+            "role": "assistant",
+            "content": assistant_content,
+            "timestamp": now
+        }
+    ], now)
+
+
+def financial_context_pipeline(user_id: ObjectId) -> List[dict]:
+    """$facet over a user's daily rollups: all-time totals and top expense categories."""
+    return [
+        {"$match": {"user_id": user_id}},
+        {"$facet": {
+            "totals": [
+                {"$group": {
+                    "_id": None,
+                    "revenue": {"$sum": "$revenue"},
+                    "expenses": {"$sum": "$expenses"},
+                    "count": {"$sum": "$count"}
+                }}
+            ],
+            "top_categories": [
+                {"$match": {"expenses": {"$gt": 0}}},
+                {"$group": {"_id": "$category", "total": {"$sum": "$expenses"}}},
+                {"$sort": {"total": -1}},
+                {"$limit": 3}
+            ]
+        }}
+    ]
+
+
+def conversation_list_query(
+    user_id: ObjectId,
+    search: Optional[str] = None,
+    after: Optional[Tuple[datetime, ObjectId]] = None
+) -> dict:
+    """
+    Filter for a page of a user's conversations in CONVERSATION_LIST_SORT order.
+    
+    Args:
+        user_id: Owner of the conversations
+        search: Words to match in the title (uses the (user_id, title) text index)
+        after: Decoded (updated_at, _id) cursor of the previous page
+    
+    Returns:
+        MongoDB filter
+    """
+    query = {"user_id": user_id}
+    
+    if search and search.strip():
+        query["$text"] = {"$search": search.strip()}
+    
+    if after:
+        query["$and"] = [keyset_filter("updated_at", *after)]
+    
+    return query
+
 
 async def fetch_user_financial_data(user_id: ObjectId, db) -> Dict:
-    """Fetch user's financial data for AI context."""
+    """
+    Fetch user's financial data for AI context.
+    
+    Served from the per-user context cache when possible; otherwise
+    computed with a single $facet over the user's daily rollups.
+    """
+    cached = user_context_cache.get(user_id)
+    if cached is not None:
+        return cached
+    
     try:
-        # Get revenue
-        revenue_pipeline = [
-            {"$match": {"user_id": user_id, "amount": {"$lt": 0}}},
-            {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-        ]
-        revenue_result = await db.transactions.aggregate(revenue_pipeline).to_list(length=1)
-        total_revenue = abs(revenue_result[0]["total"]) if revenue_result else 0
-        
-        # Get expenses
-        expense_pipeline = [
-            {"$match": {"user_id": user_id, "amount": {"$gt": 0}}},
-            {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-        ]
-        expense_result = await db.transactions.aggregate(expense_pipeline).to_list(length=1)
-        total_expenses = expense_result[0]["total"] if expense_result else 0
+        result = await db.daily_rollups.aggregate(financial_context_pipeline(user_id)).to_list(length=1)
+        facets = result[0] if result else {"totals": [], "top_categories": []}
         
-        # Get top categories
-        category_pipeline = [
-            {"$match": {"user_id": user_id, "amount": {"$gt": 0}}},
-            {"$group": {"_id": "$category", "total": {"$sum": "$amount"}}},
-            {"$sort": {"total": -1}},
-            {"$limit": 3}
-        ]
-        categories = await db.transactions.aggregate(category_pipeline).to_list(length=3)
-        top_categories = [cat["_id"] for cat in categories]
+        totals = facets["totals"][0] if facets["totals"] else {}
+        total_revenue = totals.get("revenue", 0)
+        total_expenses = totals.get("expenses", 0)
         
-        # Get transaction count
-        transaction_count = await db.transactions.count_documents({"user_id": user_id})
-        
-        return {
+        user_data = {
             "revenue": total_revenue,
             "expenses": total_expenses,
             "profit": total_revenue - total_expenses,
-            "top_categories": top_categories,
-            "transaction_count": transaction_count
+            "top_categories": [cat["_id"] for cat in facets["top_categories"]],
+            "transaction_count": totals.get("count", 0)
         }
+        user_context_cache.set(user_id, user_data)
+        return user_data
     except Exception as e:
         print(f"Error fetching user financial data: {e}")
         return {}
@@ -79,13 +234,18 @@ async def create_conversation(
     
     # Fetch user's financial data for context
     user_data = await fetch_user_financial_data(current_user.id, db)
+    limits = await get_rate_limit_options(current_user.id, db)
     
     # Generate AI response to initial message
-    ai_response = await ai_service.generate_response(
-        user_message=conversation_data.initial_message,
-        conversation_history=None,
-        user_data=user_data
-    )
+    try:
+        ai_response = await ai_service.generate_response(
+            user_message=conversation_data.initial_message,
+            conversation_history=None,
+            user_data=user_data,
+            **limits
+        )
+    except RateLimitExceeded as e:
+        raise _rate_limit_error(e)
     
     # Create conversation title from first message (truncated)
     title = conversation_data.title or conversation_data.initial_message[:50]
@@ -97,24 +257,17 @@ async def create_conversation(
     conversation_doc = {
         "user_id": current_user.id,
         "title": title,
-        "messages": [
-            {
-                "role": "user",
-                "content": conversation_data.initial_message,
-                "timestamp": now
-            },
-            {
-                "role": "assistant",
-                "content": ai_response,
-                "timestamp": now
-            }
-        ],
+        "message_count": 0,
+        "last_message_preview": "",
+        "history_summary": "",
+        "summarized_count": 0,
         "created_at": now,
         "updated_at": now
     }
     
-    # Insert into database
+    # Insert into database, then store the opening exchange
     result = await db.conversations.insert_one(conversation_doc)
+    await _append_exchange(db, result.inserted_id, current_user.id, conversation_data.initial_message, ai_response, now)
     conversation_id = str(result.inserted_id)
     
     # Return conversation with messages
@@ -140,37 +293,61 @@ async def create_conversation(
 
 
 @router.get("/conversations", response_model=dict)
-async def get_conversations(current_user: UserInDB = Depends(get_current_user)):
+async def get_conversations(
+    search: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    current_user: UserInDB = Depends(get_current_user)
+):
     """
-    Get all conversations for the current user.
+    Get a page of conversations for the current user.
+    
+    Returns basic info only (no message history), most recently updated
+    first, paginated by (updated_at, _id) keyset.
     
-    Returns a list of conversations with basic info (no full message history).
+    Query parameters:
+    - search: Words to match in the conversation title
+    - limit: Page size (default 30, max 100)
+    - after: Cursor returned as next_cursor by the previous page
     """
     db = get_database()
     
-    # Fetch all conversations for user
+    # Resume after the cursor
+    after_key = None
+    if after:
+        try:
+            after_key = decode_cursor(after)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+    
+    # Fetch one extra row to know whether another page exists
     conversations_cursor = db.conversations.find(
-        {"user_id": current_user.id}
-    ).sort("updated_at", -1)  # Most recent first
+        conversation_list_query(current_user.id, search, after_key), CONVERSATION_LIST_PROJECTION
+    ).sort(CONVERSATION_LIST_SORT).limit(limit + 1)
+    conversations = await conversations_cursor.to_list(length=limit + 1)
     
-    conversations = await conversations_cursor.to_list(length=None)
+    cursor = next_cursor(conversations, "updated_at", limit)
     
     # Convert to response format (without full messages)
     conversation_list = []
     for conv in conversations:
-        # Get last message preview
-        last_message = conv["messages"][-1] if conv["messages"] else None
-        
         conversation_list.append({
             "id": str(conv["_id"]),
             "title": conv["title"],
-            "last_message": last_message["content"][:100] if last_message else "",
-            "message_count": len(conv["messages"]),
+            "last_message": conv.get("last_message_preview", ""),
+            "message_count": conv.get("message_count", 0),
             "created_at": conv["created_at"].isoformat() + "Z",
             "updated_at": conv["updated_at"].isoformat() + "Z"
         })
     
-    return {"conversations": conversation_list}
+    return {
+        "conversations": conversation_list,
+        "next_cursor": cursor,
+        "has_more": cursor is not None
+    }
 
 
 @router.get("/conversations/{conversation_id}", response_model=ConversationResponse)
@@ -202,14 +379,14 @@ async def get_conversation(
             detail="Conversation not found"
         )
     
-    # Convert messages to Message objects
+    # Load messages in order and convert to Message objects
     messages = [
         Message(
             role=msg["role"],
             content=msg["content"],
             timestamp=msg["timestamp"]
         )
-        for msg in conversation["messages"]
+        for msg in await get_all_messages(db, conversation["_id"])
     ]
     
     return ConversationResponse(
@@ -243,10 +420,10 @@ async def add_message(
         )
     
     # Find conversation
-    conversation = await db.conversations.find_one({
-        "_id": ObjectId(conversation_id),
-        "user_id": current_user.id
-    })
+    conversation = await db.conversations.find_one(
+        {"_id": ObjectId(conversation_id), "user_id": current_user.id},
+        {"_id": 1, "history_summary": 1}
+    )
     
     if not conversation:
         raise HTTPException(
@@ -254,43 +431,28 @@ async def add_message(
             detail="Conversation not found"
         )
     
+    # Only the latest messages (plus the summary of older ones) are used as prompt history
+    history = await get_recent_messages(db, conversation["_id"])
+    
     # Fetch user's financial data for context
     user_data = await fetch_user_financial_data(current_user.id, db)
+    limits = await get_rate_limit_options(current_user.id, db)
     
     # Generate AI response with conversation history
-    ai_response = await ai_service.generate_response(
-        user_message=message_data.message,
-        conversation_history=conversation.get("messages", []),
-        user_data=user_data
-    )
-    
-    # Create new messages
-    now = datetime.utcnow()
-    user_message = {
-        "role": "user",
-        "content": message_data.message,
-        "timestamp": now
-    }
-    assistant_message = {
-        "role": "assistant",
-        "content": ai_response,
-        "timestamp": now
-    }
+    try:
+        ai_response = await ai_service.generate_response(
+            user_message=message_data.message,
+            conversation_history=history,
+            history_summary=conversation.get("history_summary", ""),
+            user_data=user_data,
+            **limits
+        )
+    except RateLimitExceeded as e:
+        raise _rate_limit_error(e)
     
     # Update conversation with new messages
-    await db.conversations.update_one(
-        {"_id": ObjectId(conversation_id)},
-        {
-            "$push": {
-                "messages": {
-                    "$each": [user_message, assistant_message]
-                }
-            },
-            "$set": {
-                "updated_at": now
-            }
-        }
-    )
+    now = datetime.utcnow()
+    await _append_exchange(db, conversation["_id"], current_user.id, message_data.message, ai_response, now)
     
     # Return AI response
     return MessageResponse(
@@ -300,6 +462,82 @@ async def add_message(
     )
 
 
+@router.post("/conversations/{conversation_id}/messages/stream")
+async def add_message_stream(
+    conversation_id: str,
+    message_data: MessageCreate,
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """
+    Add a message to an existing conversation and stream the AI response.
+    
+    Sends Server-Sent Events: one "chunk" event per piece of text as it is
+    generated, then a "done" event with the full response once both
+    messages have been saved to the conversation. If generation fails, an
+    "error" event with a user-facing message ends the stream instead and
+    nothing is saved, so the message can be sent again.
+    """
+    db = get_database()
+    
+    # Validate conversation_id
+    if not ObjectId.is_valid(conversation_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid conversation ID"
+        )
+    
+    # Find conversation
+    conversation = await db.conversations.find_one(
+        {"_id": ObjectId(conversation_id), "user_id": current_user.id},
+        {"_id": 1, "history_summary": 1}
+    )
+    
+    if not conversation:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Conversation not found"
+        )
+    
+    # Only the latest messages (plus the summary of older ones) are used as prompt history
+    history = await get_recent_messages(db, conversation["_id"])
+    
+    # Fetch user's financial data for context
+    user_data = await fetch_user_financial_data(current_user.id, db)
+    limits = await get_rate_limit_options(current_user.id, db)
+    
+    chunks = await _start_stream(ai_service.stream_response(
+        user_message=message_data.message,
+        conversation_history=history,
+        history_summary=conversation.get("history_summary", ""),
+        user_data=user_data,
+        **limits
+    ))
+    
+    async def event_stream():
+        parts = []
+        try:
+            async for chunk in chunks:
+                parts.append(chunk)
+                yield _sse_event({"type": "chunk", "content": chunk})
+        except AIStreamError as e:
+            yield _sse_event({"type": "error", "message": e.message})
+            return
+        
+        # Persist the assembled response once the stream completes
+        ai_response = "".join(parts)
+        now = datetime.utcnow()
+        await _append_exchange(db, conversation["_id"], current_user.id, message_data.message, ai_response, now)
+        
+        yield _sse_event({
+            "type": "done",
+            "role": "assistant",
+            "content": ai_response,
+            "timestamp": now.isoformat() + "Z"
+        })
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 @router.delete("/conversations/{conversation_id}", response_model=dict)
 async def delete_conversation(
     conversation_id: str,
@@ -329,6 +567,8 @@ async def delete_conversation(
             detail="Conversation not found"
         )
     
+    await delete_messages(db, [ObjectId(conversation_id)])
+    
     return {"message": "Conversation deleted successfully"}
 
 
@@ -346,13 +586,18 @@ async def quick_query(
     
     # Fetch user's financial data for context
     user_data = await fetch_user_financial_data(current_user.id, db)
+    limits = await get_rate_limit_options(current_user.id, db)
     
     # Generate AI response
-    ai_response = await ai_service.generate_response(
-        user_message=message_data.message,
-        conversation_history=None,
-        user_data=user_data
-    )
+    try:
+        ai_response = await ai_service.generate_response(
+            user_message=message_data.message,
+            conversation_history=None,
+            user_data=user_data,
+            **limits
+        )
+    except RateLimitExceeded as e:
+        raise _rate_limit_error(e)
     
     return MessageResponse(
         role="assistant",
@@ -361,6 +606,51 @@ async def quick_query(
     )
 
 
+@router.post("/quick-query/stream")
+async def quick_query_stream(
+    message_data: MessageCreate,
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """
+    Stream a quick query response without creating a conversation.
+    
+    Sends Server-Sent Events: "chunk" events as text is generated and a
+    final "done" event with the full response, or an "error" event with a
+    user-facing message if generation fails.
+    """
+    db = get_database()
+    
+    # Fetch user's financial data for context
+    user_data = await fetch_user_financial_data(current_user.id, db)
+    limits = await get_rate_limit_options(current_user.id, db)
+    
+    chunks = await _start_stream(ai_service.stream_response(
+        user_message=message_data.message,
+        conversation_history=None,
+        user_data=user_data,
+        **limits
+    ))
+    
+    async def event_stream():
+        parts = []
+        try:
+            async for chunk in chunks:
+                parts.append(chunk)
+                yield _sse_event({"type": "chunk", "content": chunk})
+        except AIStreamError as e:
+            yield _sse_event({"type": "error", "message": e.message})
+            return
+        
+        yield _sse_event({
+            "type": "done",
+            "role": "assistant",
+            "content": "".join(parts),
+            "timestamp": datetime.utcnow().isoformat() + "Z"
+        })
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 @router.get("/sample-prompts", response_model=dict)
 async def get_sample_prompts_endpoint():
     """
@@ -380,9 +670,11 @@ async def get_cache_stats(current_user: UserInDB = Depends(get_current_user)):
     Returns cache hit rate and other statistics.
     """
     stats = ai_service.get_cache_stats()
-    rate_limit_stats = await ai_service.get_rate_limit_status()
+    rate_limit_stats = await ai_service.get_rate_limit_status(current_user.id)
     
     return {
         "cache": stats,
+        "user_context_cache": user_context_cache.get_stats(),
+        "user_cache": user_cache.get_stats(),
         "rate_limit": rate_limit_stats
     }
\ No newline at end of file
@@ -1,14 +1,20 @@
 """Authentication routes."""
 from datetime import datetime
 from fastapi import APIRouter, HTTPException, status, Depends
-from passlib.hash import argon2
 from bson import ObjectId
 from pydantic import BaseModel, EmailStr
+from pymongo import ReturnDocument
 
 from models.user import UserCreate, UserResponse, UserInDB, UserUpdate
 from auth.jwt import create_access_token
 from auth.dependencies import get_current_user
 from database import get_database
+from services.daily_rollups import delete_rollups_for_user
+from services.conversation_messages import delete_messages
+from services.columnar_export import delete_snapshot
+from services.user_context_cache import user_context_cache
+from services.user_cache import user_cache
+from services.password_hasher import password_hasher
 
 
 router = APIRouter(prefix="/api/v1/auth", tags=["auth"])
@@ -34,7 +40,7 @@ async def signup(user_data: UserCreate):
         )
     
     # Hash password
-    password_hash = argon2.hash(user_data.password)
+    password_hash = await password_hasher.hash(user_data.password)
     
     # Create user document
     user_doc = {
@@ -101,7 +107,7 @@ async def login(login_data: LoginRequest):
         )
     
     # Verify password
-    if not argon2.verify(login_data.password, user_doc["password_hash"]):
+    if not await password_hasher.verify(login_data.password, user_doc["password_hash"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
@@ -178,14 +184,20 @@ async def update_profile(
     if updates.monthly_revenue is not None:
         update_doc["monthly_revenue"] = updates.monthly_revenue
     
-    # Update user in database
-    await db.users.update_one(
+    # Update user and read back the result in one round trip
+    updated_user = await db.users.find_one_and_update(
         {"_id": current_user.id},
-        {"$set": update_doc}
+        {"$set": update_doc},
+        projection={"password_hash": 0},
+        return_document=ReturnDocument.AFTER
     )
+    user_cache.invalidate(current_user.id)
     
-    # Get updated user
-    updated_user = await db.users.find_one({"_id": current_user.id})
+    if not updated_user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
     
     return {
         "user": {
@@ -209,11 +221,17 @@ async def delete_account(current_user: UserInDB = Depends(get_current_user)):
     
     # Delete user
     await db.users.delete_one({"_id": current_user.id})
+    user_cache.invalidate(current_user.id)
     
     # Delete related data (transactions, subscriptions, etc.)
     await db.transactions.delete_many({"user_id": current_user.id})
+    await delete_rollups_for_user(db, current_user.id)
+    user_context_cache.invalidate(current_user.id)
     await db.subscriptions.delete_many({"user_id": current_user.id})
     await db.connected_accounts.delete_many({"user_id": current_user.id})
-    await db.ai_conversations.delete_many({"user_id": current_user.id})
+    conversation_ids = await db.conversations.distinct("_id", {"user_id": current_user.id})
+    await delete_messages(db, conversation_ids)
+    await db.conversations.delete_many({"user_id": current_user.id})
+    await delete_snapshot(db, current_user.id)
     
     return {"message": "Account deleted successfully"}
\ No newline at end of file
@@ -1,7 +1,8 @@
 """Dashboard analytics routes."""
+import asyncio
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends
-from typing import List, Dict
+from typing import List, Dict, Optional
 import random
 
 from models.user import UserInDB
@@ -12,39 +13,145 @@ from database import get_database
 router = APIRouter(prefix="/api/v1/dashboard", tags=["dashboard"])
 
 
-@router.get("/stats", response_model=dict)
-async def get_dashboard_stats(current_user: UserInDB = Depends(get_current_user)):
+# All dashboard panels, in the order they are rendered
+DASHBOARD_PANELS = ["stats", "revenueTrend", "expenseBreakdown", "recentTransactions", "alerts"]
+
+# Transactions listed in the recent transactions panel, newest first
+RECENT_TRANSACTIONS_LIMIT = 5
+RECENT_TRANSACTIONS_SORT = [("date", -1), ("_id", -1)]
+
+
+def _rollup_facets(today: datetime) -> Dict[str, list]:
     """
-    Get financial overview statistics.
+    $facet branches over daily_rollups for the summed panels.
     
-    Calculates:
-    - Monthly revenue (sum of negative amounts)
-    - Total expenses (sum of positive amounts)
-    - Net profit (revenue - expenses)
-    - Cash balance (cumulative)
-    - Percentage changes (mocked with random +/- 5-15%)
+    Each branch runs over the shared month-to-date (or 7-day) $match and
+    narrows its own day range where needed.
     """
-    db = get_database()
+    start_of_month = datetime(today.year, today.month, 1)
+    week_start = today - timedelta(days=6)
     
-    # Get current month's transactions
-    now = datetime.utcnow()
-    start_of_month = datetime(now.year, now.month, 1)
+    return {
+        "stats": [
+            {"$match": {"day": {"$gte": start_of_month}}},
+            {"$group": {"_id": None, "revenue": {"$sum": "$revenue"}, "expenses": {"$sum": "$expenses"}}}
+        ],
+        "revenueTrend": [
+            {"$match": {"day": {"$gte": week_start}}},
+            {"$group": {"_id": "$day", "revenue": {"$sum": "$revenue"}, "expenses": {"$sum": "$expenses"}}}
+        ],
+        "expenseBreakdown": [
+            {"$match": {"day": {"$gte": start_of_month}, "expenses": {"$gt": 0}}},
+            {"$group": {"_id": "$category", "amount": {"$sum": "$expenses"}}},
+            {"$match": {"amount": {"$gt": 0}}},
+            {"$sort": {"amount": -1}}
+        ]
+    }
+
+
+def _transaction_facets(now: datetime) -> Dict[str, list]:
+    """$facet branches over the last 30 days of raw transactions."""
+    return {
+        # Alert inputs: largest expense vs average, last payroll, latest revenue
+        "expenseProfile": [
+            {"$match": {"amount": {"$gt": 0}}},
+            {"$sort": {"amount": -1}},
+            {"$group": {
+                "_id": None,
+                "average": {"$avg": "$amount"},
+                "largest": {"$first": {
+                    "_id": "$_id", "vendor": "$vendor", "amount": "$amount", "date": "$date"
+                }}
+            }}
+        ],
+        "lastPayroll": [
+            {"$match": {"category": {"$regex": "payroll", "$options": "i"}}},
+            {"$sort": {"date": -1}},
+            {"$limit": 1},
+            {"$project": {"amount": 1, "date": 1}}
+        ],
+        "recentRevenue": [
+            {"$match": {"amount": {"$lt": 0}}},
+            {"$sort": {"date": -1}},
+            {"$limit": 14},
+            {"$project": {"amount": 1}}
+        ]
+    }
+
+
+# Facet branches each panel is built from, by source collection
+ROLLUP_PANEL_FACETS = {
+    "stats": ["stats"],
+    "revenueTrend": ["revenueTrend"],
+    "expenseBreakdown": ["expenseBreakdown"]
+}
+TRANSACTION_PANEL_FACETS = {
+    "alerts": ["expenseProfile", "lastPayroll", "recentRevenue"]
+}
+
+
+def dashboard_pipelines(user_id, now: datetime, panels: List[str] = DASHBOARD_PANELS) -> Dict[str, list]:
+    """
+    $match + $facet aggregations behind the requested dashboard panels.
     
-    transactions = await db.transactions.find({
-        "user_id": current_user.id,
-        "date": {"$gte": start_of_month}
-    }).to_list(length=None)
+    Args:
+        user_id: Owner of the transactions
+        now: Current time (UTC)
+        panels: Panel names from DASHBOARD_PANELS
     
-    # Calculate stats
-    monthly_revenue = 0.0
-    total_expenses = 0.0
+    Returns:
+        Dictionary of collection name -> pipeline, for the collections any
+        requested panel reads
+    """
+    today = datetime(now.year, now.month, now.day)
+    rollup_start = min(datetime(today.year, today.month, 1), today - timedelta(days=6))
+    
+    sources = [
+        ("daily_rollups", {"user_id": user_id, "day": {"$gte": rollup_start}}, _rollup_facets(today), ROLLUP_PANEL_FACETS),
+        ("transactions", {"user_id": user_id, "date": {"$gte": now - timedelta(days=30)}}, _transaction_facets(now), TRANSACTION_PANEL_FACETS)
+    ]
+    
+    pipelines = {}
+    for collection_name, match, all_facets, panel_facets in sources:
+        facets = {
+            name: all_facets[name]
+            for panel in panels if panel in panel_facets
+            for name in panel_facets[panel]
+        }
+        if facets:
+            pipelines[collection_name] = [{"$match": match}, {"$facet": facets}]
+    
+    return pipelines
+
+
+async def _run_facets(collection, pipeline: Optional[list]) -> Dict[str, list]:
+    """Run a $match + $facet aggregation, returning {} when there is none."""
+    if not pipeline:
+        return {}
     
-    for trans in transactions:
-        amount = trans["amount"]
-        if amount < 0:  # Revenue (negative amounts)
-            monthly_revenue += abs(amount)
-        else:  # Expenses (positive amounts)
-            total_expenses += amount
+    result = await collection.aggregate(pipeline).to_list(length=1)
+    return result[0] if result else {name: [] for name in pipeline[-1]["$facet"]}
+
+
+async def _recent_transactions(db, user_id, limit: int) -> List[dict]:
+    """Latest transactions of any age, newest first ([] when limit is 0)."""
+    if not limit:
+        return []
+    
+    cursor = db.transactions.find({"user_id": user_id}).sort(RECENT_TRANSACTIONS_SORT).limit(limit)
+    return await cursor.to_list(length=limit)
+
+
+async def _category_colors(db) -> Dict[str, str]:
+    """Map category names to their display colors."""
+    categories = await db.categories.find({}, {"name": 1, "color": 1}).to_list(length=None)
+    return {cat["name"]: cat["color"] for cat in categories}
+
+
+def _format_stats(rows: List[dict]) -> dict:
+    """Build the stats payload from monthly total rows."""
+    monthly_revenue = sum(row["revenue"] for row in rows)
+    total_expenses = sum(row["expenses"] for row in rows)
     
     net_profit = monthly_revenue - total_expenses
     
@@ -69,127 +176,48 @@ async def get_dashboard_stats(current_user: UserInDB = Depends(get_current_user)
     }
 
 
-@router.get("/revenue-trend", response_model=dict)
-async def get_revenue_trend(current_user: UserInDB = Depends(get_current_user)):
-    """
-    Get revenue vs expenses trend for the last 7 days.
-    
-    Returns daily revenue and expenses grouped by date.
-    """
-    db = get_database()
-    
-    # Get last 7 days of transactions
-    now = datetime.utcnow()
-    seven_days_ago = now - timedelta(days=7)
+def _format_revenue_trend(rows: List[dict], now: datetime) -> List[dict]:
+    """Build the 7-day trend series from daily total rows, filling empty days."""
+    daily_data: Dict[str, dict] = {row["_id"].strftime("%b %d"): row for row in rows}
     
-    transactions = await db.transactions.find({
-        "user_id": current_user.id,
-        "date": {"$gte": seven_days_ago}
-    }).to_list(length=None)
-    
-    # Group by date
-    daily_data: Dict[str, Dict[str, float]] = {}
-    
-    for trans in transactions:
-        date_str = trans["date"].strftime("%b %d")
-        
-        if date_str not in daily_data:
-            daily_data[date_str] = {"revenue": 0.0, "expenses": 0.0}
-        
-        amount = trans["amount"]
-        if amount < 0:  # Revenue
-            daily_data[date_str]["revenue"] += abs(amount)
-        else:  # Expenses
-            daily_data[date_str]["expenses"] += amount
-    
-    # Convert to array format
     data = []
     for i in range(7):
         date = now - timedelta(days=6-i)
         date_str = date.strftime("%b %d")
+        day = daily_data.get(date_str, {})
         
         data.append({
             "date": date_str,
-            "revenue": round(daily_data.get(date_str, {}).get("revenue", 0), 2),
-            "expenses": round(daily_data.get(date_str, {}).get("expenses", 0), 2)
+            "revenue": round(day.get("revenue", 0), 2),
+            "expenses": round(day.get("expenses", 0), 2)
         })
     
-    return {"data": data}
+    return data
 
 
-@router.get("/expense-breakdown", response_model=dict)
-async def get_expense_breakdown(current_user: UserInDB = Depends(get_current_user)):
-    """
-    Get expense breakdown by category.
-    
-    Returns category-wise expense distribution with percentages and colors.
-    """
-    db = get_database()
-    
-    # Get current month's expense transactions
-    now = datetime.utcnow()
-    start_of_month = datetime(now.year, now.month, 1)
-    
-    transactions = await db.transactions.find({
-        "user_id": current_user.id,
-        "date": {"$gte": start_of_month},
-        "amount": {"$gt": 0}  # Only expenses (positive amounts)
-    }).to_list(length=None)
-    
-    # Group by category
-    category_totals: Dict[str, float] = {}
-    
-    for trans in transactions:
-        category = trans["category"]
-        amount = trans["amount"]
-        
-        if category not in category_totals:
-            category_totals[category] = 0.0
-        
-        category_totals[category] += amount
-    
-    # Calculate total expenses
-    total_expenses = sum(category_totals.values())
+def _format_expense_breakdown(rows: List[dict], category_colors: Dict[str, str]) -> List[dict]:
+    """Build the category breakdown with percentages and colors."""
+    total_expenses = sum(row["amount"] for row in rows)
     
-    # Get category colors from categories collection
-    categories = await db.categories.find({}).to_list(length=None)
-    category_colors = {cat["name"]: cat["color"] for cat in categories}
-    
-    # Build response data
     data = []
-    for category, amount in sorted(category_totals.items(), key=lambda x: x[1], reverse=True):
+    for row in rows:
+        amount = row["amount"]
         percentage = (amount / total_expenses * 100) if total_expenses > 0 else 0
         
         data.append({
-            "category": category,
+            "category": row["_id"],
             "amount": round(amount, 2),
             "percentage": round(percentage, 1),
-            "color": category_colors.get(category, "#6366f1")  # Default color if not found
+            "color": category_colors.get(row["_id"], "#6366f1")  # Default color if not found
         })
     
-    return {"data": data}
+    return data
 
 
-@router.get("/recent-transactions", response_model=dict)
-async def get_recent_transactions(current_user: UserInDB = Depends(get_current_user)):
-    """
-    Get 5 most recent transactions.
-    
-    Returns the latest transactions sorted by date.
-    """
-    db = get_database()
-    
-    # Get 5 most recent transactions
-    transactions_cursor = db.transactions.find({
-        "user_id": current_user.id
-    }).sort("date", -1).limit(5)
-    
-    transactions = await transactions_cursor.to_list(length=5)
-    
-    # Convert to response format
-    transaction_list = []
-    for trans in transactions:
-        transaction_list.append({
+def _format_recent_transactions(rows: List[dict]) -> List[dict]:
+    """Build the recent transactions list."""
+    return [
+        {
             "id": str(trans["_id"]),
             "date": trans["date"].isoformat() + "Z",
             "vendor": trans["vendor"],
@@ -199,60 +227,41 @@ async def get_recent_transactions(current_user: UserInDB = Depends(get_current_u
             "status": trans["status"],
             "explanation": trans["explanation"],
             "paymentMethod": trans["payment_method"]
-        })
-    
-    return {"transactions": transaction_list}
+        }
+        for trans in rows
+    ]
 
 
-@router.get("/alerts", response_model=dict)
-async def get_alerts(current_user: UserInDB = Depends(get_current_user)):
+def _format_alerts(facets: Dict[str, list], now: datetime) -> List[dict]:
     """
-    Get financial alerts and notifications.
-    
-    Generates smart alerts based on transaction patterns:
+    Generate smart alerts from the alert facet rows:
     - Unusual expenses (3x typical amount)
     - Upcoming payroll
     - Revenue trends
     """
-    db = get_database()
-    
     alerts = []
-    now = datetime.utcnow()
-    
-    # Get recent transactions for analysis
-    thirty_days_ago = now - timedelta(days=30)
-    transactions = await db.transactions.find({
-        "user_id": current_user.id,
-        "date": {"$gte": thirty_days_ago}
-    }).to_list(length=None)
     
     # Check for unusual expenses (3x typical amount)
-    expense_amounts = [t["amount"] for t in transactions if t["amount"] > 0]
-    if expense_amounts:
-        avg_expense = sum(expense_amounts) / len(expense_amounts)
+    if facets["expenseProfile"]:
+        profile = facets["expenseProfile"][0]
+        largest = profile["largest"]
         
-        for trans in transactions:
-            if trans["amount"] > 0 and trans["amount"] > (avg_expense * 3):
-                alerts.append({
-                    "id": str(trans["_id"]),
-                    "type": "warning",
-                    "title": "Unusual Expense Detected",
-                    "message": f"{trans['vendor']} purchase of ${trans['amount']:.2f} is 3x your typical expense. Review to ensure proper categorization.",
-                    "date": trans["date"].isoformat() + "Z",
-                    "actionable": True
-                })
-                break  # Only show one unusual expense alert
+        if largest["amount"] > (profile["average"] * 3):
+            alerts.append({
+                "id": str(largest["_id"]),
+                "type": "warning",
+                "title": "Unusual Expense Detected",
+                "message": f"{largest['vendor']} purchase of ${largest['amount']:.2f} is 3x your typical expense. Review to ensure proper categorization.",
+                "date": largest["date"].isoformat() + "Z",
+                "actionable": True
+            })
     
     # Check for upcoming payroll
-    payroll_transactions = [t for t in transactions if "payroll" in t["category"].lower()]
-    if payroll_transactions:
-        # Sort by date and get the most recent
-        payroll_transactions.sort(key=lambda x: x["date"], reverse=True)
-        last_payroll = payroll_transactions[0]
-        last_payroll_date = last_payroll["date"]
+    if facets["lastPayroll"]:
+        last_payroll = facets["lastPayroll"][0]
         
         # Assume bi-weekly payroll (14 days)
-        next_payroll_date = last_payroll_date + timedelta(days=14)
+        next_payroll_date = last_payroll["date"] + timedelta(days=14)
         days_until_payroll = (next_payroll_date - now).days
         
         if 0 <= days_until_payroll <= 7:
@@ -265,12 +274,11 @@ async def get_alerts(current_user: UserInDB = Depends(get_current_user)):
                 "actionable": False
             })
     
-    # Check revenue trends
-    revenue_amounts = [abs(t["amount"]) for t in transactions if t["amount"] < 0]
+    # Check revenue trends (latest 7 revenue transactions vs the 7 before)
+    revenue_amounts = [abs(t["amount"]) for t in facets["recentRevenue"]]
     if len(revenue_amounts) >= 7:
-        # Compare last 7 days vs previous 7 days
         recent_revenue = sum(revenue_amounts[:7])
-        previous_revenue = sum(revenue_amounts[7:14]) if len(revenue_amounts) >= 14 else sum(revenue_amounts[7:])
+        previous_revenue = sum(revenue_amounts[7:14])
         
         if previous_revenue > 0:
             change_percent = ((recent_revenue - previous_revenue) / previous_revenue) * 100
@@ -294,4 +302,127 @@ async def get_alerts(current_user: UserInDB = Depends(get_current_user)):
                     "actionable": True
                 })
     
-    return {"alerts": alerts}
\ No newline at end of file
+    return alerts
+
+
+async def _dashboard_summary(db, user_id, panels: List[str] = DASHBOARD_PANELS) -> dict:
+    """
+    Compute the requested dashboard panels.
+    
+    Totals come from one $facet over the user's daily_rollups (at most a
+    month of small documents) and alerts from one $facet over the last 30
+    days of raw transactions. Recent transactions are the latest ones of
+    any age, read from the (user_id, date) index. All three run concurrently.
+    
+    Args:
+        db: Database instance
+        user_id: Owner of the transactions
+        panels: Panel names from DASHBOARD_PANELS
+    
+    Returns:
+        Dictionary of panel name -> response payload
+    """
+    now = datetime.utcnow()
+    pipelines = dashboard_pipelines(user_id, now, panels)
+    
+    rollup_rows, transaction_rows, recent_rows = await asyncio.gather(
+        _run_facets(db.daily_rollups, pipelines.get("daily_rollups")),
+        _run_facets(db.transactions, pipelines.get("transactions")),
+        _recent_transactions(db, user_id, RECENT_TRANSACTIONS_LIMIT if "recentTransactions" in panels else 0)
+    )
+    
+    summary = {}
+    if "stats" in panels:
+        summary["stats"] = _format_stats(rollup_rows["stats"])
+    if "revenueTrend" in panels:
+        summary["revenueTrend"] = _format_revenue_trend(rollup_rows["revenueTrend"], now)
+    if "expenseBreakdown" in panels:
+        category_colors = await _category_colors(db)
+        summary["expenseBreakdown"] = _format_expense_breakdown(rollup_rows["expenseBreakdown"], category_colors)
+    if "recentTransactions" in panels:
+        summary["recentTransactions"] = _format_recent_transactions(recent_rows)
+    if "alerts" in panels:
+        summary["alerts"] = _format_alerts(transaction_rows, now)
+    
+    return summary
+
+
+@router.get("/summary", response_model=dict)
+async def get_dashboard_summary(current_user: UserInDB = Depends(get_current_user)):
+    """
+    Get every dashboard panel in one request.
+    
+    Returns stats, revenueTrend, expenseBreakdown, recentTransactions and
+    alerts, computed from the daily rollups, the last 30 days of
+    transactions and the 5 most recent transactions.
+    """
+    db = get_database()
+    return await _dashboard_summary(db, current_user.id)
+
+
+@router.get("/stats", response_model=dict)
+async def get_dashboard_stats(current_user: UserInDB = Depends(get_current_user)):
+    """
+    Get financial overview statistics.
+    
+    Calculates:
+    - Monthly revenue (sum of negative amounts)
+    - Total expenses (sum of positive amounts)
+    - Net profit (revenue - expenses)
+    - Cash balance (cumulative)
+    - Percentage changes (mocked with random +/- 5-15%)
+    """
+    db = get_database()
+    summary = await _dashboard_summary(db, current_user.id, ["stats"])
+    return summary["stats"]
+
+
+@router.get("/revenue-trend", response_model=dict)
+async def get_revenue_trend(current_user: UserInDB = Depends(get_current_user)):
+    """
+    Get revenue vs expenses trend for the last 7 days.
+    
+    Returns daily revenue and expenses grouped by date.
+    """
+    db = get_database()
+    summary = await _dashboard_summary(db, current_user.id, ["revenueTrend"])
+    return {"data": summary["revenueTrend"]}
+
+
+@router.get("/expense-breakdown", response_model=dict)
+async def get_expense_breakdown(current_user: UserInDB = Depends(get_current_user)):
+    """
+    Get expense breakdown by category.
+    
+    Returns category-wise expense distribution with percentages and colors.
+    """
+    db = get_database()
+    summary = await _dashboard_summary(db, current_user.id, ["expenseBreakdown"])
+    return {"data": summary["expenseBreakdown"]}
+
+
+@router.get("/recent-transactions", response_model=dict)
+async def get_recent_transactions(current_user: UserInDB = Depends(get_current_user)):
+    """
+    Get 5 most recent transactions.
+    
+    Returns the latest transactions sorted by date.
+    """
+    db = get_database()
+    summary = await _dashboard_summary(db, current_user.id, ["recentTransactions"])
+    return {"transactions": summary["recentTransactions"]}
+
+
+@router.get("/alerts", response_model=dict)
+async def get_alerts(current_user: UserInDB = Depends(get_current_user)):
+    """
+    Get financial alerts and notifications.
+    
+    Generates smart alerts based on transaction patterns:
+    - Unusual expenses (3x typical amount)
+    - Upcoming payroll
+    - Revenue trends
+    """
+    db = get_database()
+    summary = await _dashboard_summary(db, current_user.id, ["alerts"])
+    return {"alerts": summary["alerts"]}
@@ -0,0 +1,45 @@
+"""Background job status routes."""
+from fastapi import APIRouter, HTTPException, status, Depends
+from bson import ObjectId
+
+from models.user import UserInDB
+from auth.dependencies import get_current_user
+from database import get_database
+from services.job_queue import job_to_response
+
+
+router = APIRouter(prefix="/api/v1/jobs", tags=["jobs"])
+
+
+@router.get("/{job_id}", response_model=dict)
+async def get_job(
+    job_id: str,
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """
+    Get the status of a background job (account sync, sample-data seeding).
+    
+    Status is one of queued, running, succeeded or failed; result holds the
+    job's output once it has succeeded and error the last failure message.
+    """
+    db = get_database()
+    
+    # Validate job_id
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid job ID"
+        )
+    
+    job = await db.jobs.find_one(
+        {"_id": ObjectId(job_id), "user_id": current_user.id},
+        {"payload": 0, "lease_expires_at": 0}
+    )
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    return job_to_response(job)
@@ -16,6 +16,7 @@ from config import settings
 from auth.dependencies import get_current_user
 from models.user import UserInDB
 from database import get_database
+from services.user_cache import user_cache
 
 
 router = APIRouter(prefix="/api/plaid", tags=["plaid"])
@@ -147,6 +148,7 @@ async def exchange_public_token(
                 }
             }
         )
+        user_cache.invalidate(current_user.id)
         
         return ExchangeTokenResponse(
             access_token=access_token,
@@ -10,6 +10,7 @@ from config import settings
 from auth.dependencies import get_current_user
 from models.user import UserInDB
 from database import get_database
+from services.user_cache import user_cache
 
 
 router = APIRouter(prefix="/api/stripe", tags=["stripe"])
@@ -121,6 +122,7 @@ async def stripe_callback(code: str, state: str):
                 }
             }
         )
+        user_cache.invalidate(user_id)
         
         # Redirect back to frontend with success
         frontend_url = settings.cors_origins.split(",")[0]
@@ -383,6 +385,7 @@ async def disconnect_stripe(current_user: UserInDB = Depends(get_current_user)):
                 }
             }
         )
+        user_cache.invalidate(current_user.id)
         
         return {"message": "Stripe account disconnected successfully"}
         
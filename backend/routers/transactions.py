@@ -1,56 +1,236 @@
 """Transaction routes."""
+import csv
+import io
+import json
+import re
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, status, Depends
+from typing import AsyncIterator, List, Optional, Tuple
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi.responses import StreamingResponse
 from bson import ObjectId
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 
 from models.user import UserInDB
 from auth.dependencies import get_current_user
 from database import get_database
 from services.transaction_generator import generate_transactions_for_source
+from services.pagination import (
+    decode_cursor,
+    keyset_filter,
+    next_cursor,
+    decode_ranked_cursor,
+    ranked_keyset_filter,
+    next_ranked_cursor
+)
+from services.daily_rollups import add_to_rollups, move_in_rollups, move_many_in_rollups, rebuild_rollups_for_user
+from services.user_context_cache import user_context_cache
+from services.job_queue import job_queue, job_to_response
+from services.columnar_export import (
+    COLUMNAR_PROJECTION,
+    SNAPSHOT_COLLECTION,
+    append_snapshot,
+    columnar_available,
+    invalidate_snapshot,
+    snapshot_directory,
+    stream_columnar
+)
 
 
 router = APIRouter(prefix="/api/v1/transactions", tags=["transactions"])
 
+# Page size bounds for the transaction list
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
 
-class SyncRequest(BaseModel):
-    """Transaction sync request schema."""
-    source: str
+# Only the fields returned by the API are read from MongoDB
+TRANSACTION_PROJECTION = {
+    "date": 1,
+    "vendor": 1,
+    "amount": 1,
+    "category": 1,
+    "confidence": 1,
+    "status": 1,
+    "explanation": 1,
+    "payment_method": 1,
+    "original_description": 1
+}
 
+# Transaction list order: newest first, ties broken by _id
+TRANSACTION_LIST_SORT = [("date", -1), ("_id", -1)]
 
-@router.post("/sync", response_model=dict)
-async def sync_transactions(
-    sync_data: SyncRequest,
-    current_user: UserInDB = Depends(get_current_user)
-):
+# Most transactions a single bulk update may change
+MAX_BULK_UPDATE = 5000
+
+VALID_STATUSES = ["auto-approved", "needs-review", "manual"]
+
+# Documents fetched per cursor batch (and rows per streamed chunk) when exporting
+EXPORT_BATCH_SIZE = 1000
+
+# Export order: oldest first
+EXPORT_SORT = [("date", 1), ("_id", 1)]
+
+# Columns of the ledger export, in order
+EXPORT_FIELDS = [
+    "id", "date", "vendor", "amount", "category", "confidence",
+    "status", "explanation", "payment_method", "original_description"
+]
+
+# Leading characters that make spreadsheets evaluate a CSV cell as a formula
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet"
+}
+
+# Formats written by services.columnar_export (need pyarrow)
+COLUMNAR_FORMATS = ("arrow", "parquet")
+
+# Limits on search input (terms beyond these are ignored)
+MAX_SEARCH_TERMS = 10
+MAX_SEARCH_TERM_LENGTH = 40
+
+
+def _transaction_to_response(trans: dict) -> dict:
+    """Convert a transaction document to its API representation."""
+    return {
+        "id": str(trans["_id"]),
+        "date": trans["date"].isoformat() + "Z",
+        "vendor": trans["vendor"],
+        "amount": trans["amount"],
+        "category": trans["category"],
+        "confidence": trans["confidence"],
+        "status": trans["status"],
+        "explanation": trans["explanation"],
+        "payment_method": trans["payment_method"],
+        "original_description": trans.get("original_description")
+    }
+
+
+def _search_terms(search: str) -> str:
     """
-    Simulate syncing transactions from a connected account.
+    Normalize user search input for a $text query.
     
-    Generates mock transaction data based on the account source (Square, Stripe, or Bank).
+    Keeps lowercase words (any script's letters and digits) only, so quotes,
+    negation and other text-search operators in the input are never
+    interpreted.
     """
-    db = get_database()
+    words = re.findall(r"\w+", search.lower(), re.UNICODE)
+    return " ".join(word[:MAX_SEARCH_TERM_LENGTH] for word in words[:MAX_SEARCH_TERMS])
+
+
+def transaction_list_query(
+    user_id: ObjectId,
+    status_filter: Optional[str] = None,
+    after: Optional[Tuple[datetime, ObjectId]] = None
+) -> dict:
+    """
+    Filter for a page of a user's transactions in TRANSACTION_LIST_SORT order.
     
-    # Validate source
-    valid_sources = ["square", "stripe", "bank"]
-    source = sync_data.source.lower()
+    Args:
+        user_id: Owner of the transactions
+        status_filter: Only this status ("all" or None for any)
+        after: Decoded (date, _id) cursor of the previous page
     
-    if source not in valid_sources:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid source. Must be one of: {', '.join(valid_sources)}"
-        )
+    Returns:
+        MongoDB filter
+    """
+    query = {"user_id": user_id}
     
-    # Check if user has this account connected
-    connected_account = await db.connected_accounts.find_one({
-        "user_id": current_user.id,
-        "source": source
-    })
+    if status_filter and status_filter != "all":
+        query["status"] = status_filter
     
-    if not connected_account:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"No {source} account connected. Please connect the account first."
-        )
+    if after:
+        query["$and"] = [keyset_filter("date", *after)]
+    
+    return query
+
+
+def transaction_search_pipeline(
+    query: dict,
+    terms: str,
+    limit: int,
+    after: Optional[Tuple[float, datetime, ObjectId]] = None
+) -> List[dict]:
+    """
+    Aggregation for a relevance-ordered page of transactions matching terms.
+    
+    Args:
+        query: Filter from transaction_list_query (without a cursor)
+        terms: Normalized search terms from _search_terms
+        limit: Rows to return (one more is fetched to detect another page)
+        after: Decoded (score, date, _id) cursor of the previous page
+    
+    Returns:
+        Aggregation pipeline
+    """
+    pipeline = [
+        {"$match": {**query, "$text": {"$search": terms}}},
+        {"$addFields": {"score": {"$meta": "textScore"}}}
+    ]
+    
+    if after:
+        pipeline.append({"$match": ranked_keyset_filter("score", "date", *after)})
+    
+    pipeline += [
+        {"$sort": {"score": -1, "date": -1, "_id": -1}},
+        {"$limit": limit + 1},
+        {"$project": {**TRANSACTION_PROJECTION, "score": 1}}
+    ]
+    return pipeline
+
+
+def export_query(
+    user_id: ObjectId,
+    status_filter: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> dict:
+    """
+    Filter for a ledger export.
+    
+    Args:
+        user_id: Owner of the transactions
+        status_filter: Only this status ("all" or None for any)
+        start: Only transactions on or after this date
+        end: Only transactions before this date
+    
+    Returns:
+        MongoDB filter
+    """
+    query = transaction_list_query(user_id, status_filter)
+    
+    if start or end:
+        query["date"] = {}
+        if start:
+            query["date"]["$gte"] = start
+        if end:
+            query["date"]["$lt"] = end
+    
+    return query
+
+
+class SyncRequest(BaseModel):
+    """Transaction sync request schema."""
+    source: str
+
+
+@job_queue.handler("sync_transactions")
+async def run_sync_job(db, job: dict) -> dict:
+    """Generate and insert mock transactions for a sync job."""
+    user_id = job["user_id"]
+    source = job["payload"]["source"]
+    
+    # Undo whatever an earlier failed attempt of this job inserted
+    if job["attempts"] > 1:
+        removed = await db.transactions.delete_many({"user_id": user_id, "sync_job_id": job["_id"]})
+        if removed.deleted_count:
+            await rebuild_rollups_for_user(db, user_id)
+            await invalidate_snapshot(db, user_id)
     
     # Generate mock transactions
     mock_transactions = generate_transactions_for_source(source)
@@ -59,7 +239,7 @@ async def sync_transactions(
     transactions_to_insert = []
     for trans in mock_transactions:
         transaction_doc = {
-            "user_id": current_user.id,
+            "user_id": user_id,
             "date": trans["date"],
             "vendor": trans["vendor"],
             "amount": trans["amount"],
@@ -69,6 +249,7 @@ async def sync_transactions(
             "explanation": trans["explanation"],
             "payment_method": trans["payment_method"],
             "original_description": trans.get("original_description"),
+            "sync_job_id": job["_id"],
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow()
         }
@@ -78,66 +259,457 @@ async def sync_transactions(
     if transactions_to_insert:
         result = await db.transactions.insert_many(transactions_to_insert)
         count = len(result.inserted_ids)
+        await add_to_rollups(db, transactions_to_insert)
+        user_context_cache.invalidate(user_id)
     else:
         count = 0
     
-    return {
-        "message": "Sync completed successfully",
-        "count": count,
+    return {"count": count, "source": source}
+
+
+@router.post("/sync", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
+async def sync_transactions(
+    sync_data: SyncRequest,
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """
+    Simulate syncing transactions from a connected account.
+    
+    Generates mock transaction data based on the account source (Square, Stripe, or Bank)
+    in a background job. Returns immediately; poll GET /api/v1/jobs/{id} for the result.
+    """
+    db = get_database()
+    
+    # Validate source
+    valid_sources = ["square", "stripe", "bank"]
+    source = sync_data.source.lower()
+    
+    if source not in valid_sources:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid source. Must be one of: {', '.join(valid_sources)}"
+        )
+    
+    # Check if user has this account connected
+    connected_account = await db.connected_accounts.find_one({
+        "user_id": current_user.id,
         "source": source
+    })
+    
+    if not connected_account:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No {source} account connected. Please connect the account first."
+        )
+    
+    job = await job_queue.enqueue("sync_transactions", current_user.id, {"source": source})
+    
+    return {
+        "message": "Sync started",
+        "source": source,
+        "job": job_to_response(job)
     }
 
 
 @router.get("", response_model=dict)
 async def get_transactions(
-    status: str = None,
-    search: str = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    search: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
     current_user: UserInDB = Depends(get_current_user)
 ):
     """
-    Get all transactions for the current user with optional filtering.
+    Get a page of transactions for the current user with optional filtering.
+    
+    Results are ordered newest first and paginated by (date, _id) keyset.
+    With a search, results are ordered by relevance (then newest first) and
+    paginated by (relevance, date, _id).
     
     Query parameters:
     - status: Filter by status (all, auto-approved, needs-review, manual)
-    - search: Search by vendor or category name
+    - search: Words to match in vendor or category name
+    - limit: Page size (default 50, max 500)
+    - after: Cursor returned as next_cursor by the previous page
     """
     db = get_database()
     
-    # Build query
+    if search is not None and search.strip():
+        query = transaction_list_query(current_user.id, status_filter)
+        return await _search_transactions(db, query, _search_terms(search), limit, after)
+    
+    # Resume after the cursor
+    after_key = None
+    if after:
+        try:
+            after_key = decode_cursor(after)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+    
+    # Fetch one extra row to know whether another page exists
+    transactions_cursor = db.transactions.find(
+        transaction_list_query(current_user.id, status_filter, after_key), TRANSACTION_PROJECTION
+    ).sort(TRANSACTION_LIST_SORT).limit(limit + 1)
+    transactions = await transactions_cursor.to_list(length=limit + 1)
+    
+    cursor = next_cursor(transactions, "date", limit)
+    
+    return {
+        "transactions": [_transaction_to_response(trans) for trans in transactions],
+        "next_cursor": cursor,
+        "has_more": cursor is not None
+    }
+
+
+async def _search_transactions(db, query: dict, terms: str, limit: int, after: Optional[str]) -> dict:
+    """
+    Get a relevance-ordered page of transactions matching search terms.
+    
+    Uses the (user_id, vendor/category) text index; the status filter and
+    the keyset cursor are applied to the matches.
+    """
+    if not terms:
+        # Nothing searchable in the input (e.g. only punctuation)
+        return {"transactions": [], "next_cursor": None, "has_more": False}
+    
+    # Resume after the cursor
+    after_key = None
+    if after:
+        try:
+            after_key = decode_ranked_cursor(after)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+    
+    # Fetch one extra row to know whether another page exists
+    pipeline = transaction_search_pipeline(query, terms, limit, after_key)
+    transactions = await db.transactions.aggregate(pipeline).to_list(length=limit + 1)
+    
+    cursor = next_ranked_cursor(transactions, "score", "date", limit)
+    
+    return {
+        "transactions": [_transaction_to_response(trans) for trans in transactions],
+        "next_cursor": cursor,
+        "has_more": cursor is not None
+    }
+
+
+class BulkTransactionFilter(BaseModel):
+    """Selects transactions by their current values."""
+    status: Optional[str] = None
+    category: Optional[str] = None
+
+
+class BulkUpdateTransactionsRequest(BaseModel):
+    """Bulk transaction update request schema (ids or filter, not both)."""
+    ids: Optional[List[str]] = Field(None, max_length=MAX_BULK_UPDATE)
+    filter: Optional[BulkTransactionFilter] = None
+    category: Optional[str] = None
+    status: Optional[str] = None
+
+
+@router.patch("/bulk", response_model=dict)
+async def bulk_update_transactions(
+    update_data: BulkUpdateTransactionsRequest,
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """
+    Change the category and/or status of many transactions at once.
+    
+    Transactions are selected by ids or by a filter on their current status
+    and category (up to 5000). All changes are written with one unordered
+    bulk_write and the daily rollups are updated once for the whole batch.
+    
+    Each update only applies if the transaction's date, amount and category
+    are still the values the rollups are moved from; a transaction changed
+    concurrently is reported as a conflict and left untouched.
+    
+    Returns a result per transaction: updated, unchanged, not_found,
+    invalid_id, conflict or failed.
+    """
+    db = get_database()
+    
+    if (update_data.ids is None) == (update_data.filter is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide either ids or filter"
+        )
+    
+    if update_data.category is None and update_data.status is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Nothing to update: provide category and/or status"
+        )
+    
+    if update_data.status is not None and update_data.status not in VALID_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid status. Must be one of: {', '.join(VALID_STATUSES)}"
+        )
+    
+    changes = {}
+    if update_data.category is not None:
+        changes["category"] = update_data.category
+    if update_data.status is not None:
+        changes["status"] = update_data.status
+    
+    # Resolve the target transactions with one query
+    results = {}
     query = {"user_id": current_user.id}
     
-    # Add status filter
-    if status and status != "all":
-        query["status"] = status
+    if update_data.ids is not None:
+        object_ids = []
+        for transaction_id in dict.fromkeys(update_data.ids):
+            if ObjectId.is_valid(transaction_id):
+                object_ids.append(ObjectId(transaction_id))
+                results[transaction_id] = {"id": transaction_id, "result": "not_found"}
+            else:
+                results[transaction_id] = {"id": transaction_id, "result": "invalid_id"}
+        query["_id"] = {"$in": object_ids}
+    else:
+        if update_data.filter.status is not None:
+            query["status"] = update_data.filter.status
+        if update_data.filter.category is not None:
+            query["category"] = update_data.filter.category
     
-    # Add search filter
-    if search:
-        query["$or"] = [
-            {"vendor": {"$regex": search, "$options": "i"}},
-            {"category": {"$regex": search, "$options": "i"}}
-        ]
+    transactions = await db.transactions.find(
+        query, {"user_id": 1, "date": 1, "amount": 1, "category": 1, "status": 1}
+    ).to_list(length=MAX_BULK_UPDATE + 1)
     
-    # Fetch transactions
-    transactions_cursor = db.transactions.find(query).sort("date", -1)
-    transactions = await transactions_cursor.to_list(length=None)
+    if len(transactions) > MAX_BULK_UPDATE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Filter matches more than {MAX_BULK_UPDATE} transactions; narrow it down"
+        )
     
-    # Convert to response format
-    transaction_list = []
+    # One update per transaction that actually changes
+    now = datetime.utcnow()
+    pending = []
     for trans in transactions:
-        transaction_list.append({
-            "id": str(trans["_id"]),
-            "date": trans["date"].isoformat() + "Z",
-            "vendor": trans["vendor"],
-            "amount": trans["amount"],
-            "category": trans["category"],
-            "confidence": trans["confidence"],
-            "status": trans["status"],
-            "explanation": trans["explanation"],
-            "payment_method": trans["payment_method"],
-            "original_description": trans.get("original_description")
-        })
+        transaction_id = str(trans["_id"])
+        if all(trans.get(field) == value for field, value in changes.items()):
+            results[transaction_id] = {"id": transaction_id, "result": "unchanged"}
+        else:
+            pending.append(trans)
+    
+    failed = {}
+    conflicts = set()
+    if pending:
+        operations = [
+            UpdateOne(
+                {
+                    "_id": trans["_id"],
+                    "user_id": current_user.id,
+                    # Unchanged since read, so the rollup move below is right
+                    "date": trans["date"],
+                    "amount": trans["amount"],
+                    "category": trans["category"]
+                },
+                {"$set": {**changes, "updated_at": now}}
+            )
+            for trans in pending
+        ]
+        try:
+            result = await db.transactions.bulk_write(operations, ordered=False)
+            matched = result.matched_count
+        except BulkWriteError as e:
+            # Unordered: every other operation was still applied
+            failed = {error["index"]: error.get("errmsg", "Write failed") for error in e.details["writeErrors"]}
+            matched = e.details["nMatched"]
+        
+        if matched < len(pending) - len(failed):
+            # Some transactions changed since they were read; find which
+            attempted = [trans["_id"] for index, trans in enumerate(pending) if index not in failed]
+            applied = {
+                trans["_id"]
+                for trans in await db.transactions.find(
+                    {"_id": {"$in": attempted}, "updated_at": now}, {"_id": 1}
+                ).to_list(length=None)
+            }
+            conflicts = set(attempted) - applied
+    
+    updated = []
+    for index, trans in enumerate(pending):
+        transaction_id = str(trans["_id"])
+        if index in failed:
+            results[transaction_id] = {"id": transaction_id, "result": "failed", "error": failed[index]}
+        elif trans["_id"] in conflicts:
+            results[transaction_id] = {
+                "id": transaction_id,
+                "result": "conflict",
+                "error": "Transaction changed during the update; retry"
+            }
+        else:
+            results[transaction_id] = {"id": transaction_id, "result": "updated"}
+            updated.append(trans)
+    
+    # Keep the daily rollups in step with category changes, once per batch
+    if updated:
+        if "category" in changes:
+            await move_many_in_rollups(db, updated, [{**trans, **changes} for trans in updated])
+        user_context_cache.invalidate(current_user.id)
+    
+    summary = {}
+    for item in results.values():
+        summary[item["result"]] = summary.get(item["result"], 0) + 1
+    
+    return {
+        "matched": len(transactions),
+        "updated": len(updated),
+        "summary": summary,
+        "results": list(results.values())
+    }
+
+
+def _csv_safe(row: dict) -> dict:
+    """Prefix text cells that a spreadsheet would run as a formula with a quote."""
+    return {
+        field: "'" + value if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES) else value
+        for field, value in row.items()
+    }
+
+
+async def _export_rows(cursor, export_format: str) -> AsyncIterator[str]:
+    """
+    Serialize transactions from a cursor as CSV or NDJSON.
+    
+    Rows are yielded in chunks of EXPORT_BATCH_SIZE, so only one cursor
+    batch and one chunk of text are held in memory at a time. CSV text
+    cells are escaped against formula injection; NDJSON is written as is.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS) if export_format == "csv" else None
+    
+    if writer:
+        writer.writeheader()
+    
+    rows = 0
+    async for trans in cursor:
+        row = _transaction_to_response(trans)
+        if writer:
+            writer.writerow(_csv_safe(row))
+        else:
+            buffer.write(json.dumps(row))
+            buffer.write("\n")
+        
+        rows += 1
+        if rows % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+@router.get("/export")
+async def export_transactions(
+    export_format: str = Query("csv", alias="format"),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """
+    Export the full transaction ledger as a streamed file.
+    
+    Rows are read from a batched cursor and streamed as they are
+    serialized, so memory use does not grow with the ledger size.
+    
+    The arrow (IPC stream) and parquet formats hold date, vendor, amount,
+    category, status and confidence, with vendor/category/status
+    dictionary-encoded; they need the pyarrow package.
+    
+    Query parameters:
+    - format: csv (default), ndjson, arrow or parquet
+    - status: Only export transactions with this status
+    - start: Only transactions on or after this date
+    - end: Only transactions before this date
+    """
+    db = get_database()
+    
+    if export_format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid format. Must be one of: {', '.join(EXPORT_MEDIA_TYPES)}"
+        )
+    
+    columnar = export_format in COLUMNAR_FORMATS
+    if columnar and not columnar_available():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=f"The {export_format} format requires the pyarrow package"
+        )
+    
+    # Oldest first, read in fixed-size batches
+    cursor = db.transactions.find(
+        export_query(current_user.id, status_filter, start, end),
+        COLUMNAR_PROJECTION if columnar else TRANSACTION_PROJECTION
+    ).sort(EXPORT_SORT).batch_size(EXPORT_BATCH_SIZE)
+    
+    filename = f"transactions-{datetime.utcnow():%Y%m%d}.{export_format}"
+    body = stream_columnar(cursor, export_format) if columnar else _export_rows(cursor, export_format)
+    
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@job_queue.handler("columnar_snapshot")
+async def run_snapshot_job(db, job: dict) -> dict:
+    """Append transactions changed since the last snapshot to the user's Parquet snapshot."""
+    return await append_snapshot(db, job["user_id"])
+
+
+@router.post("/export/snapshot", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
+async def update_snapshot(current_user: UserInDB = Depends(get_current_user)):
+    """
+    Bring the user's columnar snapshot up to date.
+    
+    Appends the transactions created or edited since the previous snapshot
+    as a new Parquet part, in a background job. Returns immediately; poll
+    GET /api/v1/jobs/{id} for the result.
+    """
+    if not columnar_available():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Columnar snapshots require the pyarrow package"
+        )
+    
+    job = await job_queue.enqueue("columnar_snapshot", current_user.id)
+    
+    return {
+        "message": "Snapshot update started",
+        "job": job_to_response(job)
+    }
+
+
+@router.get("/export/snapshot", response_model=dict)
+async def get_snapshot(current_user: UserInDB = Depends(get_current_user)):
+    """
+    Get the state of the user's columnar snapshot.
     
-    return {"transactions": transaction_list}
+    Parts are Parquet files in the snapshot directory; a transaction edited
+    after being exported appears in several parts, and the copy with the
+    latest updated_at is current.
+    """
+    db = get_database()
+    state = await db[SNAPSHOT_COLLECTION].find_one({"user_id": current_user.id}) or {}
+    watermark = state.get("watermark")
+    
+    return {
+        "directory": snapshot_directory(current_user.id),
+        "parts": state.get("parts", 0),
+        "rows": state.get("rows", 0),
+        "watermark": watermark.isoformat() + "Z" if watermark else None
+    }
 
 
 @router.get("/{transaction_id}", response_model=dict)
@@ -167,18 +739,7 @@ async def get_transaction(
             detail="Transaction not found"
         )
     
-    return {
-        "id": str(transaction["_id"]),
-        "date": transaction["date"].isoformat() + "Z",
-        "vendor": transaction["vendor"],
-        "amount": transaction["amount"],
-        "category": transaction["category"],
-        "confidence": transaction["confidence"],
-        "status": transaction["status"],
-        "explanation": transaction["explanation"],
-        "payment_method": transaction["payment_method"],
-        "original_description": transaction.get("original_description")
-    }
+    return _transaction_to_response(transaction)
 
 
 class UpdateTransactionRequest(BaseModel):
@@ -194,8 +755,6 @@ async def update_transaction(
     current_user: UserInDB = Depends(get_current_user)
 ):
     """Update a transaction's category or status."""
-    category = update_data.category
-    status = update_data.status
     db = get_database()
     
     # Validate transaction_id
@@ -205,53 +764,39 @@ async def update_transaction(
             detail="Invalid transaction ID"
         )
     
-    # Find transaction
-    transaction = await db.transactions.find_one({
-        "_id": ObjectId(transaction_id),
-        "user_id": current_user.id
-    })
-    
-    if not transaction:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Transaction not found"
-        )
-    
     # Build update document
     update_doc = {"updated_at": datetime.utcnow()}
     
-    if category is not None:
-        update_doc["category"] = category
+    if update_data.category is not None:
+        update_doc["category"] = update_data.category
     
-    if status is not None:
-        valid_statuses = ["auto-approved", "needs-review", "manual"]
-        if status not in valid_statuses:
+    if update_data.status is not None:
+        if update_data.status not in VALID_STATUSES:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid status. Must be one of: {', '.join(valid_statuses)}"
+                detail=f"Invalid status. Must be one of: {', '.join(VALID_STATUSES)}"
             )
-        update_doc["status"] = status
+        update_doc["status"] = update_data.status
     
-    # Update transaction
-    await db.transactions.update_one(
-        {"_id": ObjectId(transaction_id)},
-        {"$set": update_doc}
+    # Update the transaction in one round trip; the previous version is
+    # returned so the rollups can be moved, and the new one is derived from it
+    transaction = await db.transactions.find_one_and_update(
+        {"_id": ObjectId(transaction_id), "user_id": current_user.id},
+        {"$set": update_doc},
+        projection={**TRANSACTION_PROJECTION, "user_id": 1},
+        return_document=ReturnDocument.BEFORE
     )
     
-    # Get updated transaction
-    updated_transaction = await db.transactions.find_one({"_id": ObjectId(transaction_id)})
+    if not transaction:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Transaction not found"
+        )
+    
+    updated_transaction = {**transaction, **update_doc}
     
-    return {
-        "transaction": {
-            "id": str(updated_transaction["_id"]),
-            "date": updated_transaction["date"].isoformat() + "Z",
-            "vendor": updated_transaction["vendor"],
-            "amount": updated_transaction["amount"],
-            "category": updated_transaction["category"],
-            "confidence": updated_transaction["confidence"],
-            "status": updated_transaction["status"],
-            "explanation": updated_transaction["explanation"],
-            "payment_method": updated_transaction["payment_method"],
-            "original_description": updated_transaction.get("original_description")
-        }
-    }
\ No newline at end of file
+    # Keep the daily rollups in step with a category change
+    await move_in_rollups(db, transaction, updated_transaction)
+    user_context_cache.invalidate(current_user.id)
+    
+    return {"transaction": _transaction_to_response(updated_transaction)}
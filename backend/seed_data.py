@@ -7,6 +7,7 @@ from datetime import datetime
 from bson import ObjectId
 from config import settings
 from services.transaction_generator import generate_transactions_for_source
+from services.daily_rollups import add_to_rollups
 import asyncio
 
 
@@ -178,6 +179,7 @@ async def seed_test_accounts_and_transactions():
         if transactions_to_insert:
             result = await db.transactions.insert_many(transactions_to_insert)
             count = len(result.inserted_ids)
+            await add_to_rollups(db, transactions_to_insert)
             total_transactions += count
             print(f"  [OK] Seeded {count} transactions from {source}")
     
@@ -13,6 +13,9 @@ import random
 import os
 from dotenv import load_dotenv
 
+from services.daily_rollups import rebuild_rollups_for_user
+from services.columnar_export import invalidate_snapshot
+
 # Load environment variables
 load_dotenv()
 
@@ -69,6 +72,7 @@ async def seed_sample_data():
         # Delete existing data
         await db.connected_accounts.delete_many({"user_id": user_id})
         await db.transactions.delete_many({"user_id": user_id})
+        await invalidate_snapshot(db, user_id)
         print("[OK] Deleted existing data")
     
     # 1. Create connected accounts
@@ -133,7 +137,7 @@ async def seed_sample_data():
             "payment_method": random.choice(["Square POS", "Stripe", "Bank Transfer"]),
             "original_description": None,
             "created_at": transaction_date,
-            "updated_at": transaction_date
+            "updated_at": now  # Write time: incremental exports key on updated_at
         })
     
     # Expense transactions (60% of total)
@@ -175,11 +179,12 @@ async def seed_sample_data():
             "payment_method": random.choice(["Business Debit", "Business Credit", "ACH Transfer", "Check"]),
             "original_description": vendor.upper(),
             "created_at": transaction_date,
-            "updated_at": transaction_date
+            "updated_at": now  # Write time: incremental exports key on updated_at
         })
     
     # Insert all transactions
     await db.transactions.insert_many(transactions)
+    await rebuild_rollups_for_user(db, user_id)
     
     # Calculate summary stats
     revenue_count = sum(1 for t in transactions if t["amount"] < 0)
@@ -1,21 +1,105 @@
 """Real AI service using Google Gemini API with rate limiting and caching."""
-from typing import Dict, Optional, List
+from typing import AsyncIterator, Callable, Dict, Optional, List
+import asyncio
 import re
+from concurrent.futures import ThreadPoolExecutor
 import google.generativeai as genai
 
 from ai_config import ai_config
-from services.rate_limiter import ai_rate_limiter
+from services.rate_limiter import ai_rate_limiter, RateLimitExceeded
 from services.response_cache import response_cache
+from services.prompt_builder import PromptBuilder
 from services.sample_responses import initialize_cache_with_samples
 
 
+class AIStreamError(Exception):
+    """Raised by a response stream when generation fails partway."""
+    
+    def __init__(self, message: str):
+        """
+        Args:
+            message: User-facing fallback message
+        """
+        super().__init__(message)
+        self.message = message
+
+
+class StreamingMarkdownStripper:
+    """
+    Chunk-safe wrapper around a markdown stripping function.
+    
+    Buffers streamed text and only releases it at points where no markdown
+    span can still be open: complete lines outside ``` code fences, or a
+    word boundary within the current line once every inline marker before
+    it has been closed.
+    """
+    
+    INLINE_MARKERS = re.compile(r"[*_`]")
+    
+    def __init__(self, strip: Callable[[str], str]):
+        self.strip = strip
+        self.buffer = ""
+    
+    def _safe_cut(self) -> int:
+        """Index up to which the buffer can be stripped and emitted."""
+        cut = 0
+        fences = 0
+        start = 0
+        
+        # Complete lines that close all open code fences
+        while True:
+            newline = self.buffer.find("\n", start)
+            if newline == -1:
+                break
+            
+            fences += self.buffer.count("```", start, newline)
+            if fences % 2 == 0:
+                cut = newline + 1
+            start = newline + 1
+        
+        # Word boundary in the trailing partial line with no open inline span
+        # (headers are only recognizable once their whole line has arrived)
+        if cut == start and not self.buffer.startswith("#", start):
+            for i in range(len(self.buffer) - 2, start - 1, -1):
+                if self.buffer[i] != " " or self.buffer[i + 1] == "#":
+                    continue
+                
+                prefix = self.buffer[start:i + 1]
+                if "```" not in prefix and not self.INLINE_MARKERS.search(self.strip(prefix)):
+                    return i + 1
+        
+        return cut
+    
+    def feed(self, chunk: str) -> str:
+        """Add a streamed chunk and return any text that is safe to emit."""
+        self.buffer += chunk
+        cut = self._safe_cut()
+        if cut == 0:
+            return ""
+        
+        ready, self.buffer = self.buffer[:cut], self.buffer[cut:]
+        return self.strip(ready)
+    
+    def flush(self) -> str:
+        """Return the remaining buffered text at the end of the stream."""
+        ready, self.buffer = self.buffer, ""
+        return self.strip(ready) if ready else ""
+
+
 class AIService:
     """AI service for generating intelligent responses using Google Gemini."""
     
     def __init__(self):
         """Initialize Gemini AI service."""
-        # Configure Gemini with API key
-        genai.configure(api_key=ai_config.GEMINI_API_KEY)
+        # Configure Gemini with API key (and endpoint override if set)
+        if ai_config.GEMINI_API_ENDPOINT:
+            genai.configure(
+                api_key=ai_config.GEMINI_API_KEY,
+                transport="rest",
+                client_options={"api_endpoint": ai_config.GEMINI_API_ENDPOINT}
+            )
+        else:
+            genai.configure(api_key=ai_config.GEMINI_API_KEY)
         
         # Initialize the model
         self.model = genai.GenerativeModel(
@@ -27,6 +111,25 @@ class AIService:
             }
         )
         
+        # The Gemini SDK call is synchronous; run it on a bounded thread pool
+        # so a slow completion never blocks the event loop
+        self.executor = ThreadPoolExecutor(
+            max_workers=ai_config.MAX_CONCURRENT_REQUESTS,
+            thread_name_prefix="gemini"
+        )
+        
+        # Cacheable requests currently being generated, by cache key, so
+        # identical concurrent prompts share one Gemini call
+        self.in_flight: Dict[str, asyncio.Task] = {}
+        self.coalesced_requests = 0
+        
+        # Keeps every prompt within the token budget
+        self.prompt_builder = PromptBuilder(
+            ai_config.SYSTEM_PROMPT,
+            budget_tokens=ai_config.PROMPT_TOKEN_BUDGET,
+            history_messages=ai_config.PROMPT_HISTORY_MESSAGES
+        )
+        
         print(f"[AI Service] Initialized with Gemini model: {ai_config.GEMINI_MODEL}")
         
         # Initialize cache with sample responses
@@ -57,7 +160,11 @@ class AIService:
         self,
         user_message: str,
         conversation_history: List[Dict] = None,
-        user_data: Dict = None
+        user_data: Dict = None,
+        user_id: Optional[str] = None,
+        plan: str = "free",
+        max_wait: Optional[float] = None,
+        history_summary: str = ""
     ) -> str:
         """
         Generate AI response using Google Gemini with caching and rate limiting.
@@ -66,57 +173,232 @@ class AIService:
             user_message: User's question
             conversation_history: Previous messages for context
             user_data: User's financial data for personalized responses
+            user_id: User the request is rate limited for (None = global limit only)
+            plan: User's subscription plan for per-plan rate limits
+            max_wait: Longest rate limit wait in seconds (None = wait as needed)
+            history_summary: Rolling summary of turns older than the history
         
         Returns:
             AI-generated response
+        
+        Raises:
+            RateLimitExceeded: If admission would take longer than max_wait
         """
         try:
-            # Check cache first (only for first message in conversation)
-            if not conversation_history or len(conversation_history) == 0:
-                cached_response = response_cache.get(user_message, user_data)
-                if cached_response:
-                    return cached_response
-            
-            # Acquire rate limit permission (will wait if necessary)
-            await ai_rate_limiter.acquire()
-            
-            # Build context from user data
-            context = self._build_context(user_data)
-            
-            # Build full prompt
-            full_prompt = self._build_prompt(user_message, context, conversation_history)
+            # Follow-up messages depend on the history and are never shared
+            if conversation_history or history_summary:
+                return await self._complete(
+                    user_message, conversation_history, user_data, user_id, plan, max_wait,
+                    history_summary=history_summary
+                )
             
-            # Generate response
-            response = self.model.generate_content(full_prompt)
+            # Check cache first (only for first message in conversation)
+            cached_response = await response_cache.fetch(user_message, user_data)
+            if cached_response:
+                return cached_response
             
-            # Strip markdown formatting
-            clean_response = self._strip_markdown(response.text)
+            # Every caller is admitted against its own limits, whether it
+            # starts the shared call or joins one (will wait up to max_wait)
+            await ai_rate_limiter.acquire(user_id, plan, max_wait)
             
-            # Cache the response (only for first message in conversation)
-            if not conversation_history or len(conversation_history) == 0:
-                response_cache.set(user_message, clean_response, user_data)
+            # Join an identical request that is already in flight, or start one
+            key = response_cache.key_for(user_message, user_data)
+            task = self.in_flight.get(key)
             
-            return clean_response
+            if task is None:
+                task = asyncio.create_task(self._complete(
+                    user_message, None, user_data, user_id, plan, max_wait,
+                    cache_response=True, rate_limited=True
+                ))
+                self.in_flight[key] = task
+                task.add_done_callback(lambda done: self._finish_in_flight(key, done))
+            else:
+                self.coalesced_requests += 1
+                print(f"[AI Service] Joined in-flight request for: {user_message[:50]}...")
             
+            # Shield the shared task so one caller disconnecting doesn't cancel it for the rest
+            return await asyncio.shield(task)
+        
+        except RateLimitExceeded:
+            raise
         except Exception as e:
-            error_msg = str(e)
-            print(f"[AI Service] Error generating response: {error_msg}")
+            return self._error_response(e)
+    
+    def _finish_in_flight(self, key: str, task: asyncio.Task):
+        """Forget a completed shared request."""
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+        
+        # Mark the exception retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+    
+    async def _complete(
+        self,
+        user_message: str,
+        conversation_history: Optional[List[Dict]],
+        user_data: Optional[Dict],
+        user_id: Optional[str],
+        plan: str,
+        max_wait: Optional[float],
+        cache_response: bool = False,
+        history_summary: str = "",
+        rate_limited: bool = False
+    ) -> str:
+        """Rate limit (unless the caller already did), call Gemini and clean up one response."""
+        # Acquire rate limit permission (will wait up to max_wait)
+        if not rate_limited:
+            await ai_rate_limiter.acquire(user_id, plan, max_wait)
+        
+        # Build context from user data
+        context = self._build_context(user_data)
+        
+        # Build full prompt
+        full_prompt = self._build_prompt(user_message, context, conversation_history, history_summary)
+        
+        # Generate response off the event loop
+        response = await self._generate_content(full_prompt)
+        
+        # Strip markdown formatting
+        clean_response = self._strip_markdown(response.text)
+        
+        # Cache the response (only for first message in conversation)
+        if cache_response:
+            await response_cache.store(user_message, clean_response, user_data)
+        
+        return clean_response
+    
+    async def stream_response(
+        self,
+        user_message: str,
+        conversation_history: List[Dict] = None,
+        user_data: Dict = None,
+        user_id: Optional[str] = None,
+        plan: str = "free",
+        max_wait: Optional[float] = None,
+        history_summary: str = ""
+    ) -> AsyncIterator[str]:
+        """
+        Stream an AI response from Google Gemini as it is generated.
+        
+        Cached responses are yielded in one piece. Streamed chunks are
+        markdown-stripped incrementally and the assembled response is cached.
+        
+        Args:
+            user_message: User's question
+            conversation_history: Previous messages for context
+            user_data: User's financial data for personalized responses
+            user_id: User the request is rate limited for (None = global limit only)
+            plan: User's subscription plan for per-plan rate limits
+            max_wait: Longest rate limit wait in seconds (None = wait as needed)
+            history_summary: Rolling summary of turns older than the history
+        
+        Yields:
+            Plain-text response chunks
+        
+        Raises:
+            RateLimitExceeded: If admission would take longer than max_wait
+                (raised before any chunk is yielded)
+            AIStreamError: If generation fails; chunks already yielded are
+                incomplete and nothing is cached
+        """
+        is_first_message = not conversation_history and not history_summary
+        
+        # Check cache first (only for first message in conversation)
+        if is_first_message:
+            cached_response = await response_cache.fetch(user_message, user_data)
+            if cached_response:
+                yield cached_response
+                return
+        
+        # Acquire rate limit permission (will wait up to max_wait)
+        await ai_rate_limiter.acquire(user_id, plan, max_wait)
+        
+        stripper = StreamingMarkdownStripper(self._strip_markdown)
+        parts = []
+        
+        try:
+            # Build full prompt with context
+            context = self._build_context(user_data)
+            full_prompt = self._build_prompt(user_message, context, conversation_history, history_summary)
             
-            # Check if it's a rate limit error
-            if "429" in error_msg or "quota" in error_msg.lower():
-                return "I'm currently experiencing high demand. Please wait a moment and try again. Your question is important to me!"
+            async for chunk in self._stream_content(full_prompt):
+                text = stripper.feed(chunk)
+                if text:
+                    parts.append(text)
+                    yield text
             
-            # Return fallback response for other errors
-            return "I'm having trouble processing that right now. Please try asking your question in a different way, or try again in a moment."
+            text = stripper.flush()
+            if text:
+                parts.append(text)
+                yield text
+        except Exception as e:
+            raise AIStreamError(self._error_response(e)) from e
+        
+        # Cache the assembled response (only for first message in conversation)
+        if is_first_message:
+            await response_cache.store(user_message, "".join(parts), user_data)
+    
+    def _error_response(self, error: Exception) -> str:
+        """Map a Gemini error to a user-facing fallback message."""
+        error_msg = str(error)
+        print(f"[AI Service] Error generating response: {error_msg}")
+        
+        # Check if it's a rate limit error
+        if "429" in error_msg or "quota" in error_msg.lower():
+            return "I'm currently experiencing high demand. Please wait a moment and try again. Your question is important to me!"
+        
+        # Return fallback response for other errors
+        return "I'm having trouble processing that right now. Please try asking your question in a different way, or try again in a moment."
+    
+    async def _generate_content(self, prompt: str):
+        """Run the blocking Gemini call on the worker thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.model.generate_content, prompt)
+    
+    async def _stream_content(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Stream Gemini chunks from the worker thread pool.
+        
+        The SDK's streaming iterator is blocking, so it is drained on a pool
+        thread that hands each chunk back to the event loop through a queue.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        end_of_stream = object()
+        
+        def produce():
+            try:
+                for chunk in self.model.generate_content(prompt, stream=True):
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk.text)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, end_of_stream)
+        
+        producer = loop.run_in_executor(self.executor, produce)
+        
+        while True:
+            item = await queue.get()
+            if item is end_of_stream:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+        
+        await producer
     
-    async def get_rate_limit_status(self) -> dict:
+    async def get_rate_limit_status(self, user_id: Optional[str] = None) -> dict:
         """
         Get current rate limit status.
         
+        Args:
+            user_id: Include this user's bucket if given
+        
         Returns:
             Dictionary with rate limit statistics
         """
-        return ai_rate_limiter.get_current_usage()
+        return ai_rate_limiter.get_current_usage(user_id)
     
     def get_cache_stats(self) -> dict:
         """
@@ -125,7 +407,12 @@ class AIService:
         Returns:
             Dictionary with cache statistics
         """
-        return response_cache.get_stats()
+        return {
+            **response_cache.get_stats(),
+            "in_flight_requests": len(self.in_flight),
+            "coalesced_requests": self.coalesced_requests,
+            "prompt": self.prompt_builder.get_stats()
+        }
     
     def _build_context(self, user_data: Dict = None) -> str:
         """Build context from user's financial data."""
@@ -165,28 +452,12 @@ class AIService:
         self, 
         user_message: str, 
         context: str, 
-        conversation_history: List[Dict] = None
+        conversation_history: List[Dict] = None,
+        history_summary: str = ""
     ) -> str:
-        """Build complete prompt with system instructions and context."""
-        prompt_parts = [ai_config.SYSTEM_PROMPT]
-        
-        # Add user's financial context if available
-        if context:
-            prompt_parts.append(context)
-        
-        # Add conversation history for context (last 5 messages)
-        if conversation_history and len(conversation_history) > 0:
-            prompt_parts.append("\n\nConversation History:")
-            for msg in conversation_history[-5:]:
-                role = msg.get("role", "user")
-                content = msg.get("content", "")
-                prompt_parts.append(f"{role.capitalize()}: {content}")
-        
-        # Add current user question
-        prompt_parts.append(f"\n\nUser Question: {user_message}")
-        prompt_parts.append("\n\nAssistant Response:")
-        
-        return "\n".join(prompt_parts)
+        """Build complete prompt with system instructions and context, within the token budget."""
+        prompt, _ = self.prompt_builder.build(user_message, context, conversation_history, history_summary)
+        return prompt
 
 
 # Singleton instance
@@ -0,0 +1,158 @@
+"""
+Shared storage backends for the AI response cache.
+
+ResponseCache keeps a small in-process L1 and writes through to one of
+these backends so cached answers survive restarts and are shared by all
+uvicorn workers.
+"""
+import json
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Optional
+
+import database
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # Redis support is optional
+    redis = None
+
+
+class CacheBackend(ABC):
+    """Interface for shared response cache storage."""
+    
+    name = "memory"
+    
+    @abstractmethod
+    async def get(self, key: str) -> Optional[dict]:
+        """
+        Get a cached entry.
+        
+        Args:
+            key: Cache key
+        
+        Returns:
+            Entry with "response", "message" and "expires_at", or None
+        """
+    
+    @abstractmethod
+    async def set(self, key: str, entry: dict):
+        """
+        Store a cached entry until its "expires_at".
+        
+        Args:
+            key: Cache key
+            entry: Entry with "response", "message" and "expires_at"
+        """
+
+
+class MongoCacheBackend(CacheBackend):
+    """
+    Cache entries stored in a MongoDB collection.
+    
+    A TTL index on expires_at (see database.INDEXES) lets MongoDB delete
+    expired entries, so expiry times are naive UTC like the TTL monitor's
+    clock. Reads also filter on expires_at because the TTL monitor only
+    runs about once a minute.
+    """
+    
+    name = "mongodb"
+    
+    def __init__(self, collection_name: str = "ai_response_cache"):
+        """
+        Initialize MongoDB cache backend.
+        
+        Args:
+            collection_name: Collection holding cache entries
+        """
+        self.collection_name = collection_name
+    
+    def _collection(self):
+        return database.get_database()[self.collection_name]
+    
+    async def get(self, key: str) -> Optional[dict]:
+        return await self._collection().find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.utcnow()}},
+            {"_id": 0, "response": 1, "message": 1, "expires_at": 1}
+        )
+    
+    async def set(self, key: str, entry: dict):
+        await self._collection().update_one(
+            {"_id": key},
+            {"$set": {
+                "response": entry["response"],
+                "message": entry["message"],
+                "expires_at": entry["expires_at"]
+            }},
+            upsert=True
+        )
+
+
+class RedisCacheBackend(CacheBackend):
+    """Cache entries stored as JSON strings with a Redis expiry."""
+    
+    name = "redis"
+    
+    def __init__(self, url: str, prefix: str = "finsense:ai_cache:"):
+        """
+        Initialize Redis cache backend.
+        
+        Args:
+            url: Redis connection URL
+            prefix: Key prefix for cache entries
+        """
+        if redis is None:
+            raise ImportError("The redis package is required for the Redis cache backend")
+        
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+    
+    async def get(self, key: str) -> Optional[dict]:
+        raw = await self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        
+        entry = json.loads(raw)
+        entry["expires_at"] = datetime.fromisoformat(entry["expires_at"])
+        return entry
+    
+    async def set(self, key: str, entry: dict):
+        ttl_seconds = int((entry["expires_at"] - datetime.utcnow()).total_seconds())
+        if ttl_seconds <= 0:
+            return
+        
+        payload = json.dumps({
+            "response": entry["response"],
+            "message": entry["message"],
+            "expires_at": entry["expires_at"].isoformat()
+        })
+        await self.client.set(self.prefix + key, payload, ex=ttl_seconds)
+
+
+def create_cache_backend(name: str, redis_url: str = "") -> Optional[CacheBackend]:
+    """
+    Build the configured shared cache backend.
+    
+    Args:
+        name: "memory" (no shared backend), "mongodb" or "redis"
+        redis_url: Connection URL when name is "redis"
+    
+    Returns:
+        Backend instance, or None for in-process caching only
+    
+    Raises:
+        ValueError: If name is not a known backend
+    """
+    if name == "mongodb":
+        return MongoCacheBackend()
+    
+    if name == "redis":
+        if redis is None or not redis_url:
+            print("WARNING: Redis cache backend requires the redis package and REDIS_URL - using MongoDB instead")
+            return MongoCacheBackend()
+        return RedisCacheBackend(redis_url)
+    
+    if name == "memory":
+        return None
+    
+    raise ValueError(f"Unknown response cache backend: {name!r} (expected memory, mongodb or redis)")
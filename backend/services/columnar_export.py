@@ -0,0 +1,410 @@
+"""
+Columnar (Arrow / Parquet) export of transactions for analytics.
+
+Reports and BI tools scan compact columnar files instead of re-querying
+MongoDB. Vendor, category and status are dictionary-encoded, since a
+ledger repeats a few dozen distinct values across thousands of rows.
+
+Snapshots are built incrementally. Each run appends one Parquet part with
+the transactions changed since the previous run's (updated_at, _id)
+watermark. An edited transaction is therefore present in more than one
+part; read_snapshot() keeps the latest version of each id. Deleting
+transactions (invalidate_snapshot) makes the next run rebuild the
+snapshot from scratch, since appended parts cannot express removals.
+Runs for one user are serialized by a lease on the user's snapshot state.
+
+Requires the pyarrow package.
+"""
+import asyncio
+import glob
+import os
+import shutil
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from config import settings
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # Columnar export is optional
+    pa = None
+
+# Rows per Arrow record batch (and Parquet row group)
+RECORD_BATCH_SIZE = 10000
+
+SNAPSHOT_COLLECTION = "export_snapshots"
+
+# Rows updated more recently than this are left for the next run.
+# updated_at is stamped by the app server before its write commits, so a
+# row stamped earlier can become visible after one stamped later
+SNAPSHOT_LAG_SECONDS = 60
+
+# How long a snapshot run owns a user's snapshot before another may take over
+SNAPSHOT_LEASE_SECONDS = 600
+
+# Fields read from MongoDB for the columnar schema
+COLUMNAR_PROJECTION = {
+    "date": 1,
+    "vendor": 1,
+    "amount": 1,
+    "category": 1,
+    "status": 1,
+    "confidence": 1,
+    "updated_at": 1
+}
+
+# Snapshot order: the (updated_at, _id) watermark's keyset
+SNAPSHOT_SORT = [("updated_at", 1), ("_id", 1)]
+
+# Columns stored as dictionary indices plus one copy of each distinct value
+DICTIONARY_COLUMNS = ("vendor", "category", "status")
+
+
+def columnar_available() -> bool:
+    """Whether pyarrow is installed."""
+    return pa is not None
+
+
+def transaction_schema() -> "pa.Schema":
+    """Arrow schema of exported transactions (timestamps are UTC)."""
+    timestamp = pa.timestamp("ms", tz="UTC")
+    text = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("id", pa.string()),
+        ("date", timestamp),
+        ("vendor", text),
+        ("amount", pa.float64()),
+        ("category", text),
+        ("status", text),
+        ("confidence", pa.float64()),
+        ("updated_at", timestamp)
+    ])
+
+
+def transactions_to_batch(transactions: List[dict]) -> "pa.RecordBatch":
+    """
+    Convert transaction documents to an Arrow record batch.
+    
+    Args:
+        transactions: Documents with at least the COLUMNAR_PROJECTION fields
+    
+    Returns:
+        Record batch with transaction_schema()
+    """
+    schema = transaction_schema()
+    arrays = []
+    
+    for field in schema:
+        if field.name == "id":
+            values = [str(trans["_id"]) for trans in transactions]
+        else:
+            values = [trans.get(field.name) for trans in transactions]
+        
+        if field.name in DICTIONARY_COLUMNS:
+            arrays.append(pa.array(values, pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, field.type))
+    
+    return pa.record_batch(arrays, schema=schema)
+
+
+async def iter_record_batches(cursor, batch_size: int = RECORD_BATCH_SIZE) -> AsyncIterator["pa.RecordBatch"]:
+    """Group transactions from a cursor into record batches of batch_size rows."""
+    rows = []
+    async for trans in cursor:
+        rows.append(trans)
+        if len(rows) == batch_size:
+            yield transactions_to_batch(rows)
+            rows = []
+    
+    if rows:
+        yield transactions_to_batch(rows)
+
+
+class _ChunkSink:
+    """Write-only file object whose contents are drained after each batch."""
+    
+    closed = False
+    
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+    
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self.position
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        self.closed = True
+    
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+async def stream_columnar(cursor, export_format: str) -> AsyncIterator[bytes]:
+    """
+    Serialize transactions from a cursor as an Arrow IPC stream or Parquet file.
+    
+    Each record batch is written and its bytes yielded before the next one
+    is read, so memory use is bounded by RECORD_BATCH_SIZE rows.
+    
+    Args:
+        cursor: Transaction cursor (COLUMNAR_PROJECTION fields)
+        export_format: "arrow" or "parquet"
+    """
+    sink = _ChunkSink()
+    schema = transaction_schema()
+    if export_format == "parquet":
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    
+    # Encoding (Parquet especially) is CPU-bound; keep it off the event loop
+    loop = asyncio.get_running_loop()
+    async for batch in iter_record_batches(cursor):
+        await loop.run_in_executor(None, writer.write_batch, batch)
+        yield sink.drain()
+    
+    await loop.run_in_executor(None, writer.close)
+    yield sink.drain()
+
+
+def snapshot_directory(user_id: ObjectId) -> str:
+    """Directory holding a user's snapshot parts."""
+    return os.path.join(settings.export_snapshot_dir, str(user_id))
+
+
+def snapshot_query(user_id: ObjectId, now: datetime, state: Optional[dict] = None) -> dict:
+    """
+    Filter for the rows the next snapshot run exports, in SNAPSHOT_SORT order.
+    
+    Args:
+        user_id: User whose transactions are exported
+        now: Time of the run (UTC); rows newer than SNAPSHOT_LAG_SECONDS are left out
+        state: Watermark (watermark and last_id) to resume after, or None
+            to export every row
+    
+    Returns:
+        MongoDB filter
+    """
+    query = {"user_id": user_id, "updated_at": {"$lt": now - timedelta(seconds=SNAPSHOT_LAG_SECONDS)}}
+    if state and state.get("watermark"):
+        query["$or"] = [
+            {"updated_at": {"$gt": state["watermark"]}},
+            {"updated_at": state["watermark"], "_id": {"$gt": state["last_id"]}}
+        ]
+    return query
+
+
+def _open_part(directory: str, temp_path: str) -> "pq.ParquetWriter":
+    """Create the snapshot directory and open a part's temp file."""
+    os.makedirs(directory, exist_ok=True)
+    return pq.ParquetWriter(temp_path, transaction_schema())
+
+
+def _publish_part(writer: "pq.ParquetWriter", temp_path: str, path: str):
+    """Finish a part and make it visible to read_snapshot()."""
+    writer.close()
+    os.replace(temp_path, path)
+
+
+def _discard_part(writer: "pq.ParquetWriter", temp_path: str):
+    """Close and delete an unfinished part."""
+    writer.close()
+    os.remove(temp_path)
+
+
+def _remove_other_parts(directory: str, keep: str):
+    """Delete every part in a snapshot directory except keep."""
+    for old_path in glob.glob(os.path.join(directory, "part-*.parquet")):
+        if old_path != keep:
+            os.remove(old_path)
+
+
+async def _claim_snapshot(db, user_id: ObjectId, now: datetime, lease_until: datetime) -> Optional[dict]:
+    """
+    Take a user's snapshot lease.
+    
+    Returns:
+        The snapshot state, or None while another run holds an unexpired lease
+    """
+    try:
+        return await db[SNAPSHOT_COLLECTION].find_one_and_update(
+            {"user_id": user_id, "$or": [{"running_until": {"$exists": False}}, {"running_until": {"$lt": now}}]},
+            {"$set": {"running_until": lease_until}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # The state document exists but the filter missed it: the lease is held
+        return None
+
+
+async def append_snapshot(db, user_id: ObjectId) -> dict:
+    """
+    Append transactions changed since the last snapshot as a new Parquet part.
+    
+    Only rows updated at least SNAPSHOT_LAG_SECONDS ago are exported, so
+    the watermark never passes a write that has not committed yet. If
+    transactions were deleted since the last run, the snapshot is rebuilt:
+    every row is written to a new part and the older parts are removed.
+    
+    One run per user at a time: a run holds a lease (running_until) on the
+    user's state document, and a run that finds it held is skipped, since
+    the running one already covers the same rows.
+    
+    Batches are written as they are read, and the part only becomes visible
+    (and the watermark only advances) once it is complete, so a failed run
+    loses nothing. A retried run may write rows again, which read_snapshot()
+    collapses.
+    
+    Args:
+        db: Database instance
+        user_id: User whose transactions are exported
+    
+    Returns:
+        Snapshot totals and the rows appended by this run
+    """
+    now = datetime.utcnow()
+    lease_until = now + timedelta(seconds=SNAPSHOT_LEASE_SECONDS)
+    state = await _claim_snapshot(db, user_id, now, lease_until)
+    
+    if state is None:
+        state = await db[SNAPSHOT_COLLECTION].find_one({"user_id": user_id}) or {}
+        print(f"[Export] Snapshot of user {user_id} is already being updated; skipped")
+        return {"appended": 0, "rebuilt": False, "skipped": True, "parts": state.get("parts", 0), "rows": state.get("rows", 0)}
+    
+    try:
+        return await _write_snapshot(db, user_id, state, now)
+    finally:
+        await db[SNAPSHOT_COLLECTION].update_one(
+            {"user_id": user_id, "running_until": lease_until},
+            {"$unset": {"running_until": ""}}
+        )
+
+
+async def _write_snapshot(db, user_id: ObjectId, state: dict, now: datetime) -> dict:
+    """Write one snapshot part and advance the watermark (caller holds the lease)."""
+    deletions = state.get("deletions", 0)
+    rebuild = deletions != state.get("rebuilt_deletions", 0)
+    
+    cursor = db.transactions.find(
+        snapshot_query(user_id, now, None if rebuild else state), COLUMNAR_PROJECTION
+    ).sort(SNAPSHOT_SORT).batch_size(RECORD_BATCH_SIZE)
+    
+    directory = snapshot_directory(user_id)
+    path = os.path.join(directory, f"part-{now:%Y%m%dT%H%M%S%f}.parquet")
+    temp_path = path + ".tmp"
+    loop = asyncio.get_running_loop()
+    
+    # File IO and encoding run on the executor, off the event loop
+    writer = None
+    rows = 0
+    last = None
+    try:
+        async for batch in iter_record_batches(cursor):
+            if writer is None:
+                writer = await loop.run_in_executor(None, _open_part, directory, temp_path)
+            await loop.run_in_executor(None, writer.write_batch, batch)
+            rows += batch.num_rows
+            last = batch.slice(batch.num_rows - 1).to_pylist()[0]
+        
+        if writer is not None:
+            await loop.run_in_executor(None, _publish_part, writer, temp_path, path)
+    except Exception:
+        if writer is not None:
+            await loop.run_in_executor(None, _discard_part, writer, temp_path)
+        raise
+    
+    if not rows and not rebuild:
+        return {"appended": 0, "rebuilt": False, "skipped": False, "parts": state.get("parts", 0), "rows": state.get("rows", 0)}
+    
+    position = {
+        # Arrow returns UTC-aware datetimes; stored dates are naive UTC
+        "watermark": last["updated_at"].replace(tzinfo=None) if last else None,
+        "last_id": ObjectId(last["id"]) if last else None,
+        "updated_at": now
+    }
+    
+    if rebuild:
+        # The new part holds every row; older parts may hold deleted ones
+        await loop.run_in_executor(None, _remove_other_parts, directory, path)
+        update = {"$set": {**position, "parts": 1 if rows else 0, "rows": rows, "rebuilt_deletions": deletions}}
+    else:
+        update = {"$set": position, "$inc": {"parts": 1, "rows": rows}}
+    
+    state = await db[SNAPSHOT_COLLECTION].find_one_and_update(
+        {"user_id": user_id},
+        update,
+        return_document=ReturnDocument.AFTER
+    )
+    if rebuild:
+        print(f"[Export] Rebuilt the snapshot of user {user_id} from {rows} transactions")
+    else:
+        print(f"[Export] Appended {rows} transactions to the snapshot of user {user_id}")
+    
+    return {"appended": rows, "rebuilt": rebuild, "skipped": False, "parts": state["parts"], "rows": state["rows"]}
+
+
+async def invalidate_snapshot(db, user_id: ObjectId):
+    """
+    Record that some of a user's transactions were deleted.
+    
+    Call after deleting transactions; the next append_snapshot() rebuilds
+    the snapshot so the deleted rows disappear from it.
+    """
+    await db[SNAPSHOT_COLLECTION].update_one(
+        {"user_id": user_id},
+        {"$inc": {"deletions": 1}},
+        upsert=True
+    )
+
+
+def read_snapshot(user_id: ObjectId, columns: Optional[List[str]] = None) -> "pa.Table":
+    """
+    Read a user's snapshot, keeping the latest version of each transaction.
+    
+    Args:
+        user_id: User whose snapshot is read
+        columns: Columns to return (all by default)
+    
+    Returns:
+        Table ordered by date
+    """
+    paths = sorted(glob.glob(os.path.join(snapshot_directory(user_id), "part-*.parquet")))
+    if not paths:
+        table = transaction_schema().empty_table()
+    else:
+        table = pa.concat_tables([pq.read_table(path) for path in paths])
+    
+    if table.num_rows:
+        # Newest version of each id first, then keep the first row per id
+        table = table.take(pc.sort_indices(table, sort_keys=[("id", "ascending"), ("updated_at", "descending")]))
+        ids = table.column("id").combine_chunks()
+        first = pc.not_equal(ids.slice(1), ids.slice(0, len(ids) - 1))
+        table = table.filter(pa.concat_arrays([pa.array([True]), first]))
+        table = table.sort_by([("date", "ascending"), ("id", "ascending")])
+    
+    return table.select(columns) if columns else table
+
+
+async def delete_snapshot(db, user_id: ObjectId):
+    """Remove a user's snapshot files and watermark."""
+    await db[SNAPSHOT_COLLECTION].delete_one({"user_id": user_id})
+    await asyncio.get_running_loop().run_in_executor(
+        None, lambda: shutil.rmtree(snapshot_directory(user_id), ignore_errors=True)
+    )
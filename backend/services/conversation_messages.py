@@ -0,0 +1,237 @@
+"""
+Conversation message storage.
+
+Messages live in their own collection, one document per message keyed by
+(conversation_id, timestamp), instead of an ever-growing array embedded in
+the conversation. Each conversation keeps a denormalized message_count and
+last_message_preview so list views never touch message content, and a
+rolling history_summary of the messages older than the prompt history.
+"""
+from datetime import datetime, timedelta
+from typing import List
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from ai_config import ai_config
+from services.prompt_builder import fold_into_summary
+
+# Messages the AI prompt uses as history
+HISTORY_LIMIT = ai_config.PROMPT_HISTORY_MESSAGES
+
+# Characters of the last message kept on the conversation for list views
+PREVIEW_LENGTH = 100
+
+# Sort order of a conversation's messages (ties broken by insertion order)
+MESSAGE_SORT = [("timestamp", 1), ("_id", 1)]
+
+# Newest first, for reading the latest messages
+RECENT_MESSAGE_SORT = [("timestamp", -1), ("_id", -1)]
+
+# Age after which another worker may take over an unfinished migration claim
+MIGRATION_LEASE = timedelta(minutes=10)
+
+
+def _message_doc(conversation_id: ObjectId, user_id: ObjectId, message: dict) -> dict:
+    """Build a messages collection document."""
+    return {
+        "conversation_id": conversation_id,
+        "user_id": user_id,
+        "role": message["role"],
+        "content": message["content"],
+        "timestamp": message["timestamp"]
+    }
+
+
+async def append_messages(db, conversation_id: ObjectId, user_id: ObjectId, messages: List[dict], now: datetime):
+    """
+    Store new messages and update the conversation's summary fields.
+    
+    Messages pushed out of the history window are folded into the
+    conversation's rolling history_summary.
+    
+    Args:
+        db: Database handle
+        conversation_id: Conversation the messages belong to
+        user_id: Owner of the conversation
+        messages: Messages with role, content and timestamp, oldest first
+        now: New updated_at for the conversation
+    """
+    if not messages:
+        return
+    
+    await db.messages.insert_many(
+        [_message_doc(conversation_id, user_id, message) for message in messages],
+        ordered=True
+    )
+    
+    conversation = await db.conversations.find_one_and_update(
+        {"_id": conversation_id},
+        {
+            "$inc": {"message_count": len(messages)},
+            "$set": {
+                "last_message_preview": messages[-1]["content"][:PREVIEW_LENGTH],
+                "updated_at": now
+            }
+        },
+        projection={"message_count": 1, "summarized_count": 1, "history_summary": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    
+    if conversation:
+        await roll_summary(db, conversation)
+
+
+async def roll_summary(db, conversation: dict):
+    """
+    Fold messages older than the history window into the rolling summary.
+    
+    Args:
+        db: Database handle
+        conversation: Conversation with _id, message_count and (optionally)
+            summarized_count and history_summary
+    """
+    summarized = conversation.get("summarized_count", 0)
+    pending = conversation["message_count"] - HISTORY_LIMIT - summarized
+    if pending <= 0:
+        return
+    
+    cursor = db.messages.find(
+        {"conversation_id": conversation["_id"]},
+        {"_id": 0, "role": 1, "content": 1}
+    ).sort(MESSAGE_SORT).skip(summarized).limit(pending)
+    older = await cursor.to_list(length=pending)
+    
+    summary = fold_into_summary(
+        conversation.get("history_summary", ""),
+        older,
+        ai_config.HISTORY_SUMMARY_MAX_TOKENS
+    )
+    
+    # Only apply if no concurrent append already advanced the summary
+    await db.conversations.update_one(
+        {"_id": conversation["_id"], "summarized_count": conversation.get("summarized_count")},
+        {"$set": {"history_summary": summary, "summarized_count": summarized + len(older)}}
+    )
+
+
+async def get_recent_messages(db, conversation_id: ObjectId, limit: int = HISTORY_LIMIT) -> List[dict]:
+    """
+    Get the latest messages of a conversation, oldest first.
+    
+    Args:
+        db: Database handle
+        conversation_id: Conversation to read
+        limit: Number of messages to return
+    
+    Returns:
+        List of message documents
+    """
+    cursor = db.messages.find(
+        {"conversation_id": conversation_id},
+        {"_id": 0, "role": 1, "content": 1, "timestamp": 1}
+    ).sort(RECENT_MESSAGE_SORT).limit(limit)
+    
+    messages = await cursor.to_list(length=limit)
+    messages.reverse()
+    return messages
+
+
+async def get_all_messages(db, conversation_id: ObjectId) -> List[dict]:
+    """Get every message of a conversation, oldest first."""
+    cursor = db.messages.find(
+        {"conversation_id": conversation_id},
+        {"_id": 0, "role": 1, "content": 1, "timestamp": 1}
+    ).sort(MESSAGE_SORT)
+    
+    return await cursor.to_list(length=None)
+
+
+async def delete_messages(db, conversation_ids: List[ObjectId]):
+    """Remove all messages of the given conversations."""
+    if conversation_ids:
+        await db.messages.delete_many({"conversation_id": {"$in": conversation_ids}})
+
+
+async def _claim_for_migration(db, conversation_id: ObjectId, now: datetime):
+    """
+    Claim one conversation for migration, returning it or None.
+    
+    The messages array is moved aside to migrating_messages, so only one
+    worker gets it. A claim older than MIGRATION_LEASE (a worker died
+    mid-migration) can be taken over.
+    """
+    conversation = await db.conversations.find_one_and_update(
+        {"_id": conversation_id, "messages": {"$exists": True}},
+        {"$rename": {"messages": "migrating_messages"}, "$set": {"migration_claimed_at": now}},
+        projection={"user_id": 1, "migrating_messages": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if conversation:
+        return conversation
+    
+    return await db.conversations.find_one_and_update(
+        {
+            "_id": conversation_id,
+            "migrating_messages": {"$exists": True},
+            "migration_claimed_at": {"$lt": now - MIGRATION_LEASE}
+        },
+        {"$set": {"migration_claimed_at": now}},
+        projection={"user_id": 1, "migrating_messages": 1},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def migrate_embedded_messages(db, batch_size: int = 100):
+    """
+    Move messages embedded in conversation documents to the messages collection.
+    
+    Runs at startup in every worker. Each conversation is claimed atomically
+    before its messages are copied, so concurrent workers never migrate the
+    same conversation twice. The claimed array is kept until the copy is
+    done, and partially copied messages are replaced when a stale claim is
+    taken over, so an interrupted migration is safe to re-run.
+    
+    Args:
+        db: Database handle
+        batch_size: Conversations fetched per round trip
+    """
+    now = datetime.utcnow()
+    query = {"$or": [
+        {"messages": {"$exists": True}},
+        {"migrating_messages": {"$exists": True}, "migration_claimed_at": {"$lt": now - MIGRATION_LEASE}}
+    ]}
+    if await db.conversations.count_documents(query, limit=1) == 0:
+        return
+    
+    print("Migrating embedded conversation messages...")
+    migrated = 0
+    
+    async for candidate in db.conversations.find(query, {"_id": 1}).batch_size(batch_size):
+        conversation = await _claim_for_migration(db, candidate["_id"], now)
+        if conversation is None:
+            # Another worker claimed it
+            continue
+        
+        conversation_id = conversation["_id"]
+        messages = conversation.get("migrating_messages") or []
+        
+        await db.messages.delete_many({"conversation_id": conversation_id})
+        if messages:
+            await db.messages.insert_many(
+                [_message_doc(conversation_id, conversation["user_id"], message) for message in messages],
+                ordered=True
+            )
+        
+        await db.conversations.update_one(
+            {"_id": conversation_id},
+            {
+                "$set": {
+                    "message_count": len(messages),
+                    "last_message_preview": messages[-1]["content"][:PREVIEW_LENGTH] if messages else ""
+                },
+                "$unset": {"migrating_messages": "", "migration_claimed_at": ""}
+            }
+        )
+        migrated += 1
+    
+    print(f"Migrated messages of {migrated} conversations")
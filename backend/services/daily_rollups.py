@@ -0,0 +1,159 @@
+"""
+Materialized daily rollups of transaction totals.
+
+Keeps one document per (user_id, day, category) in the daily_rollups
+collection with revenue, expense and count totals, updated incrementally
+on every transaction write so dashboard reads never scan raw transactions.
+"""
+from datetime import datetime
+from typing import Dict, List, Tuple
+from bson import ObjectId
+from pymongo import UpdateOne
+
+
+def rollup_day(date: datetime) -> datetime:
+    """Truncate a transaction date to its UTC day."""
+    return datetime(date.year, date.month, date.day)
+
+
+def _rollup_deltas(transactions: List[dict], sign: int) -> Dict[Tuple[ObjectId, datetime, str], dict]:
+    """Sum revenue/expense/count deltas per rollup key."""
+    deltas: Dict[Tuple[ObjectId, datetime, str], dict] = {}
+    
+    for trans in transactions:
+        key = (trans["user_id"], rollup_day(trans["date"]), trans["category"])
+        delta = deltas.setdefault(key, {"revenue": 0.0, "expenses": 0.0, "count": 0})
+        
+        amount = trans["amount"]
+        if amount < 0:  # Revenue (negative amounts)
+            delta["revenue"] += sign * abs(amount)
+        elif amount > 0:  # Expenses (positive amounts)
+            delta["expenses"] += sign * amount
+        delta["count"] += sign
+    
+    return deltas
+
+
+async def _apply(db, transactions: List[dict], sign: int):
+    """Apply signed transaction totals to the rollups with one bulk_write."""
+    await _write_deltas(db, _rollup_deltas(transactions, sign))
+
+
+async def _write_deltas(db, deltas: Dict[Tuple[ObjectId, datetime, str], dict]):
+    """Write rollup deltas with one bulk_write, skipping keys that net to zero."""
+    deltas = {
+        key: delta for key, delta in deltas.items()
+        if any(abs(value) > 1e-9 for value in delta.values())
+    }
+    if not deltas:
+        return
+    
+    now = datetime.utcnow()
+    operations = [
+        UpdateOne(
+            {"user_id": user_id, "day": day, "category": category},
+            {"$inc": delta, "$set": {"updated_at": now}},
+            upsert=True
+        )
+        for (user_id, day, category), delta in deltas.items()
+    ]
+    
+    await db.daily_rollups.bulk_write(operations, ordered=False)
+
+
+async def add_to_rollups(db, transactions: List[dict]):
+    """
+    Add newly inserted transactions to the daily rollups.
+    
+    Args:
+        db: Database instance
+        transactions: Transaction documents (need user_id, date, amount, category)
+    """
+    await _apply(db, transactions, 1)
+
+
+async def move_in_rollups(db, before: dict, after: dict):
+    """Move a single edited transaction between rollup keys."""
+    await move_many_in_rollups(db, [before], [after])
+
+
+async def move_many_in_rollups(db, before: List[dict], after: List[dict]):
+    """
+    Move a batch of edited transactions between rollup keys with one bulk_write.
+    
+    Args:
+        db: Database instance
+        before: Transaction documents as they were
+        after: The same transactions as they are now
+    """
+    deltas = _rollup_deltas(before, -1)
+    for key, delta in _rollup_deltas(after, 1).items():
+        merged = deltas.setdefault(key, {"revenue": 0.0, "expenses": 0.0, "count": 0})
+        for field, value in delta.items():
+            merged[field] += value
+    
+    await _write_deltas(db, deltas)
+
+
+def _rebuild_pipeline(match: dict) -> list:
+    """Aggregation that regroups raw transactions into daily_rollups via $merge."""
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": {
+                "user_id": "$user_id",
+                "day": {"$dateTrunc": {"date": "$date", "unit": "day"}},
+                "category": "$category"
+            },
+            "revenue": {"$sum": {"$cond": [{"$lt": ["$amount", 0]}, {"$abs": "$amount"}, 0]}},
+            "expenses": {"$sum": {"$cond": [{"$gt": ["$amount", 0]}, "$amount", 0]}},
+            "count": {"$sum": 1}
+        }},
+        {"$project": {
+            "_id": 0,
+            "user_id": "$_id.user_id",
+            "day": "$_id.day",
+            "category": "$_id.category",
+            "revenue": 1,
+            "expenses": 1,
+            "count": 1,
+            "updated_at": "$$NOW"
+        }},
+        {"$merge": {
+            "into": "daily_rollups",
+            "on": ["user_id", "day", "category"],
+            "whenMatched": "replace",
+            "whenNotMatched": "insert"
+        }}
+    ]
+
+
+async def rebuild_rollups_for_user(db, user_id: ObjectId):
+    """
+    Recompute a user's rollups from raw transactions.
+    
+    Used after a user's transactions are replaced wholesale.
+    """
+    await db.daily_rollups.delete_many({"user_id": user_id})
+    await db.transactions.aggregate(_rebuild_pipeline({"user_id": user_id})).to_list(length=None)
+
+
+async def backfill_rollups(db):
+    """
+    Build rollups for all existing transactions if the collection is empty.
+    
+    Runs once at startup after the rollup collection is introduced.
+    """
+    if await db.daily_rollups.estimated_document_count() > 0:
+        return
+    if await db.transactions.estimated_document_count() == 0:
+        return
+    
+    print("Backfilling daily rollups from existing transactions...")
+    await db.transactions.aggregate(_rebuild_pipeline({})).to_list(length=None)
+    print("Daily rollups backfilled successfully")
+
+
+async def delete_rollups_for_user(db, user_id: ObjectId):
+    """Remove all rollups for a user."""
+    await db.daily_rollups.delete_many({"user_id": user_id})
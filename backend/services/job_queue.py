@@ -0,0 +1,347 @@
+"""
+In-process background job queue.
+
+Slow work (account sync, sample-data seeding) is recorded in the jobs
+collection and run by a fixed number of asyncio workers, so the request
+that schedules it can return 202 right away. Job status is persisted so
+clients can poll it and jobs left behind by a restart are picked up again.
+"""
+import asyncio
+import random
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+import database
+from config import settings
+
+# Job handler: (db, job document) -> result stored on the job
+JobHandler = Callable[[object, dict], Awaitable[Optional[dict]]]
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobQueue:
+    """
+    Persisted job queue run by asyncio workers.
+    
+    enqueue() inserts a job document and hands its id to the in-memory
+    queue. Workers claim a job with an atomic status update (so a job is
+    never run twice), run its handler and record the result. A failed
+    attempt is retried with exponential backoff and jitter until
+    max_attempts is reached.
+    
+    A running job holds a lease. stop() puts the jobs its workers were
+    running back in the queue; on startup, queued jobs and running jobs
+    whose lease expired (their process died) are queued again.
+    """
+    
+    def __init__(
+        self,
+        concurrency: int = 2,
+        max_attempts: int = 3,
+        backoff_seconds: float = 2.0,
+        lease_seconds: float = 300,
+        collection_name: str = "jobs"
+    ):
+        """
+        Initialize job queue.
+        
+        Args:
+            concurrency: Number of jobs run at once
+            max_attempts: Attempts before a job is marked failed
+            backoff_seconds: Delay before the first retry (doubles per attempt)
+            lease_seconds: How long a running job is owned by its worker
+            collection_name: Collection holding job documents
+        """
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.lease_seconds = lease_seconds
+        self.collection_name = collection_name
+        
+        self.handlers: Dict[str, JobHandler] = {}
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+        self.retry_timers: List[asyncio.TimerHandle] = []
+        self.claimed: Set[ObjectId] = set()
+        
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+    
+    def _collection(self):
+        return database.get_database()[self.collection_name]
+    
+    def handler(self, job_type: str):
+        """
+        Register the handler for a job type (decorator).
+        
+        Args:
+            job_type: Name passed to enqueue()
+        """
+        def register(func: JobHandler) -> JobHandler:
+            self.handlers[job_type] = func
+            return func
+        return register
+    
+    async def enqueue(self, job_type: str, user_id: ObjectId, payload: Dict = None) -> dict:
+        """
+        Persist a job and schedule it.
+        
+        Args:
+            job_type: Registered job type
+            user_id: User the job runs for (and who may read its status)
+            payload: Handler arguments (must be BSON-serializable)
+        
+        Returns:
+            The inserted job document
+        """
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        
+        now = datetime.utcnow()
+        job = {
+            "type": job_type,
+            "user_id": user_id,
+            "payload": payload or {},
+            "status": QUEUED,
+            "attempts": 0,
+            "max_attempts": self.max_attempts,
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now
+        }
+        result = await self._collection().insert_one(job)
+        job["_id"] = result.inserted_id
+        
+        self._schedule(job["_id"])
+        return job
+    
+    def _schedule(self, job_id: ObjectId, delay: float = 0):
+        """Hand a job id to the workers, optionally after a delay."""
+        if self.queue is None:
+            # Not started (e.g. scripts); the job is picked up at next startup
+            return
+        
+        if delay <= 0:
+            self.queue.put_nowait(job_id)
+            return
+        
+        loop = asyncio.get_running_loop()
+        self.retry_timers = [timer for timer in self.retry_timers if timer.when() > loop.time()]
+        self.retry_timers.append(loop.call_later(delay, self.queue.put_nowait, job_id))
+    
+    async def _claim(self, job_id: ObjectId) -> Optional[dict]:
+        """Atomically mark a queued job as running; None if someone else has it."""
+        now = datetime.utcnow()
+        return await self._collection().find_one_and_update(
+            {"_id": job_id, "status": QUEUED},
+            {
+                "$set": {
+                    "status": RUNNING,
+                    "started_at": now,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            return_document=ReturnDocument.AFTER
+        )
+    
+    def _retry_delay(self, attempts: int) -> float:
+        """Exponential backoff with jitter for the next attempt."""
+        delay = self.backoff_seconds * (2 ** (attempts - 1))
+        return delay * random.uniform(0.8, 1.2)
+    
+    async def _run(self, job_id: ObjectId):
+        """Claim and run one job, recording its outcome."""
+        job = await self._claim(job_id)
+        if job is None:
+            return
+        
+        self.claimed.add(job_id)
+        try:
+            await self._execute(job)
+        finally:
+            self.claimed.discard(job_id)
+    
+    async def _execute(self, job: dict):
+        """Run a claimed job's handler and record its outcome."""
+        job_id = job["_id"]
+        try:
+            result = await self.handlers[job["type"]](database.get_database(), job)
+        except Exception as e:
+            await self._record_failure(job, e)
+            return
+        
+        now = datetime.utcnow()
+        await self._collection().update_one(
+            {"_id": job_id},
+            {"$set": {
+                "status": SUCCEEDED,
+                "result": result,
+                "error": None,
+                "finished_at": now,
+                "updated_at": now
+            }}
+        )
+        self.succeeded += 1
+        print(f"[Jobs] {job['type']} {job_id} succeeded (attempt {job['attempts']})")
+    
+    async def _record_failure(self, job: dict, error: Exception):
+        """Queue a failed job for retry, or mark it failed for good."""
+        now = datetime.utcnow()
+        message = f"{type(error).__name__}: {error}"
+        
+        if job["attempts"] < job.get("max_attempts", self.max_attempts):
+            delay = self._retry_delay(job["attempts"])
+            await self._collection().update_one(
+                {"_id": job["_id"]},
+                {"$set": {
+                    "status": QUEUED,
+                    "error": message,
+                    "retry_at": now + timedelta(seconds=delay),
+                    "updated_at": now
+                }}
+            )
+            self.retried += 1
+            print(f"[Jobs] {job['type']} {job['_id']} failed ({message}); retrying in {delay:.1f}s")
+            self._schedule(job["_id"], delay)
+            return
+        
+        await self._collection().update_one(
+            {"_id": job["_id"]},
+            {"$set": {
+                "status": FAILED,
+                "error": message,
+                "finished_at": now,
+                "updated_at": now
+            }}
+        )
+        self.failed += 1
+        print(f"[Jobs] {job['type']} {job['_id']} failed after {job['attempts']} attempts: {message}")
+    
+    async def _work_forever(self):
+        """Worker loop: run queued jobs one at a time."""
+        while True:
+            job_id = await self.queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Bookkeeping failed (e.g. database unavailable); the lease lets a restart recover it
+                print(f"[Jobs] Error running job {job_id}: {e}")
+            finally:
+                self.queue.task_done()
+    
+    async def _recover(self):
+        """Queue jobs left unfinished by a previous process."""
+        collection = self._collection()
+        now = datetime.utcnow()
+        
+        await collection.update_many(
+            {"status": RUNNING, "lease_expires_at": {"$lt": now}},
+            {"$set": {"status": QUEUED, "updated_at": now}}
+        )
+        
+        pending = await collection.find({"status": QUEUED}, {"_id": 1, "retry_at": 1}).to_list(length=None)
+        for job in pending:
+            # Keep the backoff of jobs that were waiting to retry
+            retry_at = job.get("retry_at")
+            delay = (retry_at - now).total_seconds() if retry_at else 0
+            self._schedule(job["_id"], delay)
+        
+        if pending:
+            print(f"[Jobs] Recovered {len(pending)} unfinished jobs")
+    
+    async def start(self):
+        """Start the workers and pick up unfinished jobs."""
+        if self.workers:
+            return
+        
+        self.queue = asyncio.Queue()
+        self.workers = [
+            asyncio.create_task(self._work_forever())
+            for _ in range(self.concurrency)
+        ]
+        
+        try:
+            await self._recover()
+        except Exception as e:
+            print(f"[Jobs] Could not recover unfinished jobs: {e}")
+    
+    async def stop(self):
+        """Cancel the workers; unfinished jobs resume at the next startup."""
+        for timer in self.retry_timers:
+            timer.cancel()
+        self.retry_timers = []
+        
+        interrupted = list(self.claimed)
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        self.queue = None
+        
+        if not interrupted:
+            return
+        
+        # Release the jobs cut off mid-run so a restart within their lease
+        # picks them up (the attempt still counts, so handlers see it as a retry)
+        try:
+            result = await self._collection().update_many(
+                {"_id": {"$in": interrupted}, "status": RUNNING},
+                {
+                    "$set": {"status": QUEUED, "updated_at": datetime.utcnow()},
+                    "$unset": {"lease_expires_at": ""}
+                }
+            )
+            print(f"[Jobs] Requeued {result.modified_count} interrupted jobs")
+        except Exception as e:
+            print(f"[Jobs] Could not requeue interrupted jobs (recovered once their lease expires): {e}")
+    
+    def get_stats(self) -> dict:
+        """Get job queue statistics."""
+        return {
+            "workers": len(self.workers),
+            "queued": self.queue.qsize() if self.queue else 0,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retried": self.retried
+        }
+
+
+def job_to_response(job: dict) -> dict:
+    """Convert a job document to its API representation."""
+    def iso(value: Optional[datetime]) -> Optional[str]:
+        return value.isoformat() + "Z" if value else None
+    
+    return {
+        "id": str(job["_id"]),
+        "type": job["type"],
+        "status": job["status"],
+        "attempts": job.get("attempts", 0),
+        "max_attempts": job.get("max_attempts"),
+        "result": job.get("result"),
+        "error": job.get("error"),
+        "created_at": iso(job.get("created_at")),
+        "started_at": iso(job.get("started_at")),
+        "finished_at": iso(job.get("finished_at")),
+        "retry_at": iso(job.get("retry_at")) if job["status"] == QUEUED else None
+    }
+
+
+# Global job queue instance
+job_queue = JobQueue(
+    concurrency=settings.job_workers,
+    max_attempts=settings.job_max_attempts,
+    backoff_seconds=settings.job_retry_backoff_seconds
+)
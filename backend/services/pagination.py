@@ -0,0 +1,138 @@
+"""Keyset (cursor) pagination helpers for MongoDB list endpoints."""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+from bson import ObjectId
+
+
+def encode_cursor(sort_value: datetime, doc_id: ObjectId) -> str:
+    """
+    Encode the last row of a page into an opaque cursor token.
+
+    Args:
+        sort_value: Value of the sort field for the last row
+        doc_id: _id of the last row (tie-breaker)
+
+    Returns:
+        URL-safe cursor string
+    """
+    payload = json.dumps({"v": sort_value.isoformat(), "id": str(doc_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[datetime, ObjectId]:
+    """
+    Decode a cursor token produced by encode_cursor.
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        sort_value = datetime.fromisoformat(payload["v"])
+        doc_id = payload["id"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+    if not ObjectId.is_valid(doc_id):
+        raise ValueError("Invalid cursor")
+
+    return sort_value, ObjectId(doc_id)
+
+
+def keyset_filter(field: str, sort_value: datetime, doc_id: ObjectId) -> dict:
+    """
+    Build the filter that selects rows after the cursor for a
+    descending (field, _id) sort.
+    """
+    return {
+        "$or": [
+            {field: {"$lt": sort_value}},
+            {field: sort_value, "_id": {"$lt": doc_id}}
+        ]
+    }
+
+
+def next_cursor(rows: list, field: str, limit: int) -> Optional[str]:
+    """
+    Return the cursor for the next page, or None if this is the last page.
+
+    Expects rows to have been fetched with limit + 1 so an extra row
+    signals that more data exists; the extra row is dropped in place.
+    """
+    if len(rows) <= limit:
+        return None
+
+    del rows[limit:]
+    last = rows[-1]
+    return encode_cursor(last[field], last["_id"])
+
+
+def encode_ranked_cursor(score: float, sort_value: datetime, doc_id: ObjectId) -> str:
+    """
+    Encode the last row of a relevance-ordered page into a cursor token.
+    
+    Args:
+        score: Relevance score of the last row
+        sort_value: Value of the secondary sort field for the last row
+        doc_id: _id of the last row (tie-breaker)
+    
+    Returns:
+        URL-safe cursor string
+    """
+    payload = json.dumps(
+        {"s": score, "v": sort_value.isoformat(), "id": str(doc_id)},
+        separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_ranked_cursor(token: str) -> Tuple[float, datetime, ObjectId]:
+    """
+    Decode a cursor token produced by encode_ranked_cursor.
+    
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        score = float(payload["s"])
+        sort_value = datetime.fromisoformat(payload["v"])
+        doc_id = payload["id"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    
+    if not ObjectId.is_valid(doc_id):
+        raise ValueError("Invalid cursor")
+    
+    return score, sort_value, ObjectId(doc_id)
+
+
+def ranked_keyset_filter(score_field: str, field: str, score: float, sort_value: datetime, doc_id: ObjectId) -> dict:
+    """
+    Build the filter that selects rows after the cursor for a
+    descending (score_field, field, _id) sort.
+    """
+    return {
+        "$or": [
+            {score_field: {"$lt": score}},
+            {score_field: score, field: {"$lt": sort_value}},
+            {score_field: score, field: sort_value, "_id": {"$lt": doc_id}}
+        ]
+    }
+
+
+def next_ranked_cursor(rows: list, score_field: str, field: str, limit: int) -> Optional[str]:
+    """
+    Return the cursor for the next relevance-ordered page, or None if this
+    is the last page (rows fetched with limit + 1, like next_cursor).
+    """
+    if len(rows) <= limit:
+        return None
+    
+    del rows[limit:]
+    last = rows[-1]
+    return encode_ranked_cursor(last[score_field], last[field], last["_id"])
@@ -0,0 +1,93 @@
+"""Argon2 password hashing on a bounded worker pool."""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from passlib.hash import argon2
+
+from config import settings
+
+
+class PasswordHasher:
+    """
+    Runs argon2 hash/verify off the event loop.
+    
+    Argon2 is deliberately CPU- and memory-heavy; argon2-cffi releases the
+    GIL while hashing, so a small thread pool keeps the event loop free and
+    caps how many hashes run at once. Calls beyond the pool size wait in
+    the executor queue, which is reported as queue depth.
+    """
+    
+    def __init__(self, max_workers: int = 2):
+        """
+        Initialize password hasher.
+        
+        Args:
+            max_workers: Maximum number of concurrent argon2 operations
+        """
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="argon2")
+        self.queued = 0
+        self.running = 0
+        self.max_queue_depth = 0
+        self.completed = 0
+        self._lock = threading.Lock()
+    
+    def _run(self, func, *args):
+        """Run an argon2 call on a worker thread, tracking pool occupancy."""
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+    
+    async def _submit(self, func, *args):
+        """Queue an argon2 call on the pool and await its result."""
+        with self._lock:
+            self.queued += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queued)
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._run, func, *args)
+    
+    async def hash(self, password: str) -> str:
+        """
+        Hash a password with argon2.
+        
+        Args:
+            password: Plain-text password
+        
+        Returns:
+            Encoded argon2 hash
+        """
+        return await self._submit(argon2.hash, password)
+    
+    async def verify(self, password: str, password_hash: str) -> bool:
+        """
+        Verify a password against an argon2 hash.
+        
+        Args:
+            password: Plain-text password
+            password_hash: Stored argon2 hash
+        
+        Returns:
+            True if the password matches
+        """
+        return await self._submit(argon2.verify, password, password_hash)
+    
+    def get_stats(self) -> dict:
+        """Get pool statistics."""
+        return {
+            "max_workers": self.max_workers,
+            "queue_depth": self.queued,
+            "running": self.running,
+            "max_queue_depth": self.max_queue_depth,
+            "completed": self.completed
+        }
+
+
+# Global password hasher instance
+password_hasher = PasswordHasher(max_workers=settings.password_hash_workers)
@@ -0,0 +1,248 @@
+"""
+Token-budgeted prompt assembly for the AI assistant.
+
+Prompts are built from the system prompt, the user's financial context,
+a rolling summary of older turns, the most recent messages and the
+question. Sizes are estimated locally (no API call), and when the total
+would exceed the budget the oldest material is dropped first.
+"""
+import math
+import re
+from typing import Dict, List, Optional, Tuple
+
+
+# Average characters per token for English text in Gemini's tokenizer
+CHARS_PER_TOKEN = 4
+
+TRUNCATION_MARKER = " [...]"
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of text without calling the API."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def truncate_to_tokens(text: str, max_tokens: int, keep: str = "head") -> str:
+    """
+    Cut text to roughly max_tokens, marking the cut.
+    
+    Args:
+        text: Text to shorten
+        max_tokens: Token budget for the result
+        keep: "head" keeps the start of the text, "tail" keeps the end
+    
+    Returns:
+        Text that fits the budget ("" if not even the marker fits)
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    
+    max_chars = max_tokens * CHARS_PER_TOKEN - len(TRUNCATION_MARKER)
+    if max_chars <= 0:
+        return ""
+    
+    if keep == "tail":
+        return TRUNCATION_MARKER.strip() + " " + text[-max_chars:]
+    return text[:max_chars] + TRUNCATION_MARKER
+
+
+def _first_sentence(text: str, max_chars: int) -> str:
+    """First sentence of text on one line, capped at max_chars."""
+    text = " ".join(text.split())
+    match = re.match(r"(.+?[.!?])(\s|$)", text)
+    sentence = match.group(1) if match else text
+    if len(sentence) > max_chars:
+        sentence = sentence[:max_chars].rstrip() + "..."
+    return sentence
+
+
+def fold_into_summary(summary: str, messages: List[Dict], max_tokens: int, line_chars: int = 160) -> str:
+    """
+    Add turns that left the history window to a rolling summary.
+    
+    Each message becomes one line holding its first sentence, so the
+    summary is built locally without spending model quota. Once the
+    summary exceeds max_tokens its oldest lines are dropped.
+    
+    Args:
+        summary: Existing summary ("" if none)
+        messages: Messages leaving the history window, oldest first
+        max_tokens: Token budget for the summary
+        line_chars: Longest line kept per message
+    
+    Returns:
+        Updated summary
+    """
+    lines = summary.splitlines() if summary else []
+    
+    for msg in messages:
+        content = msg.get("content", "")
+        if not content.strip():
+            continue
+        label = "User asked" if msg.get("role", "user") == "user" else "Assistant said"
+        lines.append(f"- {label}: {_first_sentence(content, line_chars)}")
+    
+    while lines and estimate_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    
+    return "\n".join(lines)
+
+
+class PromptBuilder:
+    """
+    Assembles prompts within a token budget and tracks their sizes.
+    
+    The system prompt and the question are always included (the question
+    is cut only if it alone overflows the budget). The remaining budget
+    goes to the financial context, then to history newest-first, then to
+    the summary of older turns; whatever does not fit is dropped oldest
+    first.
+    """
+    
+    def __init__(self, system_prompt: str, budget_tokens: int = 3000, history_messages: int = 5):
+        """
+        Initialize prompt builder.
+        
+        Args:
+            system_prompt: Instructions placed at the top of every prompt
+            budget_tokens: Maximum estimated prompt size
+            history_messages: Most recent messages considered for history
+        """
+        self.system_prompt = system_prompt
+        self.budget_tokens = budget_tokens
+        self.history_messages = history_messages
+        
+        self.requests = 0
+        self.total_tokens = 0
+        self.max_tokens_seen = 0
+        self.truncated_requests = 0
+        self.dropped_messages = 0
+    
+    def build(
+        self,
+        user_message: str,
+        context: str = "",
+        conversation_history: Optional[List[Dict]] = None,
+        history_summary: str = ""
+    ) -> Tuple[str, Dict]:
+        """
+        Build a prompt that fits the token budget.
+        
+        Args:
+            user_message: User's question
+            context: Financial context block (may be "")
+            conversation_history: Recent messages, oldest first
+            history_summary: Rolling summary of turns before the history
+        
+        Returns:
+            (prompt, size metrics in estimated tokens)
+        """
+        system = self.system_prompt
+        question = f"\n\nUser Question: {user_message}"
+        footer = "\n\nAssistant Response:"
+        
+        remaining = self.budget_tokens - estimate_tokens(system) - estimate_tokens(footer)
+        truncated = False
+        
+        if estimate_tokens(question) > remaining:
+            question = truncate_to_tokens(question, remaining)
+            truncated = True
+        remaining -= estimate_tokens(question)
+        
+        if context and estimate_tokens(context) > remaining:
+            context = ""
+            truncated = True
+        remaining -= estimate_tokens(context)
+        
+        # History, newest first, until the budget runs out
+        history_header = "\n\nConversation History:"
+        candidates = (conversation_history or [])[-self.history_messages:]
+        history_lines: List[str] = []
+        if candidates:
+            remaining -= estimate_tokens(history_header)
+        
+        for msg in reversed(candidates):
+            line = f"{msg.get('role', 'user').capitalize()}: {msg.get('content', '')}"
+            cost = estimate_tokens(line)
+            if cost > remaining:
+                # Keep the newest message partially rather than lose it
+                if not history_lines and remaining > 0:
+                    line = truncate_to_tokens(line, remaining)
+                    if line:
+                        history_lines.append(line)
+                        remaining -= estimate_tokens(line)
+                truncated = True
+                break
+            history_lines.append(line)
+            remaining -= cost
+        history_lines.reverse()
+        
+        if not history_lines and candidates:
+            remaining += estimate_tokens(history_header)
+        
+        # Summary of older turns gets what is left, keeping its newest lines
+        summary_block = ""
+        if history_summary:
+            summary_header = "\n\nEarlier in this conversation:\n"
+            available = remaining - estimate_tokens(summary_header)
+            summary_text = truncate_to_tokens(history_summary, available, keep="tail") if available > 0 else ""
+            if summary_text != history_summary:
+                truncated = True
+            if summary_text:
+                summary_block = summary_header + summary_text
+        
+        prompt_parts = [system]
+        if context:
+            prompt_parts.append(context)
+        if summary_block:
+            prompt_parts.append(summary_block)
+        if history_lines:
+            prompt_parts.append(history_header)
+            prompt_parts.extend(history_lines)
+        prompt_parts.append(question)
+        prompt_parts.append(footer)
+        prompt = "\n".join(prompt_parts)
+        
+        metrics = {
+            "estimated_tokens": estimate_tokens(prompt),
+            "budget_tokens": self.budget_tokens,
+            "system_tokens": estimate_tokens(system),
+            "context_tokens": estimate_tokens(context),
+            "summary_tokens": estimate_tokens(summary_block),
+            "history_tokens": sum(estimate_tokens(line) for line in history_lines),
+            "question_tokens": estimate_tokens(question),
+            "history_messages": len(history_lines),
+            "dropped_messages": len(candidates) - len(history_lines),
+            "truncated": truncated
+        }
+        self._record(metrics)
+        
+        return prompt, metrics
+    
+    def _record(self, metrics: Dict):
+        """Add one prompt's metrics to the running totals and log them."""
+        self.requests += 1
+        self.total_tokens += metrics["estimated_tokens"]
+        self.max_tokens_seen = max(self.max_tokens_seen, metrics["estimated_tokens"])
+        self.dropped_messages += metrics["dropped_messages"]
+        if metrics["truncated"]:
+            self.truncated_requests += 1
+        
+        print(
+            f"[Prompt] ~{metrics['estimated_tokens']}/{metrics['budget_tokens']} tokens "
+            f"(system {metrics['system_tokens']}, context {metrics['context_tokens']}, "
+            f"summary {metrics['summary_tokens']}, history {metrics['history_tokens']} "
+            f"in {metrics['history_messages']} msgs, question {metrics['question_tokens']})"
+            + (" [truncated]" if metrics["truncated"] else "")
+        )
+    
+    def get_stats(self) -> dict:
+        """Get prompt size statistics."""
+        return {
+            "prompts_built": self.requests,
+            "budget_tokens": self.budget_tokens,
+            "avg_estimated_tokens": round(self.total_tokens / self.requests) if self.requests else 0,
+            "max_estimated_tokens": self.max_tokens_seen,
+            "truncated_prompts": self.truncated_requests,
+            "dropped_history_messages": self.dropped_messages
+        }
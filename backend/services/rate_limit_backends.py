@@ -0,0 +1,182 @@
+"""
+Shared token buckets for the global AI rate limit.
+
+Every uvicorn worker (and host) reserves tokens from the same bucket, so
+the upstream Gemini quota is enforced once rather than once per process.
+Refill uses the store's clock, never the workers' clocks.
+"""
+from typing import Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+import database
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # Redis support is optional
+    redis = None
+
+
+class MongoTokenBucket:
+    """
+    Token bucket stored as one document and updated atomically.
+    
+    Each reservation is a single find_one_and_update with an aggregation
+    pipeline that refills from $$NOW, decides admission and takes a token
+    in one server-side step.
+    """
+    
+    name = "mongodb"
+    
+    def __init__(self, requests_per_minute: float, key: str = "gemini", collection_name: str = "rate_limits"):
+        """
+        Initialize MongoDB token bucket.
+        
+        Args:
+            requests_per_minute: Refill rate and burst size
+            key: Document _id of this bucket
+            collection_name: Collection holding bucket documents
+        """
+        self.capacity = requests_per_minute
+        self.rate = requests_per_minute / 60
+        self.key = key
+        self.collection_name = collection_name
+        self.tokens = requests_per_minute  # Last value seen, for stats only
+    
+    def _pipeline(self, max_wait: Optional[float]) -> list:
+        """Refill, admit and take in one update pipeline."""
+        rate_per_ms = self.rate / 1000
+        refilled = {"$min": [
+            self.capacity,
+            {"$add": [
+                {"$ifNull": ["$tokens", self.capacity]},
+                {"$multiply": [
+                    {"$max": [0, {"$subtract": ["$$NOW", {"$ifNull": ["$updated", "$$NOW"]}]}]},
+                    rate_per_ms
+                ]}
+            ]}
+        ]}
+        
+        # wait = (1 - tokens) / rate <= max_wait
+        granted = {"$literal": True} if max_wait is None else {"$gte": ["$tokens", 1 - max_wait * self.rate]}
+        
+        return [
+            {"$set": {"tokens": refilled, "updated": "$$NOW"}},
+            {"$set": {"granted": granted}},
+            {"$set": {"tokens": {"$cond": ["$granted", {"$subtract": ["$tokens", 1]}, "$tokens"]}}}
+        ]
+    
+    async def reserve(self, max_wait: Optional[float] = None) -> Tuple[float, bool]:
+        """
+        Reserve a token from the shared bucket.
+        
+        Args:
+            max_wait: Reject instead of reserving if the wait would exceed this
+        
+        Returns:
+            (seconds to wait, whether the token was reserved)
+        """
+        collection = database.get_database()[self.collection_name]
+        
+        try:
+            doc = await collection.find_one_and_update(
+                {"_id": self.key},
+                self._pipeline(max_wait),
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Another worker created the bucket document first
+            doc = await collection.find_one_and_update(
+                {"_id": self.key},
+                self._pipeline(max_wait),
+                return_document=ReturnDocument.AFTER
+            )
+        
+        self.tokens = doc["tokens"]
+        if doc["granted"]:
+            return max(0.0, -self.tokens) / self.rate, True
+        return (1 - self.tokens) / self.rate, False
+    
+    async def release(self):
+        """Return a reserved token (capped again at the next refill)."""
+        await database.get_database()[self.collection_name].update_one(
+            {"_id": self.key},
+            {"$inc": {"tokens": 1}}
+        )
+
+
+# KEYS[1] = bucket key; ARGV = capacity, tokens per ms, max wait in ms (-1 = unbounded)
+REDIS_RESERVE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate_per_ms = tonumber(ARGV[2])
+local max_wait_ms = tonumber(ARGV[3])
+
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate_per_ms)
+
+local granted = max_wait_ms < 0 or tokens >= 1 - max_wait_ms * rate_per_ms
+if granted then
+    tokens = tokens - 1
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(2 * capacity / rate_per_ms))
+return {granted and 1 or 0, tostring(tokens)}
+"""
+
+
+class RedisTokenBucket:
+    """Token bucket kept in a Redis hash and updated by a Lua script."""
+    
+    name = "redis"
+    
+    def __init__(self, requests_per_minute: float, url: str, key: str = "finsense:rate_limit:gemini"):
+        """
+        Initialize Redis token bucket.
+        
+        Args:
+            requests_per_minute: Refill rate and burst size
+            url: Redis connection URL
+            key: Hash key of this bucket
+        """
+        if redis is None:
+            raise ImportError("The redis package is required for the Redis rate limit backend")
+        
+        self.capacity = requests_per_minute
+        self.rate = requests_per_minute / 60
+        self.key = key
+        self.tokens = requests_per_minute  # Last value seen, for stats only
+        self.client = redis.from_url(url)
+        self.script = self.client.register_script(REDIS_RESERVE_SCRIPT)
+    
+    async def reserve(self, max_wait: Optional[float] = None) -> Tuple[float, bool]:
+        """
+        Reserve a token from the shared bucket.
+        
+        Args:
+            max_wait: Reject instead of reserving if the wait would exceed this
+        
+        Returns:
+            (seconds to wait, whether the token was reserved)
+        """
+        max_wait_ms = -1 if max_wait is None else max_wait * 1000
+        granted, tokens = await self.script(
+            keys=[self.key],
+            args=[self.capacity, self.rate / 1000, max_wait_ms]
+        )
+        
+        self.tokens = float(tokens)
+        if granted:
+            return max(0.0, -self.tokens) / self.rate, True
+        return (1 - self.tokens) / self.rate, False
+    
+    async def release(self):
+        """Return a reserved token (capped again at the next refill)."""
+        await self.client.hincrbyfloat(self.key, "tokens", 1)
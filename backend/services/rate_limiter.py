@@ -1,92 +1,328 @@
 """Rate limiter for AI API requests."""
 import asyncio
-from datetime import datetime, timedelta
-from typing import Optional
-from collections import deque
+import time
+from typing import Dict, Optional, Tuple
+
+from ai_config import ai_config
+from config import settings
+from services.rate_limit_backends import MongoTokenBucket, RedisTokenBucket
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request would have to wait longer than the caller allows."""
+    
+    def __init__(self, retry_after: float, scope: str):
+        """
+        Args:
+            retry_after: Seconds until the request could be admitted
+            scope: Which bucket rejected the request (user, plan or global)
+        """
+        super().__init__(f"AI rate limit reached ({scope}); retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+        self.scope = scope
+
+
+class TokenBucket:
+    """
+    Token bucket on the monotonic clock.
+    
+    Refills continuously at `rate` tokens per second up to `capacity`.
+    Tokens may go negative: each admitted request takes its token up front
+    and waits out the deficit, which queues callers in arrival order.
+    """
+    
+    def __init__(self, rate: float, capacity: float):
+        """
+        Initialize token bucket.
+        
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum tokens (burst size)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+    
+    @classmethod
+    def per_minute(cls, requests_per_minute: float) -> "TokenBucket":
+        """Bucket allowing a burst of, and refilling at, requests_per_minute."""
+        return cls(rate=requests_per_minute / 60, capacity=requests_per_minute)
+    
+    def _refill(self, now: float):
+        """Add tokens accrued since the last update."""
+        if now <= self.updated:
+            return
+        
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def wait_time(self, now: float) -> float:
+        """Seconds until the next token would be available for a new request."""
+        self._refill(now)
+        return max(0.0, (1 - self.tokens) / self.rate)
+    
+    def take(self):
+        """Reserve one token (call after wait_time so the bucket is refilled)."""
+        self.tokens -= 1
+    
+    def give_back(self):
+        """Return a reserved token that was not used."""
+        self.tokens = min(self.capacity, self.tokens + 1)
+    
+    async def reserve(self, max_wait: Optional[float] = None) -> Tuple[float, bool]:
+        """
+        Reserve a token unless the wait would exceed max_wait.
+        
+        Same interface as the shared buckets in services.rate_limit_backends,
+        so an in-process bucket can serve as the global bucket.
+        
+        Returns:
+            (seconds to wait, whether the token was reserved)
+        """
+        wait_seconds = self.wait_time(time.monotonic())
+        if max_wait is not None and wait_seconds > max_wait:
+            return wait_seconds, False
+        
+        self.take()
+        return wait_seconds, True
+    
+    async def release(self):
+        """Return a reserved token that was not used."""
+        self.give_back()
+    
+    def is_full(self, now: float) -> bool:
+        """Whether the bucket has fully refilled (and can be forgotten)."""
+        self._refill(now)
+        return self.tokens >= self.capacity
 
 
 class RateLimiter:
     """
-    Rate limiter to prevent exceeding API quotas.
-    Uses a sliding window approach to track requests.
+    Token-bucket rate limiter to prevent exceeding API quotas.
+    
+    Every request draws from a global bucket sized to the upstream quota.
+    Requests made for a user also draw from that user's bucket and from a
+    bucket shared by everyone on the same subscription plan, so one user
+    (or the free tier as a whole) cannot starve the rest.
+    
+    The global bucket may be shared across workers (MongoDB or Redis, see
+    services.rate_limit_backends); user and plan buckets are per process.
+    
+    Admission never holds a lock while sleeping: a caller reserves tokens
+    in its local buckets synchronously (asyncio runs that step without
+    interleaving) and in the global bucket atomically, then sleeps off its
+    own deficit. Reservations are handed out in arrival order, so waiters
+    are served fairly.
     """
     
-    def __init__(self, max_requests: int = 5, time_window: int = 60):
+    MAX_USER_BUCKETS = 10000
+    
+    def __init__(self, global_rpm: float = 5, plan_limits: Dict[str, dict] = None, global_bucket=None):
         """
         Initialize rate limiter.
         
         Args:
-            max_requests: Maximum number of requests allowed in time window
-            time_window: Time window in seconds (default: 60 seconds)
+            global_rpm: Upstream requests per minute shared by all users
+            plan_limits: Plan name -> {"user_rpm", "plan_rpm"}; must include "free"
+            global_bucket: Shared global bucket (defaults to an in-process bucket of global_rpm)
         """
-        self.max_requests = max_requests
-        self.time_window = time_window
-        self.requests = deque()  # Store timestamps of requests
-        self.lock = asyncio.Lock()  # Thread-safe operations
+        self.global_bucket = global_bucket or TokenBucket.per_minute(global_rpm)
+        self.plan_limits = plan_limits or {"free": {"user_rpm": global_rpm, "plan_rpm": global_rpm}}
+        self.plan_buckets = {
+            plan: TokenBucket.per_minute(limits["plan_rpm"])
+            for plan, limits in self.plan_limits.items()
+        }
+        self.user_buckets: Dict[str, TokenBucket] = {}
+        self.waiting = 0
+        self.granted = 0
+        self.rejected = 0
     
-    async def acquire(self) -> bool:
+    def _user_bucket(self, user_id: str, plan: str, now: float) -> TokenBucket:
+        """Get or create the bucket for a user on a plan."""
+        bucket = self.user_buckets.get(user_id)
+        user_rpm = self.plan_limits[plan]["user_rpm"]
+        
+        if bucket is None or bucket.capacity != user_rpm:
+            # Drop idle buckets before growing past the cap
+            if len(self.user_buckets) >= self.MAX_USER_BUCKETS:
+                self.user_buckets = {
+                    key: existing for key, existing in self.user_buckets.items()
+                    if not existing.is_full(now)
+                }
+            
+            bucket = TokenBucket.per_minute(user_rpm)
+            self.user_buckets[user_id] = bucket
+        
+        return bucket
+    
+    async def acquire(
+        self,
+        user_id: Optional[str] = None,
+        plan: str = "free",
+        max_wait: Optional[float] = None
+    ) -> bool:
         """
-        Attempt to acquire permission to make a request.
-        Blocks until permission is granted.
+        Acquire permission to make a request.
+        
+        Waits until every applicable bucket admits the request, unless that
+        would take longer than max_wait.
+        
+        Args:
+            user_id: User the request is made for (None for system requests)
+            plan: User's subscription plan ("free" if unknown)
+            max_wait: Longest acceptable wait in seconds (None = wait as long
+                as needed, 0 = fail fast)
         
         Returns:
             True when permission is granted
+        
+        Raises:
+            RateLimitExceeded: If admission would take longer than max_wait
         """
-        async with self.lock:
-            now = datetime.now()
-            
-            # Remove requests outside the time window
-            cutoff_time = now - timedelta(seconds=self.time_window)
-            while self.requests and self.requests[0] < cutoff_time:
-                self.requests.popleft()
-            
-            # If we're at the limit, wait until we can make a request
-            if len(self.requests) >= self.max_requests:
-                # Calculate how long to wait
-                oldest_request = self.requests[0]
-                wait_until = oldest_request + timedelta(seconds=self.time_window)
-                wait_seconds = (wait_until - now).total_seconds()
-                
-                if wait_seconds > 0:
-                    print(f"[Rate Limiter] Limit reached. Waiting {wait_seconds:.1f}s...")
-                    await asyncio.sleep(wait_seconds + 0.1)  # Add small buffer
-                    
-                    # Clean up again after waiting
-                    now = datetime.now()
-                    cutoff_time = now - timedelta(seconds=self.time_window)
-                    while self.requests and self.requests[0] < cutoff_time:
-                        self.requests.popleft()
-            
-            # Record this request
-            self.requests.append(now)
-            return True
+        now = time.monotonic()
+        
+        local_buckets = {}
+        if user_id is not None:
+            plan = plan if plan in self.plan_limits else "free"
+            local_buckets["plan"] = self.plan_buckets[plan]
+            local_buckets["user"] = self._user_bucket(str(user_id), plan, now)
+        
+        waits = {scope: bucket.wait_time(now) for scope, bucket in local_buckets.items()}
+        local_scope = max(waits, key=waits.get) if waits else None
+        local_wait = waits[local_scope] if waits else 0.0
+        
+        if max_wait is not None and local_wait > max_wait:
+            self.rejected += 1
+            raise RateLimitExceeded(local_wait, local_scope)
+        
+        # Reserve before any await so later callers queue behind this one
+        for bucket in local_buckets.values():
+            bucket.take()
+        
+        try:
+            global_wait, reserved = await self.global_bucket.reserve(max_wait)
+        except BaseException:
+            for bucket in local_buckets.values():
+                bucket.give_back()
+            raise
+        
+        if not reserved:
+            for bucket in local_buckets.values():
+                bucket.give_back()
+            self.rejected += 1
+            raise RateLimitExceeded(global_wait, "global")
+        
+        scope, wait_seconds = ("global", global_wait) if global_wait >= local_wait else (local_scope, local_wait)
+        
+        if wait_seconds > 0:
+            print(f"[Rate Limiter] {scope.capitalize()} limit reached. Waiting {wait_seconds:.1f}s...")
+            self.waiting += 1
+            try:
+                await asyncio.sleep(wait_seconds)
+            except asyncio.CancelledError:
+                # The caller went away; release its reservation
+                for bucket in local_buckets.values():
+                    bucket.give_back()
+                await self.global_bucket.release()
+                raise
+            finally:
+                self.waiting -= 1
+        
+        self.granted += 1
+        return True
     
-    def get_current_usage(self) -> dict:
+    def get_current_usage(self, user_id: Optional[str] = None) -> dict:
         """
         Get current rate limiter statistics.
         
+        Args:
+            user_id: Include this user's bucket if given
+        
         Returns:
             Dictionary with usage statistics
         """
-        now = datetime.now()
-        cutoff_time = now - timedelta(seconds=self.time_window)
-        
-        # Count requests in current window
-        active_requests = sum(1 for req_time in self.requests if req_time >= cutoff_time)
+        now = time.monotonic()
+        if isinstance(self.global_bucket, TokenBucket):
+            self.global_bucket._refill(now)
+        available = max(0, int(self.global_bucket.tokens))
+        capacity = int(self.global_bucket.capacity)
         
-        return {
-            "requests_in_window": active_requests,
-            "max_requests": self.max_requests,
-            "time_window_seconds": self.time_window,
-            "available_requests": max(0, self.max_requests - active_requests)
+        usage = {
+            "requests_in_window": capacity - available,
+            "max_requests": capacity,
+            "time_window_seconds": 60,
+            "available_requests": available,
+            "waiting": self.waiting,
+            "granted": self.granted,
+            "rejected": self.rejected,
+            "tracked_users": len(self.user_buckets),
+            "backend": getattr(self.global_bucket, "name", "memory")
         }
+        
+        bucket = self.user_buckets.get(str(user_id)) if user_id is not None else None
+        if bucket is not None:
+            bucket._refill(now)
+            usage["user_available_requests"] = max(0, int(bucket.tokens))
+            usage["user_max_requests"] = int(bucket.capacity)
+        
+        return usage
     
     async def reset(self):
-        """Reset the rate limiter (clear all tracked requests)."""
-        async with self.lock:
-            self.requests.clear()
+        """Reset the rate limiter (refill every in-process bucket)."""
+        now = time.monotonic()
+        local_buckets = list(self.plan_buckets.values())
+        if isinstance(self.global_bucket, TokenBucket):
+            local_buckets.append(self.global_bucket)
+        
+        for bucket in local_buckets:
+            bucket.tokens = bucket.capacity
+            bucket.updated = now
+        self.user_buckets.clear()
+
+
+def create_global_bucket(backend: str, requests_per_minute: float, redis_url: str = ""):
+    """
+    Build the global bucket for the configured rate limit backend.
+    
+    Args:
+        backend: "memory" (per process), "mongodb" or "redis"
+        requests_per_minute: Upstream quota
+        redis_url: Connection URL when backend is "redis"
+    
+    Returns:
+        Bucket exposing reserve/release
+    
+    Raises:
+        ValueError: If backend is not a known backend
+    """
+    if backend == "mongodb":
+        return MongoTokenBucket(requests_per_minute)
+    
+    if backend == "redis":
+        if not redis_url:
+            print("WARNING: Redis rate limit backend requires REDIS_URL - using MongoDB instead")
+            return MongoTokenBucket(requests_per_minute)
+        try:
+            return RedisTokenBucket(requests_per_minute, redis_url)
+        except ImportError:
+            print("WARNING: Redis rate limit backend requires the redis package - using MongoDB instead")
+            return MongoTokenBucket(requests_per_minute)
+    
+    if backend == "memory":
+        return TokenBucket.per_minute(requests_per_minute)
+    
+    raise ValueError(f"Unknown rate limit backend: {backend!r} (expected memory, mongodb or redis)")
 
 
 # Global rate limiter instance for AI requests
-# Set to 5 requests per 60 seconds (conservative for 5-6 RPM limit)
-ai_rate_limiter = RateLimiter(max_requests=5, time_window=60)
\ No newline at end of file
+# Upstream limit is 5 requests per 60 seconds (conservative for 5-6 RPM limit)
+ai_rate_limiter = RateLimiter(
+    global_rpm=ai_config.RATE_LIMIT_GLOBAL_RPM,
+    plan_limits=ai_config.RATE_LIMIT_PLANS,
+    global_bucket=create_global_bucket(
+        settings.rate_limit_backend,
+        ai_config.RATE_LIMIT_GLOBAL_RPM,
+        settings.redis_url
+    )
+)
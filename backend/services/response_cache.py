@@ -1,27 +1,65 @@
 """Response cache for AI queries to reduce API calls."""
+import asyncio
 import hashlib
 import json
+from collections import OrderedDict
 from typing import Optional, Dict
 from datetime import datetime, timedelta
 
+from config import settings
+from services.cache_backends import CacheBackend, create_cache_backend
+from services.semantic_cache import SemanticCache
+
 
 class ResponseCache:
     """
     Cache for AI responses to reduce API calls.
-    Uses in-memory storage with TTL (time-to-live).
+    Uses bounded in-memory LRU storage with TTL (time-to-live).
+    
+    Capacity is capped by entry count and optionally by total bytes;
+    the least recently used entries are evicted first. Expired entries
+    are dropped lazily on read and periodically by a background sweeper.
+    
+    With a shared backend configured, the in-memory LRU acts as an L1:
+    fetch() reads through to the backend on a miss and store() writes
+    through, so workers share answers and keep them across restarts.
+    
+    An optional semantic tier answers paraphrases of general (not
+    personalized) questions that miss every exact-key tier.
     """
     
-    def __init__(self, ttl_hours: int = 24):
+    def __init__(
+        self,
+        ttl_hours: int = 24,
+        max_entries: int = 5000,
+        max_bytes: int = 0,
+        backend: Optional[CacheBackend] = None,
+        semantic: Optional[SemanticCache] = None
+    ):
         """
         Initialize response cache.
         
         Args:
             ttl_hours: Time-to-live for cached responses in hours
+            max_entries: Maximum number of cached responses
+            max_bytes: Maximum total size of cached responses in bytes (0 = unlimited)
+            backend: Shared cache backend behind the in-memory L1 (optional)
+            semantic: Approximate-match tier for general questions (optional)
         """
-        self.cache: Dict[str, dict] = {}
+        self.cache: "OrderedDict[str, dict]" = OrderedDict()
         self.ttl_hours = ttl_hours
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes_used = 0
         self.hits = 0
         self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.backend = backend
+        self.backend_hits = 0
+        self.backend_errors = 0
+        self.semantic = semantic
+        self._sweeper: Optional[asyncio.Task] = None
     
     def _generate_key(self, user_message: str, user_data: Dict = None) -> str:
         """
@@ -52,6 +90,10 @@ class ResponseCache:
         cache_str = json.dumps(cache_data, sort_keys=True)
         return hashlib.md5(cache_str.encode()).hexdigest()
     
+    def key_for(self, user_message: str, user_data: Dict = None) -> str:
+        """Cache key for a message, also used to coalesce identical in-flight requests."""
+        return self._generate_key(user_message, user_data)
+    
     def _is_personalized_query(self, message: str) -> bool:
         """Check if query requires personalized data."""
         personalized_keywords = [
@@ -60,9 +102,67 @@ class ResponseCache:
         ]
         return any(keyword in message for keyword in personalized_keywords)
     
+    @staticmethod
+    def _entry_size(key: str, response: str, message: str) -> int:
+        """Approximate memory footprint of an entry in bytes."""
+        return len(key) + len(response.encode("utf-8")) + len(message.encode("utf-8"))
+    
+    def _remove(self, key: str) -> dict:
+        """Remove an entry and release its bytes."""
+        entry = self.cache.pop(key)
+        self.bytes_used -= entry["size"]
+        return entry
+    
+    def _evict_to_fit(self):
+        """Evict least recently used entries until within capacity."""
+        while self.cache and (
+            len(self.cache) > self.max_entries
+            or (self.max_bytes and self.bytes_used > self.max_bytes)
+        ):
+            self._remove(next(iter(self.cache)))
+            self.evictions += 1
+    
+    def _get_local(self, key: str) -> Optional[str]:
+        """Look up a key in the in-memory L1, dropping it if expired."""
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        
+        # Check if expired
+        if datetime.utcnow() < entry["expires_at"]:
+            self.cache.move_to_end(key)
+            return entry["response"]
+        
+        # Remove expired entry
+        self._remove(key)
+        self.expirations += 1
+        return None
+    
+    def _set_local(self, key: str, response: str, message: str, expires_at: datetime) -> bool:
+        """Store an entry in the in-memory L1. Returns False if it is too large."""
+        size = self._entry_size(key, response, message)
+        
+        # A single response larger than the whole budget is never cached
+        if self.max_bytes and size > self.max_bytes:
+            return False
+        
+        if key in self.cache:
+            self._remove(key)
+        
+        self.cache[key] = {
+            "response": response,
+            "cached_at": datetime.utcnow(),
+            "expires_at": expires_at,
+            "message": message,
+            "size": size
+        }
+        self.bytes_used += size
+        self._evict_to_fit()
+        return True
+    
     def get(self, user_message: str, user_data: Dict = None) -> Optional[str]:
         """
-        Get cached response if available and not expired.
+        Get cached response from the in-memory L1 if available and not expired.
         
         Args:
             user_message: User's question
@@ -72,18 +172,12 @@ class ResponseCache:
             Cached response or None
         """
         key = self._generate_key(user_message, user_data)
+        response = self._get_local(key)
         
-        if key in self.cache:
-            entry = self.cache[key]
-            
-            # Check if expired
-            if datetime.now() < entry["expires_at"]:
-                self.hits += 1
-                print(f"[Cache] HIT for: {user_message[:50]}...")
-                return entry["response"]
-            else:
-                # Remove expired entry
-                del self.cache[key]
+        if response is not None:
+            self.hits += 1
+            print(f"[Cache] HIT for: {user_message[:50]}...")
+            return response
         
         self.misses += 1
         print(f"[Cache] MISS for: {user_message[:50]}...")
@@ -91,7 +185,7 @@ class ResponseCache:
     
     def set(self, user_message: str, response: str, user_data: Dict = None):
         """
-        Cache a response.
+        Cache a response in the in-memory L1.
         
         Args:
             user_message: User's question
@@ -99,50 +193,188 @@ class ResponseCache:
             user_data: User's financial context
         """
         key = self._generate_key(user_message, user_data)
+        expires_at = datetime.utcnow() + timedelta(hours=self.ttl_hours)
         
-        self.cache[key] = {
+        # Store message prefix for debugging
+        if self._set_local(key, response, user_message[:100], expires_at):
+            print(f"[Cache] STORED: {user_message[:50]}...")
+        else:
+            print(f"[Cache] SKIPPED (too large): {user_message[:50]}...")
+        
+        # Index general questions for paraphrase matching
+        if self.semantic is not None and not self._is_personalized_query(user_message.lower().strip()):
+            self.semantic.add(user_message, response, self.ttl_hours * 3600)
+    
+    async def fetch(self, user_message: str, user_data: Dict = None) -> Optional[str]:
+        """
+        Get cached response, reading through to the shared backend on an L1 miss.
+        
+        Args:
+            user_message: User's question
+            user_data: User's financial context
+        
+        Returns:
+            Cached response or None
+        """
+        key = self._generate_key(user_message, user_data)
+        response = self._get_local(key)
+        
+        if response is not None:
+            self.hits += 1
+            print(f"[Cache] HIT for: {user_message[:50]}...")
+            return response
+        
+        if self.backend is not None:
+            try:
+                entry = await self.backend.get(key)
+            except Exception as e:
+                # The shared cache is an optimization; never fail the request
+                self.backend_errors += 1
+                print(f"[Cache] Backend read failed: {e}")
+                entry = None
+            
+            if entry is not None:
+                self._set_local(key, entry["response"], entry["message"], entry["expires_at"])
+                self.backend_hits += 1
+                print(f"[Cache] {self.backend.name.upper()} HIT for: {user_message[:50]}...")
+                return entry["response"]
+        
+        # Paraphrase of an answered general question
+        if self.semantic is not None and not self._is_personalized_query(user_message.lower().strip()):
+            response = self.semantic.lookup(user_message)
+            if response is not None:
+                self._set_local(key, response, user_message[:100], datetime.utcnow() + timedelta(hours=self.ttl_hours))
+                self.hits += 1
+                return response
+        
+        self.misses += 1
+        print(f"[Cache] MISS for: {user_message[:50]}...")
+        return None
+    
+    async def store(self, user_message: str, response: str, user_data: Dict = None):
+        """
+        Cache a response in the L1 and write it through to the shared backend.
+        
+        Args:
+            user_message: User's question
+            response: AI's response
+            user_data: User's financial context
+        """
+        self.set(user_message, response, user_data)
+        
+        if self.backend is None:
+            return
+        
+        key = self._generate_key(user_message, user_data)
+        entry = {
             "response": response,
-            "cached_at": datetime.now(),
-            "expires_at": datetime.now() + timedelta(hours=self.ttl_hours),
-            "message": user_message[:100]  # Store for debugging
+            "message": user_message[:100],
+            "expires_at": datetime.utcnow() + timedelta(hours=self.ttl_hours)
         }
         
-        print(f"[Cache] STORED: {user_message[:50]}...")
+        try:
+            await self.backend.set(key, entry)
+        except Exception as e:
+            self.backend_errors += 1
+            print(f"[Cache] Backend write failed: {e}")
     
-    def clear_expired(self):
-        """Remove all expired entries from cache."""
-        now = datetime.now()
+    def clear_expired(self) -> int:
+        """
+        Remove all expired entries from cache.
+        
+        Returns:
+            Number of entries removed
+        """
+        now = datetime.utcnow()
         expired_keys = [
             key for key, entry in self.cache.items()
             if now >= entry["expires_at"]
         ]
         
         for key in expired_keys:
-            del self.cache[key]
+            self._remove(key)
+        self.expirations += len(expired_keys)
         
         if expired_keys:
             print(f"[Cache] Cleared {len(expired_keys)} expired entries")
+        return len(expired_keys)
+    
+    async def _sweep_forever(self, interval_seconds: float):
+        """Periodically drop expired entries."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            self.clear_expired()
+    
+    def start_sweeper(self, interval_seconds: float = 300):
+        """
+        Start the background task that clears expired entries.
+        
+        Args:
+            interval_seconds: Seconds between sweeps
+        """
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep_forever(interval_seconds))
+    
+    async def stop_sweeper(self):
+        """Cancel the background sweeper if it is running."""
+        if self._sweeper is None:
+            return
+        
+        self._sweeper.cancel()
+        try:
+            await self._sweeper
+        except asyncio.CancelledError:
+            pass
+        self._sweeper = None
     
     def get_stats(self) -> dict:
         """Get cache statistics."""
         total_requests = self.hits + self.misses
         hit_rate = (self.hits / total_requests * 100) if total_requests > 0 else 0
+        total_entries = len(self.cache)
+        avg_entry_size = (self.bytes_used / total_entries) if total_entries > 0 else 0
         
         return {
-            "total_entries": len(self.cache),
+            "total_entries": total_entries,
+            "max_entries": self.max_entries,
             "hits": self.hits,
             "misses": self.misses,
             "hit_rate": f"{hit_rate:.1f}%",
-            "ttl_hours": self.ttl_hours
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "bytes_used": self.bytes_used,
+            "max_bytes": self.max_bytes,
+            "avg_entry_bytes": round(avg_entry_size),
+            "ttl_hours": self.ttl_hours,
+            "backend": self.backend.name if self.backend is not None else "memory",
+            "backend_hits": self.backend_hits,
+            "backend_errors": self.backend_errors,
+            "semantic": self.semantic.get_stats() if self.semantic is not None else None
         }
     
     def clear(self):
         """Clear all cache entries."""
         self.cache.clear()
+        self.bytes_used = 0
         self.hits = 0
         self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.backend_hits = 0
+        self.backend_errors = 0
+        if self.semantic is not None:
+            self.semantic.clear()
         print("[Cache] Cleared all entries")
 
 
 # Global cache instance
-response_cache = ResponseCache(ttl_hours=24)
\ No newline at end of file
+response_cache = ResponseCache(
+    ttl_hours=24,
+    max_entries=settings.response_cache_max_entries,
+    max_bytes=settings.response_cache_max_bytes,
+    backend=create_cache_backend(settings.response_cache_backend, settings.redis_url),
+    semantic=SemanticCache(
+        threshold=settings.semantic_cache_threshold,
+        max_entries=settings.semantic_cache_max_entries
+    ) if settings.semantic_cache_enabled else None
+)
@@ -7,19 +7,22 @@ from typing import List, Dict
 from bson import ObjectId
 import random
 
+from services.daily_rollups import add_to_rollups
+from services.user_context_cache import user_context_cache
+
 
 async def seed_sample_data_for_user(db, user_id: ObjectId):
     """
     Seed sample data for a new user including:
-    - 3 connected accounts (Square, Stripe, Bank)
+    - Connected accounts for whichever of Square, Stripe and Bank are not
+      connected yet
     - 50-80 sample transactions across last 30 days
     - Realistic financial data for dashboard testing
     """
     
-    # Check if user already has data
-    existing_accounts = await db.connected_accounts.count_documents({"user_id": user_id})
-    if existing_accounts > 0:
-        print(f"User {user_id} already has sample data, skipping...")
+    # Check if user already has data (a first connected account alone doesn't count)
+    if await db.transactions.count_documents({"user_id": user_id}, limit=1):
+        print(f"User {user_id} already has transactions, skipping...")
         return
     
     print(f"Seeding sample data for user {user_id}...")
@@ -46,8 +49,11 @@ async def seed_sample_data_for_user(db, user_id: ObjectId):
         }
     ]
     
-    await db.connected_accounts.insert_many(accounts)
-    print(f"  ✓ Created 3 connected accounts")
+    connected_sources = await db.connected_accounts.distinct("source", {"user_id": user_id})
+    accounts = [account for account in accounts if account["source"] not in connected_sources]
+    if accounts:
+        await db.connected_accounts.insert_many(accounts)
+    print(f"  ✓ Created {len(accounts)} connected accounts")
     
     # 2. Generate sample transactions
     transactions = []
@@ -75,7 +81,7 @@ async def seed_sample_data_for_user(db, user_id: ObjectId):
             "payment_method": random.choice(["Square POS", "Stripe", "Bank Transfer"]),
             "original_description": None,
             "created_at": transaction_date,
-            "updated_at": transaction_date
+            "updated_at": now  # Write time: incremental exports key on updated_at
         })
     
     # Expense transactions (60% of total)
@@ -116,12 +122,14 @@ async def seed_sample_data_for_user(db, user_id: ObjectId):
             "payment_method": random.choice(["Business Debit", "Business Credit", "ACH Transfer", "Check"]),
             "original_description": vendor.upper(),
             "created_at": transaction_date,
-            "updated_at": transaction_date
+            "updated_at": now  # Write time: incremental exports key on updated_at
         })
     
     # Insert all transactions
     if transactions:
         await db.transactions.insert_many(transactions)
+        await add_to_rollups(db, transactions)
+        user_context_cache.invalidate(user_id)
         print(f"  ✓ Created {len(transactions)} sample transactions")
     
     # Calculate summary stats
@@ -136,7 +144,7 @@ async def seed_sample_data_for_user(db, user_id: ObjectId):
     print(f"    - Net profit: ${(total_revenue - total_expenses):,.2f}")
     
     return {
-        "accounts_created": 3,
+        "accounts_created": len(accounts),
         "transactions_created": len(transactions),
         "revenue_count": revenue_count,
         "expense_count": expense_count,
@@ -0,0 +1,206 @@
+"""Approximate-match tier for the AI response cache."""
+import re
+import time
+import zlib
+from typing import Optional
+
+import numpy as np
+
+
+class SemanticCache:
+    """
+    Similarity index over previously answered general questions.
+    
+    Questions are embedded locally as hashed character n-gram vectors
+    (sublinear TF, L2-normalized), so paraphrases such as "What's double
+    entry bookkeeping" land close to "what is double-entry bookkeeping?".
+    A lookup is one matrix-vector product over the index; the best match
+    is served if its cosine similarity reaches the threshold.
+    
+    N-gram overlap cannot tell "expenses in 2023" from "expenses in 2024"
+    or "is rent deductible" from "is rent not deductible", so a match is
+    only accepted if both questions contain the same numbers and negation
+    words.
+    
+    The index grows geometrically up to max_entries and then acts as a
+    ring: the oldest entry is overwritten.
+    """
+    
+    NGRAM_SIZES = (3, 4, 5)
+    
+    # Words that flip a question's meaning while barely changing its n-grams
+    NEGATIONS = frozenset({"not", "no", "never", "without"})
+    
+    def __init__(self, threshold: float = 0.85, max_entries: int = 1000, dimensions: int = 4096):
+        """
+        Initialize semantic cache.
+        
+        Args:
+            threshold: Minimum cosine similarity to serve a cached response
+            max_entries: Maximum number of indexed questions
+            dimensions: Size of the hashed n-gram vectors
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.dimensions = dimensions
+        
+        self.vectors = np.zeros((0, dimensions), dtype=np.float32)
+        self.expires_at = np.zeros(0, dtype=np.float64)
+        self.messages: list = []
+        self.responses: list = []
+        self.guards: list = []
+        self.next_slot = 0
+        
+        self.hits = 0
+        self.misses = 0
+        self.hit_similarity_total = 0.0
+        self.miss_similarity_total = 0.0
+    
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """Lowercase, expand "'s" contractions and collapse punctuation."""
+        text = text.lower()
+        text = re.sub(r"[’']s\b", " is", text)
+        text = re.sub(r"n[’']t\b", " not", text)
+        text = re.sub(r"[^a-z0-9]+", " ", text)
+        return " ".join(text.split())
+    
+    def _guard(self, text: str) -> frozenset:
+        """Numbers and negation words that must match exactly."""
+        return frozenset(
+            word for word in self._normalize(text).split()
+            if word in self.NEGATIONS or any(char.isdigit() for char in word)
+        )
+    
+    def _vectorize(self, text: str) -> np.ndarray:
+        """Embed text as a normalized hashed character n-gram vector."""
+        padded = f" {self._normalize(text)} "
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        
+        for n in self.NGRAM_SIZES:
+            for i in range(len(padded) - n + 1):
+                vector[zlib.crc32(padded[i:i + n].encode()) % self.dimensions] += 1
+        
+        vector = np.log1p(vector)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+    
+    def _best_match(self, vector: np.ndarray, guard: frozenset, threshold: float) -> tuple:
+        """
+        Index and similarity of the closest unexpired entry with the same guard.
+        
+        Returns (-1, best similarity seen) if no entry reaches the threshold
+        with a matching guard.
+        """
+        if len(self.messages) == 0:
+            return -1, 0.0
+        
+        count = len(self.messages)
+        similarities = self.vectors[:count] @ vector
+        similarities[self.expires_at[:count] <= time.time()] = -1.0
+        
+        # Most similar first; only candidates above the threshold are checked
+        candidates = np.flatnonzero(similarities >= threshold)
+        for slot in candidates[np.argsort(-similarities[candidates])]:
+            if self.guards[slot] == guard:
+                return int(slot), float(similarities[slot])
+        
+        return -1, float(similarities.max())
+    
+    def _ensure_capacity(self, rows: int):
+        """Grow the index arrays geometrically, up to max_entries rows."""
+        capacity = len(self.expires_at)
+        if rows <= capacity:
+            return
+        
+        count = len(self.messages)
+        capacity = min(self.max_entries, max(rows, capacity * 2, 16))
+        vectors = np.zeros((capacity, self.dimensions), dtype=np.float32)
+        vectors[:count] = self.vectors[:count]
+        expires_at = np.zeros(capacity, dtype=np.float64)
+        expires_at[:count] = self.expires_at[:count]
+        
+        self.vectors = vectors
+        self.expires_at = expires_at
+    
+    def add(self, user_message: str, response: str, ttl_seconds: float):
+        """
+        Index an answered question.
+        
+        Args:
+            user_message: User's question
+            response: AI's response
+            ttl_seconds: Seconds until the entry expires
+        """
+        vector = self._vectorize(user_message)
+        guard = self._guard(user_message)
+        expires_at = time.time() + ttl_seconds
+        
+        # Refresh an entry for the same question instead of duplicating it
+        slot, _ = self._best_match(vector, guard, 0.999)
+        if slot < 0:
+            if len(self.messages) < self.max_entries:
+                slot = len(self.messages)
+                self._ensure_capacity(slot + 1)
+                self.messages.append(None)
+                self.responses.append(None)
+                self.guards.append(None)
+            else:
+                slot = self.next_slot
+                self.next_slot = (self.next_slot + 1) % self.max_entries
+        
+        self.vectors[slot] = vector
+        self.expires_at[slot] = expires_at
+        self.messages[slot] = user_message[:100]
+        self.responses[slot] = response
+        self.guards[slot] = guard
+    
+    def lookup(self, user_message: str) -> Optional[str]:
+        """
+        Find the response to the most similar indexed question.
+        
+        Args:
+            user_message: User's question
+        
+        Returns:
+            Cached response if similarity reaches the threshold, else None
+        """
+        slot, similarity = self._best_match(self._vectorize(user_message), self._guard(user_message), self.threshold)
+        
+        if slot >= 0:
+            self.hits += 1
+            self.hit_similarity_total += similarity
+            print(f"[Cache] SEMANTIC HIT ({similarity:.2f}) for: {user_message[:50]}... ~ {self.messages[slot][:50]}")
+            return self.responses[slot]
+        
+        self.misses += 1
+        self.miss_similarity_total += max(similarity, 0.0)
+        return None
+    
+    def get_stats(self) -> dict:
+        """Get semantic cache statistics."""
+        total_requests = self.hits + self.misses
+        hit_rate = (self.hits / total_requests * 100) if total_requests > 0 else 0
+        
+        return {
+            "total_entries": len(self.messages),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": f"{hit_rate:.1f}%",
+            "threshold": self.threshold,
+            "avg_hit_similarity": round(self.hit_similarity_total / self.hits, 3) if self.hits else None,
+            "avg_miss_best_similarity": round(self.miss_similarity_total / self.misses, 3) if self.misses else None
+        }
+    
+    def clear(self):
+        """Clear the index and statistics."""
+        self.vectors = np.zeros((0, self.dimensions), dtype=np.float32)
+        self.expires_at = np.zeros(0, dtype=np.float64)
+        self.messages = []
+        self.responses = []
+        self.guards = []
+        self.next_slot = 0
+        self.hits = 0
+        self.misses = 0
+        self.hit_similarity_total = 0.0
+        self.miss_similarity_total = 0.0
@@ -0,0 +1,128 @@
+"""Cache of authenticated users for the get_current_user dependency."""
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+from datetime import datetime, timedelta
+
+from models.user import UserInDB
+
+
+class UserCache:
+    """
+    Short-lived cache of validated UserInDB objects keyed by user id and token.
+    
+    Lets authenticated requests skip the users lookup and model validation.
+    Entries expire after a short TTL, the least recently used are evicted
+    when full, and every entry for a user is dropped when their user
+    document changes.
+    """
+    
+    def __init__(self, ttl_seconds: int = 60, max_entries: int = 10000):
+        """
+        Initialize user cache.
+        
+        Args:
+            ttl_seconds: Time-to-live for cached users in seconds
+            max_entries: Maximum number of (user, token) entries kept
+        """
+        self.cache: "OrderedDict[Tuple[str, str], dict]" = OrderedDict()
+        self.keys_by_user: Dict[str, Set[Tuple[str, str]]] = {}
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    def _remove(self, key: Tuple[str, str]):
+        """Remove an entry and its per-user index reference."""
+        del self.cache[key]
+        
+        user_keys = self.keys_by_user.get(key[0])
+        if user_keys is not None:
+            user_keys.discard(key)
+            if not user_keys:
+                del self.keys_by_user[key[0]]
+    
+    def get(self, user_id: str, token: str) -> Optional[UserInDB]:
+        """
+        Get a cached user if present and not expired.
+        
+        Args:
+            user_id: User ID from the token subject
+            token: Bearer token the user authenticated with
+        
+        Returns:
+            Cached user or None
+        """
+        key = (str(user_id), token)
+        entry = self.cache.get(key)
+        
+        if entry is not None:
+            if datetime.now() < entry["expires_at"]:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return entry["user"]
+            
+            # Remove expired entry
+            self._remove(key)
+        
+        self.misses += 1
+        return None
+    
+    def set(self, user_id: str, token: str, user: UserInDB):
+        """
+        Cache a validated user.
+        
+        Args:
+            user_id: User ID from the token subject
+            token: Bearer token the user authenticated with
+            user: Validated user model
+        """
+        key = (str(user_id), token)
+        
+        if key in self.cache:
+            self._remove(key)
+        elif len(self.cache) >= self.max_entries:
+            # Evict the least recently used entry
+            self._remove(next(iter(self.cache)))
+        
+        self.cache[key] = {
+            "user": user,
+            "expires_at": datetime.now() + timedelta(seconds=self.ttl_seconds)
+        }
+        self.keys_by_user.setdefault(key[0], set()).add(key)
+    
+    def invalidate(self, user_id):
+        """Drop every cached entry for a user after their user document changes."""
+        user_keys = self.keys_by_user.pop(str(user_id), None)
+        if not user_keys:
+            return
+        
+        for key in user_keys:
+            self.cache.pop(key, None)
+        self.invalidations += 1
+    
+    def get_stats(self) -> dict:
+        """Get cache statistics."""
+        total_requests = self.hits + self.misses
+        hit_rate = (self.hits / total_requests * 100) if total_requests > 0 else 0
+        
+        return {
+            "total_entries": len(self.cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": f"{hit_rate:.1f}%",
+            "ttl_seconds": self.ttl_seconds
+        }
+    
+    def clear(self):
+        """Clear all cache entries."""
+        self.cache.clear()
+        self.keys_by_user.clear()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+
+# Global authenticated user cache instance
+user_cache = UserCache(ttl_seconds=60)
@@ -0,0 +1,99 @@
+"""Per-user cache of the financial context used to ground AI responses."""
+from typing import Optional, Dict
+from datetime import datetime, timedelta
+
+
+class UserContextCache:
+    """
+    Cache of each user's financial summary for the AI chat path.
+    Entries expire after a short TTL and are invalidated whenever the
+    user's transactions change.
+    """
+    
+    def __init__(self, ttl_seconds: int = 300, max_entries: int = 10000):
+        """
+        Initialize user context cache.
+        
+        Args:
+            ttl_seconds: Time-to-live for cached contexts in seconds
+            max_entries: Maximum number of users kept in the cache
+        """
+        self.cache: Dict[str, dict] = {}
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    def get(self, user_id) -> Optional[dict]:
+        """
+        Get a user's cached financial context if present and not expired.
+        
+        Args:
+            user_id: User ID (ObjectId or string)
+        
+        Returns:
+            Cached financial context or None
+        """
+        key = str(user_id)
+        entry = self.cache.get(key)
+        
+        if entry is not None:
+            if datetime.now() < entry["expires_at"]:
+                self.hits += 1
+                return entry["data"]
+            
+            # Remove expired entry
+            del self.cache[key]
+        
+        self.misses += 1
+        return None
+    
+    def set(self, user_id, data: dict):
+        """
+        Cache a user's financial context.
+        
+        Args:
+            user_id: User ID (ObjectId or string)
+            data: Financial context dictionary
+        """
+        key = str(user_id)
+        
+        # Make room by dropping the oldest entry (dicts keep insertion order)
+        if key not in self.cache and len(self.cache) >= self.max_entries:
+            del self.cache[next(iter(self.cache))]
+        
+        self.cache[key] = {
+            "data": data,
+            "expires_at": datetime.now() + timedelta(seconds=self.ttl_seconds)
+        }
+    
+    def invalidate(self, user_id):
+        """Drop a user's cached context after their transactions change."""
+        if self.cache.pop(str(user_id), None) is not None:
+            self.invalidations += 1
+    
+    def get_stats(self) -> dict:
+        """Get cache statistics."""
+        total_requests = self.hits + self.misses
+        hit_rate = (self.hits / total_requests * 100) if total_requests > 0 else 0
+        
+        return {
+            "total_entries": len(self.cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": f"{hit_rate:.1f}%",
+            "ttl_seconds": self.ttl_seconds
+        }
+    
+    def clear(self):
+        """Clear all cache entries."""
+        self.cache.clear()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+
+# Global user context cache instance
+user_context_cache = UserContextCache(ttl_seconds=300)
@@ -0,0 +1,166 @@
+"""
+Benchmark: login latency and event-loop responsiveness under a login burst.
+
+Serves the FastAPI app with uvicorn in this process against the configured
+MongoDB, creates a throwaway user, fires concurrent logins and probes
+GET / meanwhile. Compares argon2.verify called inline on the event loop
+with the bounded password hashing pool.
+
+Usage:
+    python test_auth_load.py
+"""
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import uvicorn
+from motor.motor_asyncio import AsyncIOMotorClient
+from passlib.hash import argon2
+
+import database
+from config import settings
+from main import app
+from routers import auth
+from services.password_hasher import password_hasher
+
+APP_PORT = 8767
+CONCURRENT_LOGINS = 32
+PROBE_INTERVAL = 0.02
+PASSWORD = "Bench123!@#"
+
+
+class InlineHasher:
+    """The previous behaviour: argon2 on the event loop."""
+    
+    async def verify(self, password: str, password_hash: str) -> bool:
+        return argon2.verify(password, password_hash)
+
+
+async def http_request(method: str, path: str, body: dict = None) -> float:
+    """Send one HTTP/1.1 request to the app and time it."""
+    payload = json.dumps(body).encode() if body is not None else b""
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection("127.0.0.1", APP_PORT)
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n".encode() + payload
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    
+    if not response.startswith(b"HTTP/1.1 200"):
+        raise RuntimeError(f"{method} {path} failed: {response[:80]!r}")
+    return time.perf_counter() - start
+
+
+async def probe_until(done: asyncio.Event) -> list:
+    """Probe GET / repeatedly until the login burst finishes."""
+    latencies = []
+    while not done.is_set():
+        latencies.append(await http_request("GET", "/"))
+        await asyncio.sleep(PROBE_INTERVAL)
+    return latencies
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of a sorted list, in milliseconds."""
+    if not values:
+        return 0
+    index = min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))
+    return values[index] * 1000
+
+
+async def run_phase(label: str, email: str) -> dict:
+    """Fire a burst of concurrent logins while probing GET /."""
+    done = asyncio.Event()
+    probe_task = asyncio.create_task(probe_until(done))
+    
+    start = time.perf_counter()
+    logins = sorted(await asyncio.gather(*[
+        http_request("POST", "/api/v1/auth/login", {"email": email, "password": PASSWORD})
+        for _ in range(CONCURRENT_LOGINS)
+    ]))
+    elapsed = time.perf_counter() - start
+    
+    done.set()
+    probes = sorted(await probe_task)
+    
+    result = {
+        "label": label,
+        "login_p50_ms": percentile(logins, 50),
+        "login_p99_ms": percentile(logins, 99),
+        "probe_p50_ms": statistics.median(probes) * 1000 if probes else 0,
+        "probe_max_ms": percentile(probes, 100)
+    }
+    
+    print(f"\n[{label}]")
+    print(f"  {CONCURRENT_LOGINS} logins took {elapsed:.2f}s")
+    print(f"  login p50 {result['login_p50_ms']:.0f}ms, p99 {result['login_p99_ms']:.0f}ms")
+    print(f"  GET / probes: {len(probes)}, p50 {result['probe_p50_ms']:.1f}ms, max {result['probe_max_ms']:.1f}ms")
+    return result
+
+
+async def main():
+    """Run the inline and pooled phases and compare latencies."""
+    print("=" * 60)
+    print("BENCHMARK: LOGIN BURST VS EVENT LOOP RESPONSIVENESS")
+    print("=" * 60)
+    
+    database.mongodb_client = AsyncIOMotorClient(settings.mongodb_uri)
+    db = database.get_database()
+    
+    email = f"authload_{datetime.utcnow().timestamp()}@example.com"
+    result = await db.users.insert_one({
+        "email": email,
+        "password_hash": argon2.hash(PASSWORD),
+        "first_name": "Auth",
+        "last_name": "Load",
+        "business_name": "Auth Load Benchmark",
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow()
+    })
+    
+    server = uvicorn.Server(uvicorn.Config(app, port=APP_PORT, lifespan="off", log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    
+    try:
+        auth.password_hasher = InlineHasher()
+        inline = await run_phase("argon2 inline on event loop", email)
+        
+        auth.password_hasher = password_hasher
+        pooled = await run_phase(f"argon2 pool ({password_hasher.max_workers} workers)", email)
+        print(f"  pool stats: {password_hasher.get_stats()}")
+    finally:
+        server.should_exit = True
+        await server_task
+        await db.users.delete_one({"_id": result.inserted_id})
+        database.mongodb_client.close()
+    
+    print("\n" + "=" * 60)
+    print("RESULTS")
+    print("=" * 60)
+    print(f"Login p99: inline {inline['login_p99_ms']:.0f}ms vs pooled {pooled['login_p99_ms']:.0f}ms")
+    print(f"Max GET / latency: inline {inline['probe_max_ms']:.0f}ms vs pooled {pooled['probe_max_ms']:.0f}ms")
+    
+    if pooled["probe_max_ms"] < inline["probe_max_ms"] / 2:
+        print("\n[SUCCESS] Other endpoints stay responsive during a login burst")
+        return True
+    
+    print("\n[FAIL] GET / stalled while logins were hashing")
+    return False
+
+
+if __name__ == "__main__":
+    result = asyncio.run(main())
+    sys.exit(0 if result else 1)
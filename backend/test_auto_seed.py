@@ -147,6 +147,7 @@ async def test_auto_seed():
     print(f"\n[CLEANUP] Removing test user and data...")
     await db.users.delete_one({"_id": user_id})
     await db.connected_accounts.delete_many({"user_id": user_id})
+    await db.daily_rollups.delete_many({"user_id": user_id})
     await db.transactions.delete_many({"user_id": user_id})
     print("  [OK] Cleanup complete")
     
@@ -0,0 +1,158 @@
+"""
+Bulk transaction update check.
+Calls PATCH /api/v1/transactions/bulk against MongoDB and verifies per-id
+results, the written changes and the daily rollups.
+"""
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from motor.motor_asyncio import AsyncIOMotorClient
+from bson import ObjectId
+import os
+from dotenv import load_dotenv
+
+import database
+import routers.transactions
+from routers.transactions import (
+    bulk_update_transactions,
+    BulkUpdateTransactionsRequest,
+    BulkTransactionFilter
+)
+from services.daily_rollups import add_to_rollups
+from test_helpers import Checks
+
+# Load environment variables
+load_dotenv()
+
+MONGODB_URI = os.getenv("MONGODB_URI")
+DATABASE_NAME = "finsense"
+
+
+async def category_totals(db, user_id: ObjectId) -> dict:
+    """Expense totals per category from the daily rollups."""
+    totals = {}
+    async for rollup in db.daily_rollups.find({"user_id": user_id}):
+        totals[rollup["category"]] = totals.get(rollup["category"], 0) + rollup["expenses"]
+    return {category: round(total, 2) for category, total in totals.items() if total}
+
+
+class RacingTransactions:
+    """Transactions collection that recategorizes one row just before bulk_write."""
+    
+    def __init__(self, collection, racing_id: ObjectId):
+        self.collection = collection
+        self.racing_id = racing_id
+    
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+    
+    async def bulk_write(self, operations, **kwargs):
+        await self.collection.update_one({"_id": self.racing_id}, {"$set": {"category": "Marketing"}})
+        return await self.collection.bulk_write(operations, **kwargs)
+
+
+async def test_bulk_transactions():
+    """Check bulk updates by ids and by filter."""
+    
+    client = AsyncIOMotorClient(MONGODB_URI)
+    db = client[DATABASE_NAME]
+    database.mongodb_client = client
+    
+    print("=" * 60)
+    print("TESTING BULK TRANSACTION UPDATE")
+    print("=" * 60)
+    check = Checks()
+    
+    user = SimpleNamespace(id=ObjectId())
+    now = datetime.utcnow()
+    transactions = [
+        {
+            "user_id": user.id,
+            "date": now - timedelta(days=i % 5),
+            "vendor": f"Vendor {i}",
+            "amount": 10.0,
+            "category": "Uncategorized",
+            "confidence": 0.5,
+            "status": "needs-review",
+            "explanation": "",
+            "payment_method": "card",
+            "created_at": now,
+            "updated_at": now
+        }
+        for i in range(1000)
+    ]
+    await db.transactions.insert_many(transactions)
+    await add_to_rollups(db, transactions)
+    ids = [str(trans["_id"]) for trans in transactions]
+    
+    print("\n[Test 1] Update by ids")
+    started = datetime.utcnow()
+    response = await bulk_update_transactions(
+        BulkUpdateTransactionsRequest(
+            ids=ids[:600] + ["not-an-id", str(ObjectId())],
+            category="Supplies",
+            status="manual"
+        ),
+        current_user=user
+    )
+    elapsed_ms = (datetime.utcnow() - started).total_seconds() * 1000
+    summary = response["summary"]
+    check(f"600 updated in {elapsed_ms:.0f}ms", summary.get("updated") == 600)
+    check("invalid and unknown ids reported", summary.get("invalid_id") == 1 and summary.get("not_found") == 1)
+    check("changes written", await db.transactions.count_documents(
+        {"user_id": user.id, "category": "Supplies", "status": "manual"}) == 600)
+    totals = await category_totals(db, user.id)
+    check(f"rollups moved: {totals}", totals == {"Supplies": 6000.0, "Uncategorized": 4000.0})
+    
+    print("\n[Test 2] Re-applying is a no-op")
+    response = await bulk_update_transactions(
+        BulkUpdateTransactionsRequest(ids=ids[:10], category="Supplies", status="manual"),
+        current_user=user
+    )
+    check("10 unchanged", response["summary"] == {"unchanged": 10})
+    
+    print("\n[Test 3] Update by filter")
+    response = await bulk_update_transactions(
+        BulkUpdateTransactionsRequest(
+            filter=BulkTransactionFilter(status="needs-review"),
+            status="auto-approved"
+        ),
+        current_user=user
+    )
+    check(f"{response['updated']} remaining needs-review approved", response["updated"] == 400)
+    totals = await category_totals(db, user.id)
+    check("status-only change leaves rollups alone", totals == {"Supplies": 6000.0, "Uncategorized": 4000.0})
+    
+    print("\n[Test 4] Concurrently changed transactions are conflicts")
+    racing_id = transactions[600]["_id"]
+    racing_db = SimpleNamespace(
+        transactions=RacingTransactions(db.transactions, racing_id),
+        daily_rollups=db.daily_rollups
+    )
+    routers.transactions.get_database = lambda: racing_db
+    try:
+        response = await bulk_update_transactions(
+            BulkUpdateTransactionsRequest(ids=ids[600:610], category="Supplies"),
+            current_user=user
+        )
+    finally:
+        routers.transactions.get_database = database.get_database
+    summary = response["summary"]
+    check(f"9 updated, 1 conflict: {summary}", summary == {"updated": 9, "conflict": 1})
+    racing = await db.transactions.find_one({"_id": racing_id})
+    check("concurrent change kept", racing["category"] == "Marketing")
+    totals = await category_totals(db, user.id)
+    check("conflict left out of the rollup move", totals == {"Supplies": 6090.0, "Uncategorized": 3910.0})
+    
+    # Cleanup
+    await db.transactions.delete_many({"user_id": user.id})
+    await db.daily_rollups.delete_many({"user_id": user.id})
+    client.close()
+    
+    return check.report("Bulk transaction updates work correctly", "Some bulk update checks failed")
+
+
+if __name__ == "__main__":
+    result = asyncio.run(test_bulk_transactions())
+    sys.exit(0 if result else 1)
@@ -0,0 +1,174 @@
+"""
+Columnar export check.
+Builds an incremental Parquet snapshot against MongoDB, edits and adds
+transactions, appends again and verifies the merged snapshot, checks that
+deletions trigger a rebuild, and streams the Arrow and Parquet exports.
+Requires the pyarrow package.
+"""
+import asyncio
+import io
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from motor.motor_asyncio import AsyncIOMotorClient
+from bson import ObjectId
+import os
+from dotenv import load_dotenv
+
+import database
+from config import settings
+from routers.transactions import export_transactions
+from services.columnar_export import (
+    SNAPSHOT_COLLECTION,
+    append_snapshot,
+    columnar_available,
+    delete_snapshot,
+    invalidate_snapshot,
+    read_snapshot,
+    snapshot_directory
+)
+from test_helpers import Checks
+
+# Load environment variables
+load_dotenv()
+
+MONGODB_URI = os.getenv("MONGODB_URI")
+DATABASE_NAME = "finsense"
+ROWS = 20000
+
+
+async def read_export(user, export_format: str):
+    """Stream an export and load it back as an Arrow table."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    response = await export_transactions(export_format=export_format, status_filter=None, start=None, end=None, current_user=user)
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    
+    if export_format == "arrow":
+        return pa.ipc.open_stream(body).read_all(), len(body)
+    return pq.read_table(io.BytesIO(body)), len(body)
+
+
+async def test_columnar_export():
+    """Check incremental snapshots and columnar streaming."""
+    
+    if not columnar_available():
+        print("[SKIP] pyarrow is not installed")
+        return True
+    
+    client = AsyncIOMotorClient(MONGODB_URI)
+    db = client[DATABASE_NAME]
+    database.mongodb_client = client
+    settings.export_snapshot_dir = tempfile.mkdtemp()
+    # The snapshot lease relies on the unique user_id index
+    await db[SNAPSHOT_COLLECTION].create_indexes(database.INDEXES[SNAPSHOT_COLLECTION])
+    
+    print("=" * 60)
+    print("TESTING COLUMNAR EXPORT")
+    print("=" * 60)
+    check = Checks()
+    
+    user = SimpleNamespace(id=ObjectId())
+    # Written well before the snapshot lag cut-off
+    now = datetime.utcnow().replace(microsecond=0) - timedelta(minutes=10)
+    transactions = [
+        {
+            "user_id": user.id,
+            "date": now - timedelta(hours=i),
+            "vendor": f"Vendor {i % 25}",
+            "amount": round(i * 0.5, 2),
+            "category": "Supplies" if i % 2 else "Utilities",
+            "confidence": 0.9,
+            "status": "auto-approved",
+            "explanation": "",
+            "payment_method": "card",
+            "created_at": now,
+            "updated_at": now
+        }
+        for i in range(ROWS)
+    ]
+    await db.transactions.insert_many(transactions)
+    
+    try:
+        print("\n[Test 1] First snapshot holds every transaction")
+        state = await append_snapshot(db, user.id)
+        check(f"{state['appended']} rows appended", state["appended"] == ROWS)
+        
+        state = await append_snapshot(db, user.id)
+        check("nothing new: no part written", state["appended"] == 0 and state["parts"] == 1)
+        
+        print("\n[Test 2] Incremental append by updated_at")
+        edited_id = transactions[10]["_id"]
+        await db.transactions.update_one(
+            {"_id": edited_id},
+            {"$set": {"category": "Marketing", "updated_at": now + timedelta(seconds=1)}}
+        )
+        await db.transactions.insert_one({**transactions[0], "_id": ObjectId(), "updated_at": now + timedelta(seconds=2)})
+        recent_id = ObjectId()
+        await db.transactions.insert_one({**transactions[0], "_id": recent_id, "updated_at": datetime.utcnow()})
+        
+        state = await append_snapshot(db, user.id)
+        check(f"{state['appended']} changed rows appended", state["appended"] == 2 and state["parts"] == 2)
+        check("write newer than the lag left for the next run",
+              str(recent_id) not in read_snapshot(user.id, ["id"]).column("id").to_pylist())
+        
+        snapshot = read_snapshot(user.id)
+        edited = snapshot.filter(snapshot.column("id").to_numpy(zero_copy_only=False) == str(edited_id))
+        check(f"{snapshot.num_rows} rows after merging parts", snapshot.num_rows == ROWS + 1)
+        check("edited row has its latest category", edited.column("category").to_pylist() == ["Marketing"])
+        check("vendor is dictionary-encoded", str(snapshot.schema.field("vendor").type).startswith("dictionary"))
+        
+        print("\n[Test 3] Arrow and Parquet exports")
+        arrow_table, arrow_bytes = await read_export(user, "arrow")
+        parquet_table, parquet_bytes = await read_export(user, "parquet")
+        print(f"  arrow: {arrow_bytes / 1024:.0f} KiB, parquet: {parquet_bytes / 1024:.0f} KiB for {ROWS + 2} rows")
+        check("arrow stream has every row", arrow_table.num_rows == ROWS + 2)
+        check("parquet file has every row", parquet_table.num_rows == ROWS + 2)
+        check("exports ordered by date", arrow_table.column("date")[0].as_py() <= arrow_table.column("date")[-1].as_py())
+        
+        print("\n[Test 4] Deletions rebuild the snapshot")
+        await db.transactions.delete_one({"_id": edited_id})
+        await invalidate_snapshot(db, user.id)
+        state = await append_snapshot(db, user.id)
+        snapshot = read_snapshot(user.id, ["id"])
+        check(f"rebuilt into {state['parts']} part", state["rebuilt"] and state["parts"] == 1)
+        check("deleted row is gone", str(edited_id) not in snapshot.column("id").to_pylist())
+        check(f"{snapshot.num_rows} rows remain", snapshot.num_rows == ROWS)
+        
+        state = await append_snapshot(db, user.id)
+        check("next run appends incrementally again", not state["rebuilt"] and state["appended"] == 0)
+        
+        print("\n[Test 5] Runs for the same user do not overlap")
+        await db[SNAPSHOT_COLLECTION].update_one(
+            {"user_id": user.id},
+            {"$set": {"running_until": datetime.utcnow() + timedelta(minutes=5)}}
+        )
+        state = await append_snapshot(db, user.id)
+        check("run skipped while the lease is held", state["skipped"] and state["parts"] == 1)
+        
+        await db[SNAPSHOT_COLLECTION].update_one({"user_id": user.id}, {"$unset": {"running_until": ""}})
+        await invalidate_snapshot(db, user.id)
+        states = await asyncio.gather(append_snapshot(db, user.id), append_snapshot(db, user.id))
+        parts = [name for name in os.listdir(snapshot_directory(user.id)) if name.endswith(".parquet")]
+        check("one of two concurrent runs rebuilds, the other is skipped",
+              sorted((s["rebuilt"], s["skipped"]) for s in states) == [(False, True), (True, False)])
+        check(f"{len(parts)} part on disk", len(parts) == 1 and read_snapshot(user.id).num_rows == ROWS)
+        
+        state = await append_snapshot(db, user.id)
+        check("lease released after the run", not state["skipped"])
+    finally:
+        # Cleanup
+        await db.transactions.delete_many({"user_id": user.id})
+        await delete_snapshot(db, user.id)
+        client.close()
+    
+    check("snapshot files removed", not os.path.exists(snapshot_directory(user.id)))
+    
+    return check.report("Columnar export works correctly", "Some columnar export checks failed")
+
+
+if __name__ == "__main__":
+    result = asyncio.run(test_columnar_export())
+    sys.exit(0 if result else 1)
@@ -0,0 +1,119 @@
+"""
+Multi-process harness for the shared AI rate limit.
+
+Starts several worker processes that hammer one global bucket with
+fail-fast acquires for a fixed time, then checks that the total number of
+admitted requests across all processes stays within a single budget
+(burst + refill over the run). The memory backend shows the per-process
+problem: every worker gets the whole budget.
+
+Usage:
+    python test_distributed_rate_limit.py [mongodb|redis|memory] [processes]
+"""
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+import uuid
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+REQUESTS_PER_MINUTE = 60  # Burst of 60, then 1 request per second
+DURATION_SECONDS = 5
+ATTEMPT_INTERVAL = 0.005
+
+
+def run_worker(backend: str, bucket_key: str, start_at: float) -> int:
+    """Acquire as fast as possible until the deadline; return admitted count."""
+    from motor.motor_asyncio import AsyncIOMotorClient
+    
+    import database
+    from config import settings
+    from services.rate_limit_backends import MongoTokenBucket, RedisTokenBucket
+    from services.rate_limiter import RateLimiter, RateLimitExceeded, TokenBucket
+    
+    async def worker() -> int:
+        if backend == "mongodb":
+            database.mongodb_client = AsyncIOMotorClient(settings.mongodb_uri)
+            bucket = MongoTokenBucket(REQUESTS_PER_MINUTE, key=bucket_key)
+        elif backend == "redis":
+            bucket = RedisTokenBucket(REQUESTS_PER_MINUTE, settings.redis_url, key=bucket_key)
+        else:
+            bucket = TokenBucket.per_minute(REQUESTS_PER_MINUTE)
+        
+        limiter = RateLimiter(global_bucket=bucket)
+        admitted = 0
+        
+        # Start all workers together so the burst is contended
+        await asyncio.sleep(max(0.0, start_at - time.time()))
+        deadline = start_at + DURATION_SECONDS
+        
+        while time.time() < deadline:
+            try:
+                await limiter.acquire(max_wait=0)
+                admitted += 1
+            except RateLimitExceeded:
+                pass
+            await asyncio.sleep(ATTEMPT_INTERVAL)
+        
+        if backend == "mongodb":
+            database.mongodb_client.close()
+        return admitted
+    
+    return asyncio.run(worker())
+
+
+async def cleanup(backend: str, bucket_key: str):
+    """Remove the shared bucket created for this run."""
+    from config import settings
+    
+    if backend == "mongodb":
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(settings.mongodb_uri)
+        await client[settings.database_name].rate_limits.delete_one({"_id": bucket_key})
+        client.close()
+    elif backend == "redis":
+        import redis.asyncio as redis
+        client = redis.from_url(settings.redis_url)
+        await client.delete(bucket_key)
+        await client.aclose()
+
+
+def main() -> bool:
+    """Run the workers and compare total admissions with one budget."""
+    backend = sys.argv[1] if len(sys.argv) > 1 else "mongodb"
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    bucket_key = f"harness:{uuid.uuid4()}"
+    
+    print("=" * 60)
+    print(f"DISTRIBUTED RATE LIMIT HARNESS ({backend}, {processes} processes)")
+    print("=" * 60)
+    
+    start_at = time.time() + 2.0
+    with multiprocessing.get_context("spawn").Pool(processes) as pool:
+        counts = pool.starmap(run_worker, [(backend, bucket_key, start_at)] * processes)
+    
+    asyncio.run(cleanup(backend, bucket_key))
+    
+    budget = REQUESTS_PER_MINUTE + DURATION_SECONDS * REQUESTS_PER_MINUTE / 60
+    total = sum(counts)
+    
+    print(f"\nAdmitted per process: {counts}")
+    print(f"Total admitted: {total}")
+    print(f"Single budget over {DURATION_SECONDS}s: {budget:.0f} (+1 tolerance)")
+    
+    if total <= budget + 1:
+        print("\n[SUCCESS] All processes shared one global budget")
+        return True
+    
+    print(f"\n[FAIL] Processes admitted {total / budget:.1f}x the global budget")
+    return False
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("JWT_SECRET", "harness-secret")
+    result = main()
+    sys.exit(0 if result else 1)
@@ -0,0 +1,158 @@
+"""
+Benchmark: event-loop responsiveness during slow Gemini completions.
+
+Starts a local fake Gemini REST server that takes several seconds per
+completion, serves the FastAPI app with uvicorn in the same event loop,
+and probes GET / while AI requests are in flight. Compares a blocking
+generate_content call on the event loop with AIService's thread pool.
+
+Usage:
+    python test_gemini_concurrency.py
+"""
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAKE_GEMINI_PORT = 8765
+APP_PORT = 8766
+COMPLETION_SECONDS = 2.0
+CONCURRENT_COMPLETIONS = 4
+PROBE_INTERVAL = 0.05
+
+# Point the AI service at the fake server before config is imported
+os.environ["GEMINI_API_ENDPOINT"] = f"http://127.0.0.1:{FAKE_GEMINI_PORT}"
+os.environ["GEMINI_API_KEY"] = "fake-key"
+os.environ.setdefault("MONGODB_URI", "mongodb://127.0.0.1:27017")
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+import uvicorn
+
+from main import app
+from services.ai_service import ai_service
+from services.rate_limiter import ai_rate_limiter, TokenBucket
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    """Answers every generateContent call after a fixed delay."""
+    
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        time.sleep(COMPLETION_SECONDS)
+        
+        body = json.dumps({
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": "This is a **fake** completion."}]},
+                "finishReason": "STOP",
+                "index": 0
+            }]
+        }).encode()
+        
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+async def probe_once() -> float:
+    """Time one GET / against the app."""
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection("127.0.0.1", APP_PORT)
+    writer.write(b"GET / HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+    await writer.drain()
+    await reader.read()
+    writer.close()
+    return time.perf_counter() - start
+
+
+async def probe_until(done: asyncio.Event) -> list:
+    """Probe GET / repeatedly until the AI requests finish."""
+    latencies = []
+    while not done.is_set():
+        latencies.append(await probe_once())
+        await asyncio.sleep(PROBE_INTERVAL)
+    return latencies
+
+
+async def run_phase(label: str, make_request) -> dict:
+    """Run concurrent AI requests while probing the app."""
+    done = asyncio.Event()
+    probe_task = asyncio.create_task(probe_until(done))
+    
+    start = time.perf_counter()
+    await asyncio.gather(*[make_request(i) for i in range(CONCURRENT_COMPLETIONS)])
+    elapsed = time.perf_counter() - start
+    
+    done.set()
+    latencies = sorted(await probe_task)
+    
+    result = {
+        "label": label,
+        "ai_elapsed": elapsed,
+        "probes": len(latencies),
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0,
+        "max_ms": latencies[-1] * 1000 if latencies else 0
+    }
+    
+    print(f"\n[{label}]")
+    print(f"  {CONCURRENT_COMPLETIONS} completions x {COMPLETION_SECONDS:.1f}s took {elapsed:.1f}s")
+    print(f"  GET / probes: {result['probes']}, p50 {result['p50_ms']:.1f}ms, max {result['max_ms']:.1f}ms")
+    return result
+
+
+async def main():
+    """Run the blocking and thread-pool phases and compare probe latency."""
+    print("=" * 60)
+    print("BENCHMARK: EVENT LOOP RESPONSIVENESS DURING GEMINI CALLS")
+    print("=" * 60)
+    
+    fake_server = ThreadingHTTPServer(("127.0.0.1", FAKE_GEMINI_PORT), FakeGeminiHandler)
+    threading.Thread(target=fake_server.serve_forever, daemon=True).start()
+    
+    server = uvicorn.Server(uvicorn.Config(app, port=APP_PORT, lifespan="off", log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    
+    # Don't let the per-minute limit dominate the measurement
+    ai_rate_limiter.global_bucket = TokenBucket.per_minute(1000)
+    
+    async def blocking_request(i: int):
+        # The previous implementation: synchronous SDK call on the event loop
+        ai_service.model.generate_content(f"blocking benchmark question {i}")
+    
+    async def pooled_request(i: int):
+        await ai_service.generate_response(f"pooled benchmark question {i} {time.time()}")
+    
+    blocking = await run_phase("blocking call on event loop", blocking_request)
+    pooled = await run_phase("AIService thread pool", pooled_request)
+    
+    server.should_exit = True
+    await server_task
+    fake_server.shutdown()
+    
+    print("\n" + "=" * 60)
+    print("RESULTS")
+    print("=" * 60)
+    print(f"Max GET / latency: blocking {blocking['max_ms']:.0f}ms vs pooled {pooled['max_ms']:.0f}ms")
+    
+    if pooled["max_ms"] < COMPLETION_SECONDS * 1000 / 4 and pooled["probes"] > 1:
+        print("\n[SUCCESS] Other endpoints stay responsive during slow completions")
+        return True
+    
+    print("\n[FAIL] GET / stalled while completions were in flight")
+    return False
+
+
+if __name__ == "__main__":
+    result = asyncio.run(main())
+    sys.exit(0 if result else 1)
@@ -0,0 +1,24 @@
+"""Shared pass/fail bookkeeping for the test scripts."""
+
+
+class Checks:
+    """Prints labelled pass/fail lines and remembers the outcome of each."""
+    
+    def __init__(self):
+        self.results = []
+    
+    def __call__(self, label: str, condition: bool) -> bool:
+        """Print a labelled pass/fail line."""
+        print(f"  [{'OK' if condition else 'FAIL'}] {label}")
+        self.results.append(condition)
+        return condition
+    
+    def report(self, success: str, failure: str) -> bool:
+        """Print the summary banner; True if every check passed."""
+        print("\n" + "=" * 60)
+        if all(self.results):
+            print(f"[SUCCESS] {success}")
+            return True
+        
+        print(f"[FAIL] {failure}")
+        return False
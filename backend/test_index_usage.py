@@ -0,0 +1,169 @@
+"""
+Index usage check.
+Runs explain() on the query shapes used by the routers and fails if any of
+them falls back to a collection scan.
+"""
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from motor.motor_asyncio import AsyncIOMotorClient
+from bson import ObjectId
+import os
+from dotenv import load_dotenv
+
+import database
+from routers import accounts, ai_chat, dashboard, transactions
+from services import columnar_export, conversation_messages
+
+# Load environment variables
+load_dotenv()
+
+MONGODB_URI = os.getenv("MONGODB_URI")
+
+
+def find_command(collection: str, query: dict, sort: list = None, limit: int = None) -> dict:
+    """Explainable find command for a router query."""
+    command = {"find": collection, "filter": query}
+    if sort:
+        command["sort"] = dict(sort)
+    if limit:
+        command["limit"] = limit
+    return command
+
+
+def aggregate_command(collection: str, pipeline: list) -> dict:
+    """Explainable aggregate command for a router pipeline."""
+    return {"aggregate": collection, "pipeline": pipeline, "cursor": {}}
+
+
+def build_query_plans(user_id: ObjectId) -> list:
+    """
+    Router queries as (label, collection, explain command body).
+
+    Filters, pipelines and sort orders come from the same builders and
+    constants the routers use, so the check follows any change to them.
+    """
+    now = datetime.utcnow()
+    page = transactions.DEFAULT_PAGE_SIZE + 1
+    conversation_page = ai_chat.DEFAULT_PAGE_SIZE + 1
+    pipelines = dashboard.dashboard_pipelines(user_id, now)
+
+    return [
+        ("transactions list", "transactions", find_command(
+            "transactions", transactions.transaction_list_query(user_id), transactions.TRANSACTION_LIST_SORT, page
+        )),
+        ("transactions list by status", "transactions", find_command(
+            "transactions", transactions.transaction_list_query(user_id, "needs-review"), transactions.TRANSACTION_LIST_SORT, page
+        )),
+        ("transactions next page", "transactions", find_command(
+            "transactions", transactions.transaction_list_query(user_id, None, (now, ObjectId())), transactions.TRANSACTION_LIST_SORT, page
+        )),
+        ("transactions search", "transactions", aggregate_command(
+            "transactions", transactions.transaction_search_pipeline(
+                transactions.transaction_list_query(user_id, "needs-review"), "square payroll", transactions.DEFAULT_PAGE_SIZE
+            )
+        )),
+        ("transactions export", "transactions", find_command(
+            "transactions", transactions.export_query(user_id, None, now - timedelta(days=90), now), transactions.EXPORT_SORT
+        )),
+        ("columnar snapshot append", "transactions", find_command(
+            "transactions", columnar_export.snapshot_query(user_id, now, {"watermark": now, "last_id": ObjectId()}), columnar_export.SNAPSHOT_SORT
+        )),
+        ("dashboard alerts facet", "transactions", aggregate_command("transactions", pipelines["transactions"])),
+        ("dashboard recent transactions", "transactions", find_command(
+            "transactions", {"user_id": user_id}, dashboard.RECENT_TRANSACTIONS_SORT, dashboard.RECENT_TRANSACTIONS_LIMIT
+        )),
+        ("dashboard rollups facet", "daily_rollups", aggregate_command("daily_rollups", pipelines["daily_rollups"])),
+        ("ai context facet", "daily_rollups", aggregate_command("daily_rollups", ai_chat.financial_context_pipeline(user_id))),
+        ("conversation list", "conversations", find_command(
+            "conversations", ai_chat.conversation_list_query(user_id), ai_chat.CONVERSATION_LIST_SORT, conversation_page
+        )),
+        ("conversation next page", "conversations", find_command(
+            "conversations", ai_chat.conversation_list_query(user_id, None, (now, ObjectId())), ai_chat.CONVERSATION_LIST_SORT, conversation_page
+        )),
+        ("conversation title search", "conversations", find_command(
+            "conversations", ai_chat.conversation_list_query(user_id, "cash flow"), ai_chat.CONVERSATION_LIST_SORT, conversation_page
+        )),
+        ("conversation history", "messages", find_command(
+            "messages", {"conversation_id": ObjectId()}, conversation_messages.RECENT_MESSAGE_SORT, conversation_messages.HISTORY_LIMIT
+        )),
+        ("conversation transcript", "messages", find_command(
+            "messages", {"conversation_id": ObjectId()}, conversation_messages.MESSAGE_SORT
+        )),
+        ("connected account lookup", "connected_accounts", find_command(
+            "connected_accounts", accounts.connected_account_query(user_id, "square", "Square POS")
+        )),
+        ("connected account count", "connected_accounts", find_command(
+            "connected_accounts", accounts.connected_account_query(user_id)
+        )),
+    ]
+
+
+def collect_stages(plan, stages: list) -> list:
+    """Recursively collect every stage name in an explain plan."""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            collect_stages(value, stages)
+    elif isinstance(plan, list):
+        for item in plan:
+            collect_stages(item, stages)
+    return stages
+
+
+def winning_plan(explain: dict) -> dict:
+    """Extract the winning plan from find or aggregate explain output."""
+    if "queryPlanner" in explain:
+        return explain["queryPlanner"]["winningPlan"]
+    # Aggregations report the plan under the first ($cursor) stage
+    for stage in explain.get("stages", []):
+        if "$cursor" in stage:
+            return stage["$cursor"]["queryPlanner"]["winningPlan"]
+    return explain
+
+
+async def test_index_usage():
+    """Check that every router query shape uses an index."""
+
+    client = AsyncIOMotorClient(MONGODB_URI)
+    database.mongodb_client = client
+    # Same database init_db() builds the indexes in
+    db = database.get_database()
+
+    print("=" * 60)
+    print("TESTING INDEX USAGE")
+    print("=" * 60)
+
+    # Apply the index manifest exactly as startup does
+    await database.init_db()
+
+    user_id = ObjectId()
+    failures = []
+
+    for label, collection, command in build_query_plans(user_id):
+        explain = await db.command({"explain": command, "verbosity": "queryPlanner"})
+        stages = collect_stages(winning_plan(explain), [])
+
+        if "COLLSCAN" in stages or "IXSCAN" not in stages:
+            failures.append(label)
+            print(f"  [FAIL] {label} ({collection}): {' <- '.join(stages)}")
+        else:
+            print(f"  [OK] {label} ({collection}): {' <- '.join(stages)}")
+
+    client.close()
+
+    print("\n" + "=" * 60)
+    if failures:
+        print(f"{len(failures)} QUERY SHAPE(S) NOT USING AN INDEX")
+        print("=" * 60)
+        return False
+
+    print("ALL QUERIES USE AN INDEX")
+    print("=" * 60)
+    return True
+
+
+if __name__ == "__main__":
+    result = asyncio.run(test_index_usage())
+    sys.exit(0 if result else 1)
@@ -0,0 +1,130 @@
+"""
+Background job queue check.
+Runs jobs through a JobQueue against MongoDB: success, retry with backoff,
+permanent failure and recovery of jobs left queued by a previous process.
+"""
+import asyncio
+import sys
+import time
+from motor.motor_asyncio import AsyncIOMotorClient
+from bson import ObjectId
+import os
+from dotenv import load_dotenv
+
+import database
+from services.job_queue import JobQueue
+from test_helpers import Checks
+
+# Load environment variables
+load_dotenv()
+
+MONGODB_URI = os.getenv("MONGODB_URI")
+DATABASE_NAME = "finsense"
+COLLECTION = "jobs_test"
+
+
+async def wait_for(collection, job_id: ObjectId, statuses: tuple, timeout: float = 10) -> dict:
+    """Poll a job until it reaches one of the given statuses."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = await collection.find_one({"_id": job_id})
+        if job["status"] in statuses:
+            return job
+        await asyncio.sleep(0.05)
+    return job
+
+
+async def test_job_queue():
+    """Check job execution, retries and recovery."""
+    
+    client = AsyncIOMotorClient(MONGODB_URI)
+    db = client[DATABASE_NAME]
+    database.mongodb_client = client
+    collection = db[COLLECTION]
+    await collection.drop()
+    
+    print("=" * 60)
+    print("TESTING BACKGROUND JOB QUEUE")
+    print("=" * 60)
+    check = Checks()
+    user_id = ObjectId()
+    
+    queue = JobQueue(concurrency=2, max_attempts=3, backoff_seconds=0.1, collection_name=COLLECTION)
+    calls = {"flaky": 0}
+    
+    @queue.handler("echo")
+    async def echo(db, job):
+        await asyncio.sleep(0.2)
+        return {"value": job["payload"]["value"]}
+    
+    @queue.handler("flaky")
+    async def flaky(db, job):
+        calls["flaky"] += 1
+        if job["attempts"] < 3:
+            raise RuntimeError("upstream unavailable")
+        return {"attempts": job["attempts"]}
+    
+    @queue.handler("broken")
+    async def broken(db, job):
+        raise ValueError("bad payload")
+    
+    print("\n[Test 1] Enqueue returns before the job runs")
+    await queue.start()
+    started = time.perf_counter()
+    job = await queue.enqueue("echo", user_id, {"value": 42})
+    enqueue_ms = (time.perf_counter() - started) * 1000
+    check(f"enqueue took {enqueue_ms:.1f}ms with status {job['status']}", job["status"] == "queued")
+    
+    done = await wait_for(collection, job["_id"], ("succeeded", "failed"))
+    check("job succeeded with its result", done["status"] == "succeeded" and done["result"] == {"value": 42})
+    
+    print("\n[Test 2] Failed attempts are retried with backoff")
+    job = await queue.enqueue("flaky", user_id)
+    done = await wait_for(collection, job["_id"], ("succeeded", "failed"))
+    check(f"succeeded on attempt {done['attempts']}", done["status"] == "succeeded" and done["attempts"] == 3)
+    check("handler called 3 times", calls["flaky"] == 3)
+    
+    print("\n[Test 3] Jobs fail permanently after max_attempts")
+    job = await queue.enqueue("broken", user_id)
+    done = await wait_for(collection, job["_id"], ("failed",))
+    check(f"failed with error '{done.get('error')}'", done["status"] == "failed" and "bad payload" in done["error"])
+    
+    print("\n[Test 4] Concurrency is capped at the worker count")
+    jobs = [await queue.enqueue("echo", user_id, {"value": i}) for i in range(4)]
+    await asyncio.sleep(0.1)
+    running = await collection.count_documents({"_id": {"$in": [j["_id"] for j in jobs]}, "status": "running"})
+    check(f"{running} of 4 jobs running at once (limit 2)", running <= 2)
+    for j in jobs:
+        await wait_for(collection, j["_id"], ("succeeded",))
+    
+    await queue.stop()
+    
+    print("\n[Test 5] Stopping mid-run puts the job back in the queue")
+    await queue.start()
+    job = await queue.enqueue("echo", user_id, {"value": 8})
+    await wait_for(collection, job["_id"], ("running",))
+    await queue.stop()
+    interrupted = await collection.find_one({"_id": job["_id"]})
+    check(f"interrupted job is {interrupted['status']}", interrupted["status"] == "queued")
+    await queue.start()
+    done = await wait_for(collection, job["_id"], ("succeeded", "failed"))
+    check(f"resumed without waiting for the lease (attempt {done['attempts']})", done["status"] == "succeeded" and done["attempts"] == 2)
+    await queue.stop()
+    
+    print("\n[Test 6] Queued jobs are recovered on startup")
+    job = await queue.enqueue("echo", user_id, {"value": 7})  # Queue stopped: only persisted
+    await queue.start()
+    done = await wait_for(collection, job["_id"], ("succeeded", "failed"))
+    check("recovered job succeeded", done["status"] == "succeeded")
+    await queue.stop()
+    
+    # Cleanup
+    await collection.drop()
+    client.close()
+    
+    return check.report("Job queue behaves correctly", "Some job queue checks failed")
+
+
+if __name__ == "__main__":
+    result = asyncio.run(test_job_queue())
+    sys.exit(0 if result else 1)
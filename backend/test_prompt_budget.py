@@ -0,0 +1,74 @@
+"""Test token-budgeted prompt assembly and rolling history summaries."""
+import sys
+
+from services.prompt_builder import PromptBuilder, estimate_tokens, fold_into_summary
+from test_helpers import Checks
+
+
+def make_history(count: int, length: int) -> list:
+    """Alternating user/assistant messages, each `length` characters long."""
+    return [
+        {
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"Message {i}. " + "x" * length
+        }
+        for i in range(count)
+    ]
+
+
+def test_prompt_budget() -> bool:
+    """Check budgeting, oldest-first dropping and summary folding."""
+    print("=" * 60)
+    print("TESTING PROMPT TOKEN BUDGET")
+    print("=" * 60)
+    check = Checks()
+    system_prompt = "You are a helpful bookkeeping assistant."
+    
+    print("\n[Test 1] Small prompts are left intact")
+    builder = PromptBuilder(system_prompt, budget_tokens=1000)
+    history = make_history(4, 20)
+    prompt, metrics = builder.build("What is my margin?", "\n\nContext: revenue", history, "- User asked: Hi.")
+    check("every history message included", metrics["history_messages"] == 4)
+    check("summary included", "- User asked: Hi." in prompt)
+    check("not truncated", not metrics["truncated"])
+    check("question is last", prompt.rstrip().endswith("User Question: What is my margin?\n\n\nAssistant Response:"))
+    
+    print("\n[Test 2] Long replies are dropped oldest first")
+    builder = PromptBuilder(system_prompt, budget_tokens=600)
+    history = make_history(5, 800)
+    prompt, metrics = builder.build("Next question?", "", history, "- User asked: Old question.")
+    check(f"~{metrics['estimated_tokens']} tokens within budget", metrics["estimated_tokens"] <= 600)
+    check("newest message kept", "Message 4." in prompt)
+    check("oldest message dropped", "Message 0." not in prompt)
+    check(f"{metrics['dropped_messages']} messages reported dropped", metrics["dropped_messages"] > 0)
+    check("question always present", "User Question: Next question?" in prompt)
+    
+    print("\n[Test 3] An oversized newest message is cut, not lost")
+    builder = PromptBuilder(system_prompt, budget_tokens=300)
+    prompt, metrics = builder.build("Why?", "", make_history(1, 5000))
+    check("newest message partially kept", "Message 0." in prompt and "[...]" in prompt)
+    check(f"~{metrics['estimated_tokens']} tokens within budget", metrics["estimated_tokens"] <= 300)
+    
+    print("\n[Test 4] Rolling summary stays within its budget")
+    summary = ""
+    for turn in range(50):
+        summary = fold_into_summary(summary, [
+            {"role": "user", "content": f"Question {turn}? More detail follows here."},
+            {"role": "assistant", "content": f"Answer {turn}. " + "Long explanation. " * 40}
+        ], max_tokens=200)
+    check(f"summary is ~{estimate_tokens(summary)} tokens (<= 200)", estimate_tokens(summary) <= 200)
+    check("newest turn kept", "Question 49?" in summary)
+    check("oldest turn dropped", "Question 0?" not in summary)
+    check("only first sentences kept", "Long explanation" not in summary)
+    
+    print("\n[Test 5] Metrics are aggregated")
+    stats = builder.get_stats()
+    check(f"{stats['prompts_built']} prompt built, {stats['truncated_prompts']} truncated",
+          stats["prompts_built"] == 1 and stats["truncated_prompts"] == 1)
+    
+    return check.report("Prompts stay within the token budget", "Some prompt budget checks failed")
+
+
+if __name__ == "__main__":
+    result = test_prompt_budget()
+    sys.exit(0 if result else 1)
@@ -0,0 +1,122 @@
+"""
+Test that identical concurrent AI prompts share one Gemini call.
+
+Points the AI service at a local fake Gemini server that counts requests,
+fires a burst of identical first-message prompts plus one different prompt,
+and checks the upstream call count.
+
+Usage:
+    python test_request_coalescing.py
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAKE_GEMINI_PORT = 8768
+COMPLETION_SECONDS = 1.0
+CONCURRENT_REQUESTS = 10
+
+# Point the AI service at the fake server before config is imported
+os.environ["GEMINI_API_ENDPOINT"] = f"http://127.0.0.1:{FAKE_GEMINI_PORT}"
+os.environ["GEMINI_API_KEY"] = "fake-key"
+os.environ.setdefault("MONGODB_URI", "mongodb://127.0.0.1:27017")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+
+from services.ai_service import ai_service
+from services.rate_limiter import ai_rate_limiter, RateLimitExceeded, TokenBucket
+
+upstream_calls = 0
+upstream_lock = threading.Lock()
+
+
+class CountingGeminiHandler(BaseHTTPRequestHandler):
+    """Counts generateContent calls and answers after a fixed delay."""
+    
+    def do_POST(self):
+        global upstream_calls
+        with upstream_lock:
+            upstream_calls += 1
+            call_number = upstream_calls
+        
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        time.sleep(COMPLETION_SECONDS)
+        
+        body = json.dumps({
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": f"Answer number {call_number}."}]},
+                "finishReason": "STOP",
+                "index": 0
+            }]
+        }).encode()
+        
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+async def test_request_coalescing():
+    """Burst identical prompts and count upstream calls."""
+    print("=" * 60)
+    print("TESTING AI REQUEST COALESCING")
+    print("=" * 60)
+    
+    fake_server = ThreadingHTTPServer(("127.0.0.1", FAKE_GEMINI_PORT), CountingGeminiHandler)
+    threading.Thread(target=fake_server.serve_forever, daemon=True).start()
+    ai_rate_limiter.global_bucket = TokenBucket.per_minute(1000)
+    
+    question = f"What is accrual accounting? {time.time()}"
+    start = time.perf_counter()
+    responses = await asyncio.gather(
+        *[ai_service.generate_response(question) for _ in range(CONCURRENT_REQUESTS)],
+        ai_service.generate_response(f"A different question {time.time()}")
+    )
+    elapsed = time.perf_counter() - start
+    
+    # A caller over its own limit is rejected even if an identical request is in flight
+    ai_rate_limiter._user_bucket("limited-user", "free", time.monotonic()).tokens = 0
+    shared_question = f"What is depreciation? {time.time()}"
+    leader, limited = await asyncio.gather(
+        ai_service.generate_response(shared_question, user_id="leader-user"),
+        ai_service.generate_response(shared_question, user_id="limited-user", max_wait=0),
+        return_exceptions=True
+    )
+    fake_server.shutdown()
+    
+    identical = responses[:CONCURRENT_REQUESTS]
+    stats = ai_service.get_cache_stats()
+    
+    print(f"\n{CONCURRENT_REQUESTS} identical + 1 different prompt took {elapsed:.2f}s")
+    print(f"Upstream Gemini calls: {upstream_calls}")
+    print(f"Coalesced requests: {stats['coalesced_requests']}")
+    print(f"Joiner over its own limit: {type(limited).__name__}")
+    
+    results = [
+        upstream_calls == 3,
+        isinstance(leader, str) and isinstance(limited, RateLimitExceeded),
+        len(set(identical)) == 1,
+        responses[-1] != identical[0],
+        stats["coalesced_requests"] == CONCURRENT_REQUESTS - 1,
+        stats["in_flight_requests"] == 0
+    ]
+    
+    if all(results):
+        print("\n[SUCCESS] Identical in-flight prompts shared one Gemini call")
+        return True
+    
+    print(f"\n[FAIL] Coalescing checks: {results}")
+    return False
+
+
+if __name__ == "__main__":
+    result = asyncio.run(test_request_coalescing())
+    sys.exit(0 if result else 1)
@@ -0,0 +1,134 @@
+"""Test bounded LRU/TTL behaviour of the response cache."""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+os.environ.setdefault("MONGODB_URI", "mongodb://127.0.0.1:27017")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+
+from services.cache_backends import CacheBackend, create_cache_backend
+from services.response_cache import ResponseCache
+from services.semantic_cache import SemanticCache
+from test_helpers import Checks
+
+
+class DictBackend(CacheBackend):
+    """Shared backend stand-in that keeps entries in a dict."""
+    
+    name = "dict"
+    
+    def __init__(self):
+        self.entries = {}
+    
+    async def get(self, key):
+        return self.entries.get(key)
+    
+    async def set(self, key, entry):
+        self.entries[key] = entry
+
+
+async def test_response_cache():
+    """Exercise capacity, byte budget, LRU order, expiry, sweeper and backend/semantic tiers."""
+    print("=" * 60)
+    print("TESTING BOUNDED RESPONSE CACHE")
+    print("=" * 60)
+    check = Checks()
+    
+    print("\n[Test 1] Entry capacity evicts least recently used")
+    cache = ResponseCache(max_entries=3)
+    for i in range(3):
+        cache.set(f"question {i}", f"answer {i}")
+    cache.get("question 0")  # question 0 becomes most recently used
+    cache.set("question 3", "answer 3")
+    check("capacity respected", len(cache.cache) == 3)
+    check("LRU entry evicted", cache.get("question 1") is None)
+    check("recently used entry kept", cache.get("question 0") == "answer 0")
+    check("eviction counted", cache.get_stats()["evictions"] == 1)
+    
+    print("\n[Test 2] Byte budget")
+    cache = ResponseCache(max_entries=100, max_bytes=2000)
+    for i in range(10):
+        cache.set(f"question {i}", "x" * 500)
+    stats = cache.get_stats()
+    check("bytes within budget", stats["bytes_used"] <= 2000)
+    check("bytes match entries", stats["bytes_used"] == sum(e["size"] for e in cache.cache.values()))
+    check("average entry size reported", stats["avg_entry_bytes"] > 500)
+    cache.set("huge question", "x" * 5000)
+    check("oversized response not cached", cache.get("huge question") is None)
+    
+    print("\n[Test 3] Overwriting an entry keeps accounting exact")
+    cache = ResponseCache(max_entries=10)
+    cache.set("question", "short")
+    cache.set("question", "a much longer answer")
+    check("single entry", len(cache.cache) == 1)
+    check("bytes updated", cache.bytes_used == next(iter(cache.cache.values()))["size"])
+    
+    print("\n[Test 4] Lazy expiry and background sweeper")
+    cache = ResponseCache(max_entries=10)
+    cache.set("stale question", "stale answer")
+    cache.set("other stale question", "stale answer")
+    for entry in cache.cache.values():
+        entry["expires_at"] = datetime.utcnow() - timedelta(seconds=1)
+    check("expired entry not returned", cache.get("stale question") is None)
+    cache.start_sweeper(interval_seconds=0.05)
+    await asyncio.sleep(0.2)
+    await cache.stop_sweeper()
+    check("sweeper removed expired entries", len(cache.cache) == 0 and cache.bytes_used == 0)
+    check("expirations counted", cache.get_stats()["expirations"] == 2)
+    
+    print("\n[Test 5] Write-through and read-through with a shared backend")
+    backend = DictBackend()
+    worker_a = ResponseCache(max_entries=10, backend=backend)
+    worker_b = ResponseCache(max_entries=10, backend=backend)
+    await worker_a.store("shared question", "shared answer")
+    check("write-through reached backend", len(backend.entries) == 1)
+    check("other worker reads through", await worker_b.fetch("shared question") == "shared answer")
+    check("read-through fills L1", worker_b.get("shared question") == "shared answer")
+    check("backend hit counted", worker_b.get_stats()["backend_hits"] == 1)
+    check("unknown question misses", await worker_b.fetch("unknown question") is None)
+    
+    print("\n[Test 6] Semantic tier matches paraphrases of general questions")
+    cache = ResponseCache(max_entries=10, semantic=SemanticCache(threshold=0.85))
+    cache.set("what is double-entry bookkeeping?", "double-entry answer")
+    cache.set("what is accrual accounting?", "accrual answer")
+    cache.set("should i hire an accountant for my business?", "personal answer")
+    check("paraphrase served", await cache.fetch("What's double entry bookkeeping") == "double-entry answer")
+    check("paraphrase now an exact L1 hit", cache.get("What's double entry bookkeeping") == "double-entry answer")
+    check("related but different question misses", await cache.fetch("What is cash accounting?") is None)
+    check("personalized questions not matched", await cache.fetch("should I hire an accountant for my company?") is None)
+    stats = cache.get_stats()
+    check("similarity stats reported", stats["semantic"]["hits"] == 1 and stats["semantic"]["avg_hit_similarity"] >= 0.85)
+    check("semantic and L1 hits counted as cache hits", stats["hits"] == 2)
+    
+    print("\n[Test 7] Near-miss questions with different numbers or negation miss")
+    cache = ResponseCache(max_entries=10, semantic=SemanticCache(threshold=0.85))
+    cache.set("What was the standard mileage rate in 2023?", "2023 answer")
+    cache.set("Is rent a deductible expense?", "deductible answer")
+    cache.set("Can I deduct meals?", "meals answer")
+    near_misses = [
+        "What was the standard mileage rate in 2024?",
+        "Is rent not a deductible expense?",
+        "Why is rent never a deductible expense?",
+        "Can't I deduct meals?",
+        "Can I deduct meals without receipts?",
+    ]
+    for question in near_misses:
+        check(f"'{question}' misses", await cache.fetch(question) is None)
+    check("same numbers still match", await cache.fetch("What's the standard mileage rate in 2023") == "2023 answer")
+    
+    print("\n[Test 8] Backend configuration")
+    try:
+        create_cache_backend("mongo")
+        unknown_rejected = False
+    except ValueError:
+        unknown_rejected = True
+    check("unknown backend name is rejected", unknown_rejected)
+    check("memory backend is in-process only", create_cache_backend("memory") is None)
+    
+    return check.report("Response cache is bounded and accounted correctly", "Some response cache checks failed")
+
+
+if __name__ == "__main__":
+    result = asyncio.run(test_response_cache())
+    sys.exit(0 if result else 1)
@@ -10,6 +10,13 @@ from datetime import datetime
 import os
 from dotenv import load_dotenv
 
+from services.conversation_messages import (
+    append_messages,
+    get_recent_messages,
+    get_all_messages,
+    delete_messages
+)
+
 # Load environment variables
 load_dotenv()
 
@@ -44,18 +51,8 @@ async def test_ai_chat():
     conversation_doc = {
         "user_id": user_id,
         "title": "Test Conversation",
-        "messages": [
-            {
-                "role": "user",
-                "content": "Hello, what can you help me with?",
-                "timestamp": datetime.utcnow()
-            },
-            {
-                "role": "assistant",
-                "content": "Hello! I'm FinAI, your financial assistant. I can help you with transaction analysis, expense tracking, and financial insights.",
-                "timestamp": datetime.utcnow()
-            }
-        ],
+        "message_count": 0,
+        "last_message_preview": "",
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
     }
@@ -63,9 +60,22 @@ async def test_ai_chat():
     result = await db.conversations.insert_one(conversation_doc)
     conversation_id = result.inserted_id
     
+    await append_messages(db, conversation_id, user_id, [
+        {
+            "role": "user",
+            "content": "Hello, what can you help me with?",
+            "timestamp": datetime.utcnow()
+        },
+        {
+            "role": "assistant",
+            "content": "Hello! I'm FinAI, your financial assistant. I can help you with transaction analysis, expense tracking, and financial insights.",
+            "timestamp": datetime.utcnow()
+        }
+    ], datetime.utcnow())
+    
     print(f"  [OK] Created conversation: {conversation_id}")
     print(f"  Title: {conversation_doc['title']}")
-    print(f"  Messages: {len(conversation_doc['messages'])}")
+    print(f"  Messages: {len(await get_all_messages(db, conversation_id))}")
     
     # Test 2: Retrieve the conversation
     print(f"\n[STEP 3] Testing conversation retrieval...")
@@ -77,7 +87,11 @@ async def test_ai_chat():
         return False
     
     print(f"  [OK] Retrieved conversation")
-    print(f"  Messages in conversation: {len(retrieved_conv['messages'])}")
+    print(f"  Messages in conversation: {retrieved_conv['message_count']}")
+    
+    if "messages" in retrieved_conv:
+        print("  [ERROR] Conversation document still embeds its messages")
+        return False
     
     # Test 3: Add messages to conversation
     print(f"\n[STEP 4] Testing message addition...")
@@ -95,21 +109,25 @@ async def test_ai_chat():
         }
     ]
     
-    await db.conversations.update_one(
-        {"_id": conversation_id},
-        {
-            "$push": {
-                "messages": {"$each": new_messages}
-            },
-            "$set": {
-                "updated_at": datetime.utcnow()
-            }
-        }
-    )
+    await append_messages(db, conversation_id, user_id, new_messages, datetime.utcnow())
     
     updated_conv = await db.conversations.find_one({"_id": conversation_id})
     print(f"  [OK] Added 2 new messages")
-    print(f"  Total messages now: {len(updated_conv['messages'])}")
+    print(f"  Total messages now: {updated_conv['message_count']}")
+    
+    if updated_conv["last_message_preview"] != new_messages[-1]["content"][:100]:
+        print("  [ERROR] Last message preview was not updated")
+        return False
+    
+    history = await get_recent_messages(db, conversation_id, limit=3)
+    if [msg["content"] for msg in history] != [
+        "Hello! I'm FinAI, your financial assistant. I can help you with transaction analysis, expense tracking, and financial insights.",
+        new_messages[0]["content"],
+        new_messages[1]["content"]
+    ]:
+        print("  [ERROR] Recent history is not the latest messages in order")
+        return False
+    print(f"  [OK] Recent history returns the latest {len(history)} messages in order")
     
     # Test 4: List all conversations for user
     print(f"\n[STEP 5] Testing conversation listing...")
@@ -119,7 +137,7 @@ async def test_ai_chat():
     
     print(f"  [OK] Found {len(conversations)} conversation(s) for user")
     for i, conv in enumerate(conversations, 1):
-        print(f"  {i}. {conv['title']} - {len(conv['messages'])} messages")
+        print(f"  {i}. {conv['title']} - {conv.get('message_count', 0)} messages")
     
     # Test 5: Test AI response generation
     print(f"\n[STEP 6] Testing AI response generation...")
@@ -155,22 +173,24 @@ async def test_ai_chat():
         conv_doc = {
             "user_id": user_id,
             "title": title,
-            "messages": [
-                {
-                    "role": "user",
-                    "content": f"Help me with {title.lower()}",
-                    "timestamp": datetime.utcnow()
-                },
-                {
-                    "role": "assistant",
-                    "content": f"I'd be happy to help you with {title.lower()}!",
-                    "timestamp": datetime.utcnow()
-                }
-            ],
+            "message_count": 0,
+            "last_message_preview": "",
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow()
         }
         result = await db.conversations.insert_one(conv_doc)
+        await append_messages(db, result.inserted_id, user_id, [
+            {
+                "role": "user",
+                "content": f"Help me with {title.lower()}",
+                "timestamp": datetime.utcnow()
+            },
+            {
+                "role": "assistant",
+                "content": f"I'd be happy to help you with {title.lower()}!",
+                "timestamp": datetime.utcnow()
+            }
+        ], datetime.utcnow())
         created_conversations.append(result.inserted_id)
     
     print(f"  [OK] Created {len(created_conversations)} additional conversations")
@@ -179,6 +199,7 @@ async def test_ai_chat():
     print(f"\n[STEP 8] Testing conversation deletion...")
     
     delete_result = await db.conversations.delete_one({"_id": conversation_id})
+    await delete_messages(db, [conversation_id])
     
     if delete_result.deleted_count == 1:
         print(f"  [OK] Deleted conversation: {conversation_id}")
@@ -194,6 +215,12 @@ async def test_ai_chat():
         print(f"  [ERROR] Conversation still exists after deletion")
         return False
     
+    if await db.messages.count_documents({"conversation_id": conversation_id}) == 0:
+        print(f"  [OK] Verified its messages were deleted")
+    else:
+        print(f"  [ERROR] Messages still exist after deletion")
+        return False
+    
     # Test 8: Verify conversation count
     print(f"\n[STEP 9] Verifying final conversation count...")
     
@@ -202,6 +229,7 @@ async def test_ai_chat():
     
     # Cleanup: Delete test conversations
     print(f"\n[CLEANUP] Removing test conversations...")
+    await delete_messages(db, await db.conversations.distinct("_id", {"user_id": user_id}))
     cleanup_result = await db.conversations.delete_many({"user_id": user_id})
     print(f"  [OK] Deleted {cleanup_result.deleted_count} test conversation(s)")
     
@@ -0,0 +1,156 @@
+"""
+Streaming chat check.
+Feeds markdown split across chunk boundaries through StreamingMarkdownStripper,
+then calls /quick-query/stream and /conversations/{id}/messages/stream with a
+stubbed Gemini stream and verifies the SSE framing, the saved messages and
+the error event.
+"""
+import asyncio
+import json
+import sys
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+from motor.motor_asyncio import AsyncIOMotorClient
+from bson import ObjectId
+import os
+from dotenv import load_dotenv
+
+import database
+from models.conversation import MessageCreate
+from routers.ai_chat import add_message_stream, quick_query_stream
+from services.ai_service import ai_service, StreamingMarkdownStripper
+from services.conversation_messages import get_all_messages
+from services.rate_limiter import ai_rate_limiter
+from test_helpers import Checks
+
+# Load environment variables
+load_dotenv()
+
+MONGODB_URI = os.getenv("MONGODB_URI")
+DATABASE_NAME = "finsense"
+
+# Markdown whose bold, italic, header and inline code spans are split across chunks
+MARKDOWN_CHUNKS = [
+    "Your **top",
+    " expense** is *Pay",
+    "roll*.\n## Sum",
+    "mary\nUse `roll",
+    "ups` to check",
+    " it.\nDone."
+]
+
+
+def fake_stream(chunks, error: Exception = None):
+    """Stand-in for AIService._stream_content yielding chunks, then raising error."""
+    async def stream(prompt):
+        for chunk in chunks:
+            yield chunk
+        if error:
+            raise error
+    return stream
+
+
+def question() -> str:
+    """A question no cache tier has seen."""
+    return f"Streaming check {uuid.uuid4().int} question"
+
+
+async def read_events(response) -> tuple:
+    """Consume an SSE response, returning (events, whether every frame was well formed)."""
+    body = "".join([chunk async for chunk in response.body_iterator])
+    frames = body.split("\n\n")
+    well_formed = frames[-1] == "" and all(frame.startswith("data: ") for frame in frames[:-1])
+    events = [json.loads(frame[len("data: "):]) for frame in frames[:-1]]
+    return events, well_formed
+
+
+async def test_streaming_chat():
+    """Check incremental markdown stripping and the SSE streaming endpoints."""
+    
+    client = AsyncIOMotorClient(MONGODB_URI)
+    db = client[DATABASE_NAME]
+    database.mongodb_client = client
+    
+    print("=" * 60)
+    print("TESTING STREAMING CHAT")
+    print("=" * 60)
+    check = Checks()
+    
+    expected = ai_service._strip_markdown("".join(MARKDOWN_CHUNKS))
+    
+    print("\n[Test 1] Markdown split across chunks is stripped")
+    stripper = StreamingMarkdownStripper(ai_service._strip_markdown)
+    pieces = [stripper.feed(chunk) for chunk in MARKDOWN_CHUNKS] + [stripper.flush()]
+    emitted = [piece for piece in pieces if piece]
+    check("same text as stripping the whole response", "".join(pieces) == expected)
+    check(f"released incrementally ({len(emitted)} pieces)", len(emitted) > 2)
+    check("no markdown markers emitted", not any(marker in "".join(pieces) for marker in ("*", "`", "#")))
+    
+    user = SimpleNamespace(id=ObjectId())
+    conversation_id = ObjectId()
+    now = datetime.utcnow()
+    await db.conversations.insert_one({
+        "_id": conversation_id,
+        "user_id": user.id,
+        "title": "Streaming check",
+        "message_count": 0,
+        "last_message_preview": "",
+        "created_at": now,
+        "updated_at": now
+    })
+    
+    original_stream = ai_service._stream_content
+    try:
+        print("\n[Test 2] /quick-query/stream framing")
+        await ai_rate_limiter.reset()
+        ai_service._stream_content = fake_stream(MARKDOWN_CHUNKS)
+        response = await quick_query_stream(MessageCreate(message=question()), current_user=user)
+        events, well_formed = await read_events(response)
+        chunks = [event["content"] for event in events if event["type"] == "chunk"]
+        check("text/event-stream without proxy buffering",
+              response.media_type == "text/event-stream" and response.headers["x-accel-buffering"] == "no")
+        check("every frame is 'data: <json>' and a blank line", well_formed)
+        check(f"{len(chunks)} chunk events then done", len(chunks) > 1 and [e["type"] for e in events][-1] == "done")
+        check("chunks add up to the stripped response", "".join(chunks) == expected)
+        check("done carries the full response", events[-1]["content"] == expected)
+        
+        print("\n[Test 3] /messages/stream saves the exchange")
+        await ai_rate_limiter.reset()
+        ai_service._stream_content = fake_stream(MARKDOWN_CHUNKS)
+        response = await add_message_stream(str(conversation_id), MessageCreate(message=question()), current_user=user)
+        events, well_formed = await read_events(response)
+        messages = await get_all_messages(db, conversation_id)
+        check("well-formed events ending in done", well_formed and events[-1]["type"] == "done")
+        check("user and assistant messages saved", [m["role"] for m in messages] == ["user", "assistant"])
+        check("saved reply is the streamed text", messages[-1]["content"] == expected)
+        
+        print("\n[Test 4] Generation failures end the stream with an error event")
+        await ai_rate_limiter.reset()
+        ai_service._stream_content = fake_stream(MARKDOWN_CHUNKS[:2], RuntimeError("upstream reset"))
+        response = await add_message_stream(str(conversation_id), MessageCreate(message=question()), current_user=user)
+        events, well_formed = await read_events(response)
+        types = [event["type"] for event in events]
+        check(f"chunks then error, no done: {types}", well_formed and types[-1] == "error" and "done" not in types)
+        check("error carries a user-facing message", "try again" in events[-1]["message"])
+        check("failed exchange not saved", len(await get_all_messages(db, conversation_id)) == 2)
+        
+        await ai_rate_limiter.reset()
+        ai_service._stream_content = fake_stream([], RuntimeError("429 quota exceeded"))
+        response = await quick_query_stream(MessageCreate(message=question()), current_user=user)
+        events, well_formed = await read_events(response)
+        check("failure before the first chunk is an error event",
+              well_formed and [event["type"] for event in events] == ["error"])
+    finally:
+        # Cleanup
+        ai_service._stream_content = original_stream
+        await db.conversations.delete_one({"_id": conversation_id})
+        await db.messages.delete_many({"conversation_id": conversation_id})
+        client.close()
+    
+    return check.report("Streaming chat works correctly", "Some streaming chat checks failed")
+
+
+if __name__ == "__main__":
+    result = asyncio.run(test_streaming_chat())
+    sys.exit(0 if result else 1)
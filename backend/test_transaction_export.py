@@ -0,0 +1,135 @@
+"""
+Ledger export check.
+Streams GET /api/v1/transactions/export for a small and a large ledger and
+verifies the output and that peak memory does not grow with ledger size.
+"""
+import asyncio
+import csv
+import io
+import json
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from motor.motor_asyncio import AsyncIOMotorClient
+from bson import ObjectId
+import os
+from dotenv import load_dotenv
+
+import database
+from routers.transactions import export_transactions
+from test_helpers import Checks
+
+# Load environment variables
+load_dotenv()
+
+MONGODB_URI = os.getenv("MONGODB_URI")
+DATABASE_NAME = "finsense"
+
+
+async def seed_ledger(db, user_id: ObjectId, count: int):
+    """Insert count transactions for a user in batches."""
+    now = datetime.utcnow()
+    batch = []
+    for i in range(count):
+        batch.append({
+            "user_id": user_id,
+            "date": now - timedelta(minutes=i),
+            "vendor": f'Vendor, "{i}"',
+            "amount": round(i * 1.25, 2),
+            "category": "Supplies",
+            "confidence": 0.9,
+            "status": "auto-approved",
+            "explanation": "Line one\nline two",
+            "payment_method": "card",
+            "created_at": now,
+            "updated_at": now
+        })
+        if len(batch) == 5000:
+            await db.transactions.insert_many(batch)
+            batch = []
+    if batch:
+        await db.transactions.insert_many(batch)
+
+
+async def stream_export(user, export_format: str) -> tuple:
+    """Consume an export, returning (row count, first row, peak traced bytes)."""
+    tracemalloc.start()
+    response = await export_transactions(export_format=export_format, status_filter=None, start=None, end=None, current_user=user)
+    
+    rows = 0
+    first_row = None
+    async for chunk in response.body_iterator:
+        # Each chunk holds whole rows, so it can be parsed on its own
+        if export_format == "ndjson":
+            records = [json.loads(line) for line in chunk.splitlines()]
+        elif first_row is None:
+            records = list(csv.DictReader(io.StringIO(chunk)))
+        else:
+            records = list(csv.reader(io.StringIO(chunk)))
+        
+        if first_row is None and records:
+            first_row = records[0]
+        rows += len(records)
+    
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    return rows, first_row, peak
+
+
+async def test_transaction_export():
+    """Check export content and constant memory use."""
+    
+    client = AsyncIOMotorClient(MONGODB_URI)
+    db = client[DATABASE_NAME]
+    database.mongodb_client = client
+    
+    print("=" * 60)
+    print("TESTING LEDGER EXPORT")
+    print("=" * 60)
+    check = Checks()
+    
+    small_user = SimpleNamespace(id=ObjectId())
+    large_user = SimpleNamespace(id=ObjectId())
+    await seed_ledger(db, small_user.id, 2000)
+    await seed_ledger(db, large_user.id, 50000)
+    
+    # Oldest row carries text a spreadsheet would run as a formula
+    oldest = await db.transactions.find_one({"user_id": small_user.id}, sort=[("date", 1)])
+    await db.transactions.update_one(
+        {"_id": oldest["_id"]},
+        {"$set": {"vendor": '=HYPERLINK("http://example.com")', "amount": -12.5}}
+    )
+    
+    try:
+        print("\n[Test 1] CSV export")
+        rows, first_row, small_peak = await stream_export(small_user, "csv")
+        check(f"{rows} CSV rows", rows == 2000)
+        check("quotes and newlines round-trip", first_row["explanation"] == "Line one\nline two")
+        check("oldest first", first_row["id"] == str(oldest["_id"]))
+        check("formula cells escaped", first_row["vendor"] == "'" + '=HYPERLINK("http://example.com")')
+        check("negative amounts left numeric", first_row["amount"] == "-12.5")
+        
+        print("\n[Test 2] NDJSON export")
+        rows, first_row, _ = await stream_export(small_user, "ndjson")
+        check(f"{rows} NDJSON rows", rows == 2000)
+        check("rows are transaction objects", first_row["status"] == "auto-approved")
+        check("NDJSON text is not escaped", first_row["vendor"] == '=HYPERLINK("http://example.com")')
+        
+        print("\n[Test 3] Memory does not grow with the ledger")
+        rows, _, large_peak = await stream_export(large_user, "csv")
+        print(f"  2,000 rows peak: {small_peak / 1024:.0f} KiB, 50,000 rows peak: {large_peak / 1024:.0f} KiB")
+        check(f"{rows} rows exported", rows == 50000)
+        check("peak memory within 2x of the small export", large_peak < small_peak * 2)
+    finally:
+        # Cleanup
+        await db.transactions.delete_many({"user_id": {"$in": [small_user.id, large_user.id]}})
+        client.close()
+    
+    return check.report("Ledger export streams in constant memory", "Some export checks failed")
+
+
+if __name__ == "__main__":
+    result = asyncio.run(test_transaction_export())
+    sys.exit(0 if result else 1)
@@ -0,0 +1,152 @@
+"""
+Micro-benchmark: database round trips per single-document update.
+Compares the old read-write-read pattern with the find_one_and_update
+paths of PUT /api/v1/transactions/{id} and PUT /api/v1/auth/profile,
+counting commands with a pymongo command listener.
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from motor.motor_asyncio import AsyncIOMotorClient
+from bson import ObjectId
+from pymongo import monitoring
+import os
+from dotenv import load_dotenv
+
+import database
+from models.user import UserUpdate
+from routers.auth import update_profile
+from routers.transactions import update_transaction, UpdateTransactionRequest
+
+# Load environment variables
+load_dotenv()
+
+MONGODB_URI = os.getenv("MONGODB_URI")
+DATABASE_NAME = "finsense"
+ITERATIONS = 50
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts commands sent to the server, by name."""
+    
+    def __init__(self):
+        self.counts = {}
+    
+    def started(self, event):
+        self.counts[event.command_name] = self.counts.get(event.command_name, 0) + 1
+    
+    def succeeded(self, event):
+        pass
+    
+    def failed(self, event):
+        pass
+    
+    def reset(self):
+        self.counts = {}
+    
+    def total(self, *names) -> int:
+        return sum(self.counts.get(name, 0) for name in names)
+
+
+DATA_COMMANDS = ("find", "update", "findAndModify", "insert", "delete", "aggregate")
+
+
+async def measure(counter: CommandCounter, label: str, edit) -> float:
+    """Run an edit ITERATIONS times and report round trips and latency."""
+    counter.reset()
+    started = time.perf_counter()
+    for i in range(ITERATIONS):
+        await edit(i)
+    elapsed_ms = (time.perf_counter() - started) * 1000 / ITERATIONS
+    
+    per_edit = counter.total(*DATA_COMMANDS) / ITERATIONS
+    print(f"  {label:<42} {per_edit:.1f} round trips  {elapsed_ms:6.2f} ms/edit")
+    return per_edit
+
+
+async def test_update_roundtrips():
+    """Compare round trips per edit before and after find_one_and_update."""
+    
+    counter = CommandCounter()
+    client = AsyncIOMotorClient(MONGODB_URI, event_listeners=[counter])
+    db = client[DATABASE_NAME]
+    database.mongodb_client = client
+    
+    print("=" * 60)
+    print("BENCHMARK: ROUND TRIPS PER UPDATE")
+    print("=" * 60)
+    
+    user_id = ObjectId()
+    now = datetime.utcnow()
+    await db.users.insert_one({
+        "_id": user_id,
+        "email": f"roundtrip_{now.timestamp()}@example.com",
+        "first_name": "Round",
+        "last_name": "Trip",
+        "business_name": "Benchmark Co",
+        "created_at": now
+    })
+    result = await db.transactions.insert_one({
+        "user_id": user_id,
+        "date": now,
+        "vendor": "Benchmark Vendor",
+        "amount": 12.5,
+        "category": "Supplies",
+        "confidence": 0.9,
+        "status": "needs-review",
+        "explanation": "",
+        "payment_method": "card",
+        "created_at": now,
+        "updated_at": now
+    })
+    transaction_id = result.inserted_id
+    user = SimpleNamespace(id=user_id)
+    
+    async def old_transaction_edit(i):
+        # The previous implementation: ownership read, write, read back
+        await db.transactions.find_one({"_id": transaction_id, "user_id": user_id})
+        await db.transactions.update_one(
+            {"_id": transaction_id},
+            {"$set": {"status": "manual" if i % 2 else "auto-approved", "updated_at": datetime.utcnow()}}
+        )
+        await db.transactions.find_one({"_id": transaction_id})
+    
+    async def new_transaction_edit(i):
+        await update_transaction(
+            str(transaction_id),
+            UpdateTransactionRequest(status="manual" if i % 2 else "auto-approved"),
+            current_user=user
+        )
+    
+    async def old_profile_edit(i):
+        await db.users.update_one({"_id": user_id}, {"$set": {"phone": str(i), "updated_at": datetime.utcnow()}})
+        await db.users.find_one({"_id": user_id})
+    
+    async def new_profile_edit(i):
+        await update_profile(UserUpdate(phone=str(i)), current_user=user)
+    
+    print(f"\n{ITERATIONS} edits each (status-only, so no rollup writes):")
+    old_tx = await measure(counter, "transaction: find + update + find", old_transaction_edit)
+    new_tx = await measure(counter, "transaction: find_one_and_update", new_transaction_edit)
+    old_profile = await measure(counter, "profile: update + find", old_profile_edit)
+    new_profile = await measure(counter, "profile: find_one_and_update", new_profile_edit)
+    
+    # Cleanup
+    await db.transactions.delete_one({"_id": transaction_id})
+    await db.users.delete_one({"_id": user_id})
+    client.close()
+    
+    print("\n" + "=" * 60)
+    if new_tx == 1 and old_tx == 3 and new_profile == 1 and old_profile == 2:
+        print("[SUCCESS] Each update is a single round trip")
+        return True
+    
+    print("[FAIL] Unexpected number of round trips")
+    return False
+
+
+if __name__ == "__main__":
+    result = asyncio.run(test_update_roundtrips())
+    sys.exit(0 if result else 1)
@@ -46,6 +46,24 @@ async def get_auth_token():
         return login_response.json()["access_token"]
 
 
+async def wait_for_job(client: httpx.AsyncClient, token: str, job: dict, timeout: float = 30) -> dict:
+    """Poll a background job until it succeeds or fails."""
+    base_url = "http://localhost:8000"
+    deadline = asyncio.get_running_loop().time() + timeout
+    
+    while job["status"] not in ("succeeded", "failed"):
+        if asyncio.get_running_loop().time() > deadline:
+            break
+        await asyncio.sleep(0.5)
+        response = await client.get(
+            f"{base_url}/api/v1/jobs/{job['id']}",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        job = response.json()
+    
+    return job
+
+
 async def test_connect_account(token: str):
     """Test connecting a Square account."""
     print("\n=== Test 1: Connect Account ===")
@@ -61,7 +79,7 @@ async def test_connect_account(token: str):
             headers={"Authorization": f"Bearer {token}"}
         )
         
-        if response.status_code != 201:
+        if response.status_code != 202:
             print(f"[FAIL] Connect account failed with status {response.status_code}")
             print(f"  Response: {response.text}")
             return False
@@ -109,13 +127,18 @@ async def test_sync_transactions(token: str):
             headers={"Authorization": f"Bearer {token}"}
         )
         
-        if response.status_code != 200:
+        if response.status_code != 202:
             print(f"[FAIL] Sync transactions failed with status {response.status_code}")
             print(f"  Response: {response.text}")
             return False
         
         data = response.json()
-        print(f"[OK] Synced {data['count']} transactions from {data['source']}")
+        job = await wait_for_job(client, token, data["job"])
+        if job["status"] != "succeeded":
+            print(f"[FAIL] Sync job ended as {job['status']}: {job.get('error')}")
+            return False
+        
+        print(f"[OK] Synced {job['result']['count']} transactions from {data['source']}")
         return True
 
 
@@ -40,6 +40,24 @@ async def get_auth_token():
         return login_response.json()["access_token"]
 
 
+async def wait_for_job(client: httpx.AsyncClient, token: str, job: dict, timeout: float = 30) -> dict:
+    """Poll a background job until it succeeds or fails."""
+    base_url = "http://localhost:8000"
+    deadline = asyncio.get_running_loop().time() + timeout
+    
+    while job["status"] not in ("succeeded", "failed"):
+        if asyncio.get_running_loop().time() > deadline:
+            break
+        await asyncio.sleep(0.5)
+        response = await client.get(
+            f"{base_url}/api/v1/jobs/{job['id']}",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        job = response.json()
+    
+    return job
+
+
 async def test_connect_all_accounts(token: str):
     """Test connecting all three account types."""
     print("\n=== Test 1: Connect All Account Types ===")
@@ -60,7 +78,7 @@ async def test_connect_all_accounts(token: str):
                 headers={"Authorization": f"Bearer {token}"}
             )
             
-            if response.status_code == 201:
+            if response.status_code == 202:
                 data = response.json()
                 print(f"  [OK] Connected: {data['account']['name']} ({data['account']['source']})")
                 connected_count += 1
@@ -89,9 +107,12 @@ async def test_sync_all_accounts(token: str):
                 headers={"Authorization": f"Bearer {token}"}
             )
             
-            if response.status_code == 200:
-                data = response.json()
-                count = data['count']
+            if response.status_code == 202:
+                job = await wait_for_job(client, token, response.json()["job"])
+                if job["status"] != "succeeded":
+                    print(f"  [FAIL] Sync job for {source} ended as {job['status']}: {job.get('error')}")
+                    return False
+                count = job["result"]["count"]
                 total_synced += count
                 print(f"  [OK] Synced {count} transactions from {source}")
             else: